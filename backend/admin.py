@@ -1,7 +1,14 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from coalesce import coalesced
 from database import Database
+from pit import refresh_user_pit
+from identity import current_is_admin, revocations, revoke_user_tokens
+from satellite import write_versions
+from streaming import stream_rows
+from temporal import parse_temporal_args
 import uuid
+from datetime import date, datetime, timedelta
 import logging
 from werkzeug.security import generate_password_hash
 
@@ -11,6 +18,12 @@ admin_bp = Blueprint('admin', __name__)
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+USER_EXPORT_COLUMNS = ["id", "hk_user", "firstName", "lastName", "position", "phone", "coreHours", "isAdmin"]
+
+# Protokoll-Endpunkte: Standardzeitraum in Tagen und größte Seitengröße
+LOG_DEFAULT_DAYS = 7
+LOG_MAX_PAGE_SIZE = 500
+
 def is_admin(user_id):
     """Prüft, ob der aktuelle Benutzer Admin ist."""
     db = Database()
@@ -19,10 +32,9 @@ def is_admin(user_id):
             """
             SELECT s.is_admin
             FROM h_user h
-            JOIN s_user_details s ON h.hk_user = s.hk_user
-            WHERE h.user_id = %s AND s.t_to IS NULL AND h.t_to IS NULL
-            ORDER BY s.t_from DESC
-            LIMIT 1
+            JOIN pit_user p ON p.hk_user = h.hk_user
+            JOIN s_user_details s ON s.hk_user = h.hk_user AND s.t_from = p.user_details_t_from
+            WHERE h.user_id = %s AND h.t_to IS NULL
             """,
             (user_id,)
         )
@@ -34,46 +46,77 @@ def is_admin(user_id):
     finally:
         db.close()
 
+def admin_scope():
+    """Admins teilen sich die Benutzerliste, alle anderen erhalten ihre eigene 403."""
+    return 'admin' if current_is_admin() else f'benutzer:{get_jwt_identity()}'
+
 @admin_bp.route('/api/admin/users', methods=['GET'])
 @jwt_required()
+@coalesced(admin_scope)
 def get_all_users():
-    """Gibt alle Benutzer mit Details zurück (nur für Admins)."""
+    """
+    Gibt alle Benutzer mit Details zurück (nur für Admins). Mit ?format=csv als CSV-Export.
+    Mit ?as_of=<zeitpunkt> bzw. ?valid_at=<datum> der Stand zu diesem Zeitpunkt.
+    """
     current_user = get_jwt_identity()
     logger.info(f"Admin-API aufgerufen von: {current_user}")
     
-    if not is_admin(current_user):
+    if not current_is_admin():
         logger.warning(f"Unberechtigter Zugriff auf Admin-API von: {current_user}")
         return jsonify({"error": "Keine Admin-Berechtigung"}), 403
 
+    try:
+        temporal = parse_temporal_args(request.args)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
     db = Database()
     try:
         logger.info("Benutzer werden aus der Datenbank abgerufen...")
-        users = db.fetch_all("""
-            SELECT 
-                h.user_id,
-                h.hk_user,
-                s.first_name, 
-                s.last_name, 
-                s.position,
-                s.telefon,
-                s.core_hours,
-                s.is_admin
-            FROM 
-                h_user h
-            JOIN 
-                s_user_details s ON h.hk_user = s.hk_user
-            WHERE 
-                s.t_to IS NULL
-            ORDER BY 
-                s.last_name, s.first_name
-        """)
+        if temporal.active:
+            query = f"""
+                SELECT 
+                    h.user_id,
+                    h.hk_user,
+                    s.first_name, 
+                    s.last_name, 
+                    s.position,
+                    s.telefon,
+                    s.core_hours,
+                    s.is_admin
+                FROM 
+                    h_user h
+                JOIN 
+                    {temporal.source('s_user_details')} s ON s.hk_user = h.hk_user AND {temporal.condition('s')}
+                ORDER BY 
+                    s.last_name, s.first_name
+            """
+        else:
+            query = """
+                SELECT 
+                    h.user_id,
+                    h.hk_user,
+                    s.first_name, 
+                    s.last_name, 
+                    s.position,
+                    s.telefon,
+                    s.core_hours,
+                    s.is_admin
+                FROM 
+                    h_user h
+                JOIN 
+                    pit_user p ON p.hk_user = h.hk_user
+                JOIN 
+                    s_user_details s ON s.hk_user = h.hk_user AND s.t_from = p.user_details_t_from
+                ORDER BY 
+                    s.last_name, s.first_name
+            """
+        # Serverseitiger Cursor: die Zeilen werden direkt in die Antwort gestreamt
+        users = db.stream(query, temporal.params())
         
-        logger.info(f"Rohdaten aus DB: {users}")
-        result = []
-        for user in users:
-            logger.info(f"User-Datensatz: {user}")
+        def serialize(user):
             core_hours = user[6]
-            result.append({
+            return {
                 "id": user[0],
                 "hk_user": str(user[1]),
                 "firstName": user[2],
@@ -82,10 +125,14 @@ def get_all_users():
                 "phone": user[5],
                 "coreHours": core_hours if core_hours else None,
                 "isAdmin": bool(user[7])
-            })
+            }
         
-        logger.info(f"{len(result)} Benutzer gefunden.")
-        return jsonify(result)
+        return stream_rows(
+            users, serialize,
+            fmt=request.args.get('format', 'json'),
+            columns=USER_EXPORT_COLUMNS,
+            filename='benutzer.csv'
+        )
     
     except Exception as e:
         logger.error(f"Fehler beim Abrufen der Benutzer: {e}")
@@ -97,7 +144,7 @@ def get_all_users():
 @jwt_required()
 def create_user():
     current_user = get_jwt_identity()
-    if not is_admin(current_user):
+    if not current_is_admin():
         return jsonify({"error": "Keine Admin-Berechtigung"}), 403
 
     data = request.json
@@ -135,6 +182,7 @@ def create_user():
                 VALUES (%s, NOW(), CURRENT_DATE, %s, %s)""",
                 (hk_user, "admin", pw_hash)
             )
+        refresh_user_pit(db, hk_user)
         db.commit()
         return jsonify({"message": "Benutzer erfolgreich angelegt"}), 201
     except Exception as e:
@@ -147,36 +195,43 @@ def create_user():
 @jwt_required()
 def update_user(user_id):
     current_user = get_jwt_identity()
-    if not is_admin(current_user):
+    if not current_is_admin():
         return jsonify({"error": "Keine Admin-Berechtigung"}), 403
 
     data = request.json
     db = Database()
     try:
-        # Historisiere alten Eintrag
-        db.execute(
-            "UPDATE s_user_details SET t_to = NOW() WHERE hk_user = (SELECT hk_user FROM h_user WHERE user_id = %s AND t_to IS NULL) AND t_to IS NULL",
-            (user_id,)
-        )
-        # Und auch hier:
         hk_users = db.fetch_all("SELECT hk_user FROM h_user WHERE user_id = %s AND t_to IS NULL", (user_id,))
         if not hk_users or len(hk_users) != 1:
             return jsonify({"error": "Inkonsistente Benutzerdaten: Mehrere oder kein aktiver Hub gefunden"}), 500
         hk_user = hk_users[0][0]
-        # Neuen Eintrag anlegen
-        db.execute(
-            """INSERT INTO s_user_details 
-            (hk_user, t_from, b_from, rec_src, first_name, last_name, position, core_hours, telefon, is_admin)
-            VALUES (%s, NOW(), CURRENT_DATE, %s, %s, %s, %s, %s, %s, %s)""",
-            (
-                hk_user, "admin",
-                data.get("firstName"), data.get("lastName"),
-                data.get("position"), data.get("coreHours"),
-                data.get("phone"), data.get("isAdmin", False)
-            )
+        was_admin = db.fetch_one(
+            "SELECT is_admin FROM s_user_details WHERE hk_user = %s AND t_to IS NULL", (hk_user,)
         )
+        # Alten Eintrag historisieren und neuen anlegen (eine Anweisung);
+        # bei unveränderten Werten bleibt der Satellit unberührt
+        created = write_versions(db, 's_user_details', [{
+            'hk_user': hk_user,
+            'first_name': data.get("firstName"),
+            'last_name': data.get("lastName"),
+            'position': data.get("position"),
+            'core_hours': data.get("coreHours"),
+            'telefon': data.get("phone"),
+            'is_admin': data.get("isAdmin", False)
+        }], rec_src="admin")
+        if created:
+            refresh_user_pit(db, hk_user)
+        # Von den Feldern steht nur is_admin als Claim im Token; nur dann sind
+        # bestehende Tokens veraltet. Andere Änderungen (auch am eigenen
+        # Datensatz) melden niemanden ab.
+        revoked_at = None
+        if bool(was_admin and was_admin[0]) != bool(data.get("isAdmin", False)):
+            revoked_at = revoke_user_tokens(db, hk_user)
         db.commit()
-        return jsonify({"message": "Benutzer erfolgreich aktualisiert"})
+        # Erst nach dem Commit in den Sperr-Cache dieses Prozesses übernehmen
+        if revoked_at is not None:
+            revocations.mark(hk_user, revoked_at)
+        return jsonify({"message": "Benutzer erfolgreich aktualisiert", "versionCreated": bool(created)})
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
@@ -187,7 +242,7 @@ def update_user(user_id):
 @jwt_required()
 def delete_user(user_id):
     current_user = get_jwt_identity()
-    if not is_admin(current_user):
+    if not current_is_admin():
         return jsonify({"error": "Keine Admin-Berechtigung"}), 403
 
     db = Database()
@@ -197,14 +252,141 @@ def delete_user(user_id):
             return jsonify({"error": "Benutzer nicht gefunden"}), 404
         hk_user = hk_user[0]
         # Historisiere alle offenen Satelliten
-        db.execute("UPDATE s_user_details SET t_to = NOW() WHERE hk_user = %s AND t_to IS NULL", (hk_user,))
-        db.execute("UPDATE s_user_login SET t_to = NOW() WHERE hk_user = %s AND t_to IS NULL", (hk_user,))
+        db.execute("UPDATE s_user_details SET t_to = NOW(), b_to = CURRENT_DATE WHERE hk_user = %s AND t_to IS NULL", (hk_user,))
+        db.execute("UPDATE s_user_login SET t_to = NOW(), b_to = CURRENT_DATE WHERE hk_user = %s AND t_to IS NULL", (hk_user,))
         # Historisiere auch den Hub-Eintrag!
         db.execute("UPDATE h_user SET t_to = NOW() WHERE hk_user = %s AND t_to IS NULL", (hk_user,))
+        refresh_user_pit(db, hk_user)
+        revoked_at = revoke_user_tokens(db, hk_user)
         db.commit()
+        revocations.mark(hk_user, revoked_at)
         return jsonify({"message": "Benutzer erfolgreich gelöscht"})
     except Exception as e:
         db.rollback()
         return jsonify({"error": str(e)}), 500
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+def _parse_log_range(args):
+    """
+    Zeitraum aus ``from``/``to`` (YYYY-MM-DD, beide inklusive); ohne ``from``
+    die letzten LOG_DEFAULT_DAYS Tage. Die Grenzen beschränken die Abfrage
+    zugleich auf die betroffenen Monatspartitionen von app_logs.
+
+    Raises:
+        ValueError: Bei ungültigen Datumsangaben
+    """
+    date_to = args.get('to')
+    end = datetime.strptime(date_to, '%Y-%m-%d').date() + timedelta(days=1) if date_to else date.today() + timedelta(days=1)
+    date_from = args.get('from')
+    start = datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else end - timedelta(days=LOG_DEFAULT_DAYS)
+    return start, end
+
+@admin_bp.route('/api/admin/logs', methods=['GET'])
+@jwt_required()
+def get_logs():
+    """
+    Protokolleinträge, neueste zuerst (nur für Admins).
+
+    Query-Parameter: ``event_type``, ``user`` (E-Mail), ``from``/``to``,
+    ``limit`` und ``before`` (log_entry_id des letzten Eintrags der vorherigen
+    Seite zusammen mit ``before_ts``). Gelesen wird über die Indizes
+    (event_type, timestamp) bzw. (hk_user, timestamp).
+    """
+    if not current_is_admin():
+        return jsonify({"error": "Keine Admin-Berechtigung"}), 403
+
+    try:
+        start, end = _parse_log_range(request.args)
+        limit = min(int(request.args.get('limit', 100)), LOG_MAX_PAGE_SIZE)
+        before = request.args.get('before')
+        before_ts = request.args.get('before_ts')
+        if before is not None:
+            before = int(before)
+            before_ts = datetime.fromisoformat(before_ts)
+    except (ValueError, TypeError):
+        return jsonify({"error": "Ungültige Parameter"}), 400
+
+    db = Database()
+    try:
+        query = """
+            SELECT l.log_entry_id, l.timestamp, l.event_type, h.user_id, l.details, l.rec_src
+            FROM app_logs l
+            LEFT JOIN h_user h ON h.hk_user = l.hk_user
+            WHERE l.timestamp >= %(start)s AND l.timestamp < %(end)s
+        """
+        params = {"start": start, "end": end, "limit": limit + 1}
+        if request.args.get('event_type'):
+            query += " AND l.event_type = %(event_type)s"
+            params["event_type"] = request.args['event_type']
+        if request.args.get('user'):
+            query += " AND l.hk_user = (SELECT hk_user FROM h_user WHERE user_id = %(user)s)"
+            params["user"] = request.args['user']
+        if before is not None:
+            query += " AND (l.timestamp, l.log_entry_id) < (%(before_ts)s, %(before)s)"
+            params.update(before=before, before_ts=before_ts)
+        query += " ORDER BY l.timestamp DESC, l.log_entry_id DESC LIMIT %(limit)s"
+
+        rows = db.fetch_all(query, params)
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        entries = [{
+            "id": row[0],
+            "timestamp": row[1].isoformat(),
+            "eventType": row[2],
+            "user": row[3],
+            "details": row[4],
+            "recSrc": row[5],
+        } for row in rows]
+        next_page = None
+        if has_more:
+            next_page = {"before": rows[-1][0], "before_ts": rows[-1][1].isoformat()}
+        return jsonify({"entries": entries, "next": next_page})
+    except Exception as e:
+        logger.error(f"Fehler beim Lesen der Protokolle: {e}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        db.close()
+
+@admin_bp.route('/api/admin/logs/daily', methods=['GET'])
+@jwt_required()
+def get_log_daily_counts():
+    """
+    Ereignisse pro Tag und Typ aus den Tagessummen r_daily_log_events (nur für Admins).
+    Reicht auch über die Aufbewahrungsfrist von app_logs hinaus.
+    Query-Parameter: ``event_type``, ``user`` (E-Mail), ``from``/``to``.
+    """
+    if not current_is_admin():
+        return jsonify({"error": "Keine Admin-Berechtigung"}), 403
+
+    try:
+        start, end = _parse_log_range(request.args)
+    except ValueError:
+        return jsonify({"error": "Ungültige Parameter"}), 400
+
+    db = Database()
+    try:
+        query = """
+            SELECT r.day, r.event_type, SUM(r.event_count)
+            FROM r_daily_log_events r
+            WHERE r.day >= %(start)s AND r.day < %(end)s
+        """
+        params = {"start": start, "end": end}
+        if request.args.get('event_type'):
+            query += " AND r.event_type = %(event_type)s"
+            params["event_type"] = request.args['event_type']
+        if request.args.get('user'):
+            query += " AND r.hk_user = (SELECT hk_user FROM h_user WHERE user_id = %(user)s)"
+            params["user"] = request.args['user']
+        query += " GROUP BY r.day, r.event_type ORDER BY r.day DESC, r.event_type"
+
+        rows = db.fetch_all(query, params)
+        return jsonify([
+            {"day": row[0].isoformat(), "eventType": row[1], "count": int(row[2])}
+            for row in rows
+        ])
+    except Exception as e:
+        logger.error(f"Fehler beim Lesen der Tagessummen: {e}")
+        return jsonify({"error": str(e)}), 500
+    finally:
+        db.close()
@@ -0,0 +1,173 @@
+"""
+Archivierung geschlossener Satellitenversionen.
+
+Versionen, deren t_to vor dem Stichtag liegt, werden stapelweise aus dem
+Satelliten nach <satellit>_archive verschoben (Migration 0010). Jeder Stapel
+ist eine eigene kurze Transaktion aus einer einzigen Anweisung:
+
+    WITH stapel AS (SELECT ... ORDER BY <Primärschlüssel> LIMIT n),
+         verschoben AS (DELETE FROM <sat> USING stapel ... RETURNING *)
+    INSERT INTO <sat>_archive SELECT * FROM verschoben
+
+Die Stapel enthalten nur Versionen vor dem Stichtag und laufen per Keyset
+über den Primärschlüssel, sodass jeder Lauf den Satelliten nur einmal
+durchgeht. Liegt eine Version bereits im Archiv, bricht der Lauf mit einem
+Fehler ab; der Stapel bleibt dann unverändert im Satelliten. Offene Versionen und die von den
+PIT-Tabellen referenzierten Zeilen bleiben unberührt. Anschließend gibt
+VACUUM ANALYZE den Platz im Satelliten zur Wiederverwendung frei.
+
+Abfragen über die gesamte Historie nutzen die Views <satellit>_history.
+
+Aufruf:
+    python archive.py run [--older-than-days N] [--batch-size N] [--table T] [--pause-ms N] [--no-vacuum]
+    python archive.py status [--older-than-days N]
+"""
+
+import argparse
+import sys
+import time
+from datetime import datetime, timedelta
+
+from partitions import PARTITIONED_TABLES
+from satellite import SATELLITES
+
+ARCHIVE_AFTER_DAYS = 365
+ARCHIVE_BATCH_SIZE = 5000
+# Längstens so lange auf Sperren warten, bevor ein Stapel abbricht
+ARCHIVE_LOCK_TIMEOUT = '2s'
+
+
+def primary_key(table):
+    """Spalten des Primärschlüssels eines Satelliten (partitionierte mit Partitionsschlüssel)."""
+    sat = SATELLITES[table]
+    columns = [sat.key, 't_from']
+    if table in PARTITIONED_TABLES:
+        columns.append(PARTITIONED_TABLES[table])
+    return columns
+
+
+def archive_batch(cur, table, cutoff, after, batch_size):
+    """
+    Verschiebt einen Stapel geschlossener Versionen ab dem Keyset ``after``.
+
+    Returns:
+        tuple: (verschobene Zeilen, Keyset der letzten geprüften Zeile oder None am Ende)
+    """
+    pk = primary_key(table)
+    columns = ', '.join(pk)
+    keyset = f"AND ({columns}) > ({', '.join(['%s'] * len(pk))})" if after else ""
+    cur.execute(f"SET LOCAL lock_timeout = '{ARCHIVE_LOCK_TIMEOUT}'")
+    cur.execute(f"""
+        WITH stapel AS (
+            SELECT {columns}, t_to
+            FROM {table}
+            WHERE t_to < %s {keyset}
+            ORDER BY {columns}
+            LIMIT %s
+        ), verschoben AS (
+            DELETE FROM {table} s
+            USING stapel b
+            WHERE {' AND '.join(f's.{c} = b.{c}' for c in pk)}
+            RETURNING s.*
+        ), archiviert AS (
+            -- Ohne ON CONFLICT: liegt eine Version schon im Archiv, bricht der
+            -- Stapel mit UniqueViolation ab, statt die gelöschte Zeile zu verlieren
+            INSERT INTO {table}_archive
+            SELECT * FROM verschoben
+        )
+        SELECT (SELECT COUNT(*) FROM verschoben),
+               (SELECT ARRAY[{', '.join(f'{c}::text' for c in pk)}]
+                FROM stapel ORDER BY {', '.join(f'{c} DESC' for c in pk)} LIMIT 1)
+    """, [cutoff] + list(after or []) + [batch_size])
+    moved, last = cur.fetchone()
+    return moved, last
+
+
+def archive_table(db, table, cutoff, batch_size=ARCHIVE_BATCH_SIZE, pause=0.0, vacuum=True, progress=print):
+    """
+    Archiviert alle vor ``cutoff`` geschlossenen Versionen eines Satelliten.
+    Committet nach jedem Stapel.
+
+    Returns:
+        int: Anzahl verschobener Versionen
+    """
+    if table not in SATELLITES:
+        raise ValueError(f"Unbekannter Satellit: {table}")
+    total = 0
+    after = None
+    started = time.monotonic()
+    while True:
+        try:
+            moved, after = archive_batch(db.cur, table, cutoff, after, batch_size)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        total += moved
+        if after is None:
+            break
+        if moved:
+            progress(f"  {table}: {total} Versionen archiviert ({time.monotonic() - started:.1f} s)")
+        if pause:
+            time.sleep(pause)
+    if vacuum and total:
+        db.conn.autocommit = True
+        try:
+            db.cur.execute(f"VACUUM ANALYZE {table}")
+        finally:
+            db.conn.autocommit = False
+    return total
+
+
+def status(db, cutoff):
+    """
+    Returns:
+        list[tuple]: (Satellit, offene, geschlossene, davon archivierbar, archivierte) je Satellit
+    """
+    rows = []
+    for table in SATELLITES:
+        db.execute(f"""
+            SELECT COUNT(*) FILTER (WHERE t_to IS NULL),
+                   COUNT(*) FILTER (WHERE t_to IS NOT NULL),
+                   COUNT(*) FILTER (WHERE t_to < %s),
+                   (SELECT COUNT(*) FROM {table}_archive)
+            FROM {table}
+        """, (cutoff,))
+        rows.append((table,) + tuple(db.cur.fetchone()))
+    db.rollback()
+    return rows
+
+
+def main(argv=None):
+    from database import Database
+
+    parser = argparse.ArgumentParser(prog='python archive.py', description='Geschlossene Satellitenversionen archivieren')
+    sub = parser.add_subparsers(dest='command', required=True)
+    run = sub.add_parser('run', help='Versionen vor dem Stichtag archivieren')
+    run.add_argument('--table', action='append', choices=sorted(SATELLITES), help='Nur diesen Satelliten')
+    run.add_argument('--batch-size', type=int, default=ARCHIVE_BATCH_SIZE)
+    run.add_argument('--pause-ms', type=int, default=0, help='Pause zwischen den Stapeln')
+    run.add_argument('--no-vacuum', dest='vacuum', action='store_false')
+    for command in (run, sub.add_parser('status', help='Versionen je Satellit anzeigen')):
+        command.add_argument('--older-than-days', type=int, default=ARCHIVE_AFTER_DAYS,
+                             help='Stichtag: vor so vielen Tagen geschlossen')
+    args = parser.parse_args(argv)
+
+    cutoff = datetime.now() - timedelta(days=args.older_than_days)
+    db = Database()
+    try:
+        if args.command == 'status':
+            print(f"Stichtag: {cutoff:%Y-%m-%d %H:%M}")
+            print(f"{'Satellit':<32} {'offen':>10} {'geschlossen':>12} {'archivierbar':>13} {'archiviert':>11}")
+            for table, current, closed, due, archived in status(db, cutoff):
+                print(f"{table:<32} {current:>10} {closed:>12} {due:>13} {archived:>11}")
+            return
+        for table in args.table or SATELLITES:
+            total = archive_table(db, table, cutoff, args.batch_size, args.pause_ms / 1000.0, args.vacuum)
+            print(f"{table}: {total} Versionen vor {cutoff:%Y-%m-%d} archiviert")
+    finally:
+        db.close()
+
+
+if __name__ == '__main__':
+    sys.exit(main())
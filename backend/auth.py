@@ -4,6 +4,8 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from datetime import datetime
 from log import log_event
 from database import Database
+from identity import identity_claims
+from temporal import parse_temporal_args
 import traceback
 import uuid  # Stelle sicher, dass uuid importiert wird
 
@@ -48,7 +50,7 @@ def register():
         password_hash = generate_password_hash(data['password'])
         
         # ENTWEDER Option 1: Verwende die insert_user-Methode (empfohlen)
-        db.insert_user(
+        hk_user = db.insert_user(
             data['email'],
             data['firstName'],
             data['lastName'],
@@ -66,7 +68,7 @@ def register():
         #     (hk_user, user_id, 'WEB_APP')
         # )
         
-        log_event('registration_success', user_id=data['email'])
+        log_event('registration_success', user_id=data['email'], hk_user=hk_user)
         print("Registrierung erfolgreich abgeschlossen")
         db.close()
         return jsonify({
@@ -108,21 +110,22 @@ def login():
         print("Überprüfe Passwort...")
         if user[7] is None:
             print("Kein Passwort-Hash für Benutzer gefunden")
-            log_event('login_failed', user_id=user[1], details={'reason': 'no_password_hash'})
+            log_event('login_failed', user_id=user[1], hk_user=user[0], details={'reason': 'no_password_hash'})
             return jsonify({
                 'success': False,
                 'message': 'Kein Passwort für diesen Benutzer gespeichert. Bitte wenden Sie sich an den Administrator.'
             }), 400
         if not check_password_hash(user[7], data['password']):
             print("Falsches Passwort")
-            log_event('login_failed', user_id=user[1], details={'reason': 'incorrect_password'})
+            log_event('login_failed', user_id=user[1], hk_user=user[0], details={'reason': 'incorrect_password'})
             return jsonify({
                 'success': False,
                 'message': 'Falscher Benutzername oder Passwort'
             }), 401
         print("Login erfolgreich, erstelle JWT...")
-        access_token = create_access_token(identity=user[1])
-        log_event('login_success', user_id=user[1])
+        # hk_user und Admin-Flag reisen im Token mit (siehe identity.py)
+        access_token = create_access_token(identity=user[1], additional_claims=identity_claims(user[0], user[8]))
+        log_event('login_success', user_id=user[1], hk_user=user[0])
         db.close()
         return jsonify({
             'success': True,
@@ -154,7 +157,11 @@ def profile():
     db = Database()
     try:
         if request.method == "GET":
-            user = db.get_user_by_email(current_user_email)
+            try:
+                temporal = parse_temporal_args(request.args)
+            except ValueError as e:
+                return jsonify({"error": str(e)}), 400
+            user = db.get_user_by_email(current_user_email, temporal)
             if user:
                 user_data = {
                     'firstName': user[2],
@@ -176,8 +183,8 @@ def profile():
             update_data = request.json
             if "currentProject" in update_data:
                 update_data["current_project"] = update_data.pop("currentProject")
-            db.update_user_details(user[0], update_data)
-            return jsonify({"message": "Profil erfolgreich aktualisiert"}), 200
+            created = db.update_user_details(user[0], update_data)
+            return jsonify({"message": "Profil erfolgreich aktualisiert", "versionCreated": created}), 200
     except Exception as e:
         return jsonify({"error": str(e)}), 500
     finally:
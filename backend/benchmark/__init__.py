@@ -0,0 +1 @@
+"""Last- und Vergleichsmessungen für das Backend."""
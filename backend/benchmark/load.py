@@ -0,0 +1,107 @@
+"""
+Einfacher HTTP-Lastgenerator ohne Fremdabhängigkeiten.
+
+Mehrere Threads senden über je eine eigene Keep-Alive-Verbindung so viele
+Requests wie möglich, bis die Messdauer abgelaufen ist. Welche Requests
+gesendet werden, bestimmt eine Funktion pro Szenario. Gemessen werden
+Latenz je Request, Fehler und der Durchsatz insgesamt.
+"""
+
+import http.client
+import threading
+import time
+from urllib.parse import urlsplit
+
+
+def percentile(values, pct):
+    """Perzentil (nächster Rang) einer unsortierten Liste; ``None`` bei leerer Liste."""
+    if not values:
+        return None
+    ordered = sorted(values)
+    index = max(0, min(len(ordered) - 1, int(round(pct / 100.0 * len(ordered))) - 1))
+    return ordered[index]
+
+
+def summarize(latencies, errors, duration):
+    """Fasst Latenzen (Sekunden) zu Kennzahlen in Millisekunden zusammen."""
+    total = len(latencies) + errors
+    ms = [x * 1000.0 for x in latencies]
+    return {
+        'requests': total,
+        'errors': errors,
+        'duration_s': round(duration, 3),
+        'rps': round(len(latencies) / duration, 1) if duration > 0 else 0.0,
+        'p50_ms': round(percentile(ms, 50), 2) if ms else None,
+        'p95_ms': round(percentile(ms, 95), 2) if ms else None,
+        'p99_ms': round(percentile(ms, 99), 2) if ms else None,
+        'max_ms': round(max(ms), 2) if ms else None,
+    }
+
+
+def _worker(base_url, make_request, stop_at, latencies, errors, lock):
+    parts = urlsplit(base_url)
+    conn = http.client.HTTPConnection(parts.hostname, parts.port or 80, timeout=30)
+    local_latencies = []
+    local_errors = 0
+    i = 0
+    while time.monotonic() < stop_at:
+        method, path, headers, body = make_request(i)
+        i += 1
+        started = time.perf_counter()
+        try:
+            conn.request(method, path, body=body, headers=headers or {})
+            response = conn.getresponse()
+            response.read()
+            if response.status >= 400:
+                local_errors += 1
+            else:
+                local_latencies.append(time.perf_counter() - started)
+            if response.getheader('Connection', '').lower() == 'close':
+                conn.close()
+        except (OSError, http.client.HTTPException):
+            local_errors += 1
+            conn.close()
+    conn.close()
+    with lock:
+        latencies.extend(local_latencies)
+        errors[0] += local_errors
+
+
+def run_scenario(base_url, make_request, concurrency=8, duration=10.0):
+    """
+    Belastet den Server für ``duration`` Sekunden mit ``concurrency`` parallelen Verbindungen.
+
+    Args:
+        base_url (str): z.B. ``http://127.0.0.1:5050``
+        make_request: Funktion ``(laufende Nummer) -> (method, path, headers, body)``;
+            wird pro Verbindung aufgerufen und darf z.B. Benutzer oder IDs rotieren
+
+    Returns:
+        dict: Kennzahlen wie in summarize(); Antworten mit Status >= 400 zählen als Fehler
+    """
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    started = time.monotonic()
+    stop_at = started + duration
+    threads = [
+        threading.Thread(
+            target=_worker,
+            args=(base_url, make_request, stop_at, latencies, errors, lock),
+            daemon=True
+        )
+        for _ in range(concurrency)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    return summarize(latencies, errors[0], time.monotonic() - started)
+
+
+def run_load(url, concurrency=8, duration=10.0, method='GET', headers=None, body=None):
+    """Belastet eine einzelne URL mit immer demselben Request (siehe run_scenario)."""
+    parts = urlsplit(url)
+    path = parts.path + ('?' + parts.query if parts.query else '')
+    base_url = f'{parts.scheme}://{parts.netloc}'
+    return run_scenario(base_url, lambda i: (method, path, headers, body), concurrency, duration)
@@ -0,0 +1,185 @@
+"""
+Lokale PostgreSQL-Instanz für Benchmarks.
+
+Betriebsarten:
+  * ``native``   – initdb/pg_ctl aus PATH oder PG_BIN (nicht als root ausführbar)
+  * ``docker``   – Container ``postgres:15`` auf einem freien Port
+  * ``external`` – vorhandene Datenbank aus den DB_*-Umgebungsvariablen
+  * ``auto``     – native, sonst docker
+
+Native und Docker laden pg_stat_statements, damit die Suite die Anzahl
+Abfragen pro Request ermitteln kann.
+"""
+
+import os
+import shutil
+import subprocess
+import tempfile
+import time
+
+import psycopg2
+
+from benchmark.server import free_port
+from db_pool import connection_params
+
+POSTGRES_IMAGE = os.getenv('BENCH_POSTGRES_IMAGE', 'postgres:15')
+SERVER_OPTIONS = [
+    '-c', 'shared_preload_libraries=pg_stat_statements',
+    '-c', 'pg_stat_statements.track=all',
+    '-c', 'pg_stat_statements.track_utility=off',
+    '-c', 'max_connections=200',
+]
+
+
+def _pg_tool(name):
+    pg_bin = os.getenv('PG_BIN')
+    if pg_bin:
+        path = os.path.join(pg_bin, name)
+        return path if os.path.exists(path) else None
+    return shutil.which(name)
+
+
+class LocalPostgres:
+    """Startet (oder verwendet) eine Datenbank und liefert die DB_*-Umgebungsvariablen dafür."""
+
+    def __init__(self, mode='auto', dbname='mitarbeiterportal_bench'):
+        self.mode = mode
+        self.dbname = dbname
+        self.params = None
+        self._datadir = None
+        self._container = None
+
+    def start(self):
+        mode = self.mode
+        if mode == 'auto':
+            if _pg_tool('initdb') and os.geteuid() != 0:
+                mode = 'native'
+            elif shutil.which('docker'):
+                mode = 'docker'
+            else:
+                raise RuntimeError(
+                    "Weder initdb (als Nicht-root) noch docker gefunden – "
+                    "mit --postgres external eine vorhandene Datenbank verwenden"
+                )
+        self.mode = mode
+        if mode == 'native':
+            self._start_native()
+        elif mode == 'docker':
+            self._start_docker()
+        elif mode == 'external':
+            self.params = connection_params()
+        else:
+            raise ValueError(f'Unbekannte Betriebsart: {mode}')
+        self._ensure_stat_statements()
+        return self
+
+    def _start_native(self):
+        port = free_port()
+        self._datadir = tempfile.mkdtemp(prefix='bench-pg-')
+        subprocess.run(
+            [_pg_tool('initdb'), '-D', self._datadir, '-U', 'bench', '--auth=trust', '-E', 'UTF8'],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        options = ' '.join(SERVER_OPTIONS + ['-p', str(port), '-c', f'unix_socket_directories={self._datadir}',
+                                             '-c', 'listen_addresses=127.0.0.1'])
+        subprocess.run(
+            [_pg_tool('pg_ctl'), '-D', self._datadir, '-o', options, '-l',
+             os.path.join(self._datadir, 'server.log'), '-w', 'start'],
+            check=True, stdout=subprocess.DEVNULL
+        )
+        admin = psycopg2.connect(host='127.0.0.1', port=port, user='bench', dbname='postgres')
+        admin.autocommit = True
+        with admin.cursor() as cur:
+            cur.execute(f'CREATE DATABASE "{self.dbname}"')
+        admin.close()
+        self.params = {'host': '127.0.0.1', 'port': str(port), 'dbname': self.dbname,
+                       'user': 'bench', 'password': ''}
+
+    def _start_docker(self):
+        port = free_port()
+        self._container = f'bench-pg-{port}'
+        subprocess.run(
+            ['docker', 'run', '-d', '--rm', '--name', self._container,
+             '-e', 'POSTGRES_USER=bench', '-e', 'POSTGRES_PASSWORD=bench', '-e', f'POSTGRES_DB={self.dbname}',
+             '-p', f'127.0.0.1:{port}:5432', POSTGRES_IMAGE] + SERVER_OPTIONS,
+            check=True, stdout=subprocess.DEVNULL
+        )
+        self.params = {'host': '127.0.0.1', 'port': str(port), 'dbname': self.dbname,
+                       'user': 'bench', 'password': 'bench'}
+        deadline = time.monotonic() + 60
+        while True:
+            try:
+                psycopg2.connect(**self.params).close()
+                break
+            except psycopg2.OperationalError:
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.5)
+
+    def _ensure_stat_statements(self):
+        conn = psycopg2.connect(**self.params)
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("CREATE EXTENSION IF NOT EXISTS pg_stat_statements")
+            self.has_stat_statements = True
+        except psycopg2.Error:
+            # z.B. externe Datenbank ohne shared_preload_libraries
+            self.has_stat_statements = False
+        finally:
+            conn.close()
+
+    def env(self):
+        """DB_*-Variablen für Backend-Prozesse und Database()."""
+        return {
+            'DB_HOST': self.params['host'],
+            'DB_PORT': str(self.params['port']),
+            'DB_NAME': self.params['dbname'],
+            'DB_USER': self.params['user'],
+            'DB_PASSWORD': self.params['password'] or '',
+        }
+
+    def connect(self):
+        return psycopg2.connect(**self.params)
+
+    def reset_statement_stats(self):
+        if not self.has_stat_statements:
+            return
+        conn = self.connect()
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_stat_statements_reset()")
+        conn.close()
+
+    def statement_count(self):
+        """Summe der ausgeführten Anweisungen in der Benchmark-Datenbank (ohne die eigene Abfrage)."""
+        if not self.has_stat_statements:
+            return None
+        conn = self.connect()
+        conn.autocommit = True
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT COALESCE(SUM(calls), 0)
+                FROM pg_stat_statements
+                WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+                  AND query NOT ILIKE '%%pg_stat_statements%%'
+            """)
+            count = int(cur.fetchone()[0])
+        conn.close()
+        return count
+
+    def stop(self):
+        if self.mode == 'native' and self._datadir:
+            subprocess.run([_pg_tool('pg_ctl'), '-D', self._datadir, '-m', 'fast', '-w', 'stop'],
+                           stdout=subprocess.DEVNULL)
+            shutil.rmtree(self._datadir, ignore_errors=True)
+            self._datadir = None
+        elif self.mode == 'docker' and self._container:
+            subprocess.run(['docker', 'stop', self._container], stdout=subprocess.DEVNULL)
+            self._container = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,269 @@
+"""
+Lastszenarien je Blueprint-Endpunkt.
+
+Ein Szenario ist eine Funktion ``(laufende Nummer) -> (method, path, headers, body)``.
+Benutzer, Projekte und Kunden rotieren, damit nicht nur ein einzelner
+Datensatz aus dem Cache gelesen wird.
+
+Die schreibenden Szenarien (``--writes``) verändern den geseedeten Bestand;
+ein späterer Lauf sollte mit ``--reseed`` beginnen. Löschende Szenarien
+verbrauchen ihre Ziele über einen gemeinsamen Zähler (die laufende Nummer
+zählt je Verbindung); sind alle verbraucht, antworten sie mit 404 und
+erscheinen als Fehler.
+"""
+
+import itertools
+import json
+import time
+import urllib.request
+from collections import defaultdict
+from datetime import date, timedelta
+
+from benchmark.seed import BENCH_PASSWORD, project_name, user_email
+
+JSON_HEADERS = {'Content-Type': 'application/json'}
+# Zeiteinträge je Token-Benutzer, die Änderungs- und Löschszenarien nutzen
+WRITE_TARGETS_PER_USER = 2000
+IMPORT_ROWS = 100
+UNKNOWN_KEY = '00000000-0000-0000-0000-000000000000'
+
+
+def login(base_url, email, password=BENCH_PASSWORD):
+    """Meldet einen Benutzer an und gibt das Access-Token zurück."""
+    request = urllib.request.Request(
+        base_url + '/api/login',
+        data=json.dumps({'email': email, 'password': password}).encode(),
+        headers=JSON_HEADERS, method='POST'
+    )
+    with urllib.request.urlopen(request, timeout=30) as response:
+        return json.loads(response.read())['access_token']
+
+
+class ScenarioContext:
+    """Tokens und Schlüssel, aus denen die Szenarien ihre Requests bauen."""
+
+    def __init__(self, base_url, conn, token_users=20, writes=False):
+        self.base_url = base_url
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM h_user WHERE rec_src = 'benchmark'")
+            users = cur.fetchone()[0]
+            cur.execute("SELECT hk_project::text, project_name FROM h_project WHERE rec_src = 'benchmark' ORDER BY 2 LIMIT 200")
+            projects = cur.fetchall()
+            cur.execute("SELECT hk_customer::text, customer_name FROM h_customer WHERE rec_src = 'benchmark' ORDER BY 1 LIMIT 200")
+            customers = cur.fetchall()
+        conn.rollback()
+        self.user_count = users
+        self.project_keys = [row[0] for row in projects]
+        self.project_names = [row[1] for row in projects] or [project_name(1)]
+        self.customer_keys = [row[0] for row in customers]
+        self.customer_names = [row[1] for row in customers]
+        # Benutzer 1 ist Admin (siehe seed.py)
+        self.admin_token = login(base_url, user_email(1))
+        step = max(1, users // token_users)
+        self.emails = [user_email(n) for n in range(2, users + 1, step)][:token_users] or [user_email(1)]
+        self.tokens = [login(base_url, email) for email in self.emails]
+        if writes:
+            self._load_write_targets(conn)
+
+    def _load_write_targets(self, conn):
+        """Zeiteinträge der Token-Benutzer sowie Benutzer und Projekte, die gelöscht werden dürfen."""
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT user_id, timeentry_id::text
+                FROM (
+                    SELECT h.user_id, p.timeentry_id,
+                           ROW_NUMBER() OVER (PARTITION BY h.user_id ORDER BY p.entry_date DESC, p.timeentry_id) AS nr
+                    FROM pit_timeentry p
+                    JOIN h_user h ON h.hk_user = p.hk_user
+                    WHERE h.user_id = ANY(%s)
+                ) e
+                WHERE nr <= %s
+            """, (self.emails, WRITE_TARGETS_PER_USER))
+            entries = {}
+            for email, timeentry_id in cur.fetchall():
+                entries.setdefault(email, []).append(timeentry_id)
+            # Nur Projekte außerhalb der gelesenen, die übrigen Szenarien behalten ihre
+            cur.execute("""
+                SELECT hk_project::text FROM h_project
+                WHERE rec_src = 'benchmark' AND t_to IS NULL AND NOT hk_project::text = ANY(%s)
+                ORDER BY project_name
+            """, (self.project_keys,))
+            self.spare_project_keys = [row[0] for row in cur.fetchall()]
+        conn.rollback()
+        if not self.spare_project_keys and len(self.project_keys) > 1:
+            # Kleiner Bestand: das letzte Viertel der Projekte nur zum Löschen verwenden
+            keep = len(self.project_keys) - max(1, len(self.project_keys) // 4)
+            self.spare_project_keys = self.project_keys[keep:]
+            self.project_keys = self.project_keys[:keep]
+            self.project_names = self.project_names[:keep]
+        # Je Token-Benutzer abwechselnd ein Eintrag zum Ändern und einer zum Löschen
+        self.update_entries = [entries.get(email, [])[0::2] for email in self.emails]
+        self.delete_entries = [entries.get(email, [])[1::2] for email in self.emails]
+        # Admin und Token-Benutzer bleiben erhalten
+        keep = set(self.emails) | {user_email(1)}
+        self.spare_emails = [user_email(n) for n in range(self.user_count, 1, -1) if user_email(n) not in keep]
+
+    def auth(self, i):
+        return {'Authorization': f'Bearer {self.tokens[i % len(self.tokens)]}'}
+
+
+def build_scenarios(ctx, include_writes=False):
+    """
+    Returns:
+        dict: Name -> Request-Funktion, gruppiert nach Blueprint (``blueprint.aktion``)
+    """
+    today = date.today()
+    month_end = today.replace(day=1) - timedelta(days=1)
+    month_start = month_end.replace(day=1)
+    admin = {'Authorization': f'Bearer {ctx.admin_token}'}
+
+    def login_body(i):
+        return json.dumps({'email': ctx.emails[i % len(ctx.emails)], 'password': BENCH_PASSWORD})
+
+    scenarios = {
+        'auth.ping': lambda i: ('GET', '/api/ping', None, None),
+        'auth.login': lambda i: ('POST', '/api/login', JSON_HEADERS, login_body(i)),
+        'auth.profile': lambda i: ('GET', '/api/profile', ctx.auth(i), None),
+        'project.list': lambda i: ('GET', '/api/projects', ctx.auth(i), None),
+        'customer.list': lambda i: ('GET', '/api/customers', ctx.auth(i), None),
+        'time_matrix.page': lambda i: ('GET', '/api/time-entries?limit=50', ctx.auth(i), None),
+        'time_matrix.month': lambda i: (
+            'GET', f'/api/time-entries?from={month_start.isoformat()}&to={month_end.isoformat()}', ctx.auth(i), None
+        ),
+        'dashboard.summary': lambda i: ('GET', '/api/dashboard/summary', ctx.auth(i), None),
+        'admin.users': lambda i: ('GET', '/api/admin/users', admin, None),
+    }
+    if ctx.project_keys:
+        scenarios['project.detail'] = lambda i: (
+            'GET', f'/api/projects/{ctx.project_keys[i % len(ctx.project_keys)]}', ctx.auth(i), None
+        )
+    if ctx.customer_keys:
+        scenarios['customer.detail'] = lambda i: (
+            'GET', f'/api/customers/{ctx.customer_keys[i % len(ctx.customer_keys)]}', ctx.auth(i), None
+        )
+
+    # Gemischte Last ohne Login (teures Passwort-Hashing würde dominieren)
+    mix = [name for name in scenarios if name not in ('auth.ping', 'auth.login')]
+    weights = {'time_matrix.page': 4, 'dashboard.summary': 3, 'project.list': 2, 'customer.list': 2}
+    mixed = [scenarios[name] for name in mix for _ in range(weights.get(name, 1))]
+    scenarios['mixed'] = lambda i: mixed[i % len(mixed)](i // len(mixed))
+
+    # Lesende Szenarien außerhalb des Mix: Protokolle und gestreamte CSV-Exporte
+    scenarios['admin.logs'] = lambda i: ('GET', '/api/admin/logs?limit=100', admin, None)
+    scenarios['admin.logs_daily'] = lambda i: (
+        'GET', f'/api/admin/logs/daily?from={(today - timedelta(days=30)).isoformat()}', admin, None
+    )
+    scenarios['admin.users_csv'] = lambda i: ('GET', '/api/admin/users?format=csv', admin, None)
+    scenarios['time_matrix.export_csv'] = lambda i: ('GET', '/api/time-entries?format=csv', ctx.auth(i), None)
+
+    if include_writes:
+        scenarios.update(build_write_scenarios(ctx, today, admin))
+    return scenarios
+
+
+def build_write_scenarios(ctx, today, admin):
+    """Schreibende Szenarien (siehe Moduldokumentation)."""
+    # Laufkennung für eindeutige Namen neuer Projekte und Kunden
+    run = int(time.time())
+    # Laufende Nummer je Szenario über alle Verbindungen
+    sequence = defaultdict(itertools.count)
+    tokens = len(ctx.tokens)
+
+    def entry_body(i, minutes=30):
+        entry_date = today - timedelta(days=1 + i % 30)
+        return {
+            'datum': entry_date.isoformat(), 'beginn': '18:00', 'ende': f'18:{minutes:02d}', 'pause': 0,
+            'projekt': ctx.project_names[i % len(ctx.project_names)],
+            'arbeitsort': 'Homeoffice', 'beschreibung': f'Benchmark {i}',
+        }
+
+    def add_entry(i):
+        return 'POST', '/api/time-entries', dict(JSON_HEADERS, **ctx.auth(i)), json.dumps(entry_body(i))
+
+    def update_entry(i):
+        n = next(sequence['time_matrix.update'])
+        targets = ctx.update_entries[n % tokens]
+        entry_id = targets[(n // tokens) % len(targets)] if targets else UNKNOWN_KEY
+        # Wechselndes Ende, damit jede Änderung eine neue Version schreibt
+        body = json.dumps(entry_body(n, minutes=10 + n % 50))
+        return 'PUT', f'/api/time-entries/{entry_id}', dict(JSON_HEADERS, **ctx.auth(n)), body
+
+    def delete_entry(i):
+        n = next(sequence['time_matrix.delete'])
+        targets = ctx.delete_entries[n % tokens]
+        entry_id = targets[n // tokens] if n // tokens < len(targets) else UNKNOWN_KEY
+        return 'DELETE', f'/api/time-entries/{entry_id}', ctx.auth(n), None
+
+    def import_entries(i):
+        n = next(sequence['time_matrix.import'])
+        rows = [entry_body(n * IMPORT_ROWS + row) for row in range(IMPORT_ROWS)]
+        return 'POST', '/api/time-entries/import', dict(JSON_HEADERS, **ctx.auth(n)), json.dumps(rows)
+
+    def create_project(i):
+        n = next(sequence['project.create'])
+        body = json.dumps({
+            'project_name': f'Bench-Neu {run}-{n}',
+            'customer_id': ctx.customer_keys[n % len(ctx.customer_keys)],
+            'description': 'Benchmark', 'budget_days': 10,
+        })
+        return 'POST', '/api/projects', dict(JSON_HEADERS, **ctx.auth(n)), body
+
+    def update_project(i):
+        n = next(sequence['project.update'])
+        index = n % len(ctx.project_keys)
+        # Der Name bleibt: die Zeiteintrag-Szenarien finden Projekte über ihn
+        body = json.dumps({
+            'project_name': ctx.project_names[index],
+            'customer_id': ctx.customer_keys[n % len(ctx.customer_keys)],
+            'description': f'Benchmark {n}', 'budget_days': 10 + n % 100,
+        })
+        return 'PUT', f'/api/projects/{ctx.project_keys[index]}', dict(JSON_HEADERS, **ctx.auth(n)), body
+
+    def delete_project(i):
+        n = next(sequence['project.delete'])
+        key = ctx.spare_project_keys[n] if n < len(ctx.spare_project_keys) else UNKNOWN_KEY
+        return 'DELETE', f'/api/projects/{key}', ctx.auth(n), None
+
+    def create_customer(i):
+        n = next(sequence['customer.create'])
+        body = json.dumps({'customer_name': f'Bench-Kunde neu {run}-{n}', 'address': 'Benchmarkweg 1'})
+        return 'POST', '/api/customers', dict(JSON_HEADERS, **ctx.auth(n)), body
+
+    def update_customer(i):
+        n = next(sequence['customer.update'])
+        index = n % len(ctx.customer_keys)
+        body = json.dumps({'customer_name': ctx.customer_names[index], 'address': f'Benchmarkweg {n}'})
+        return 'PUT', f'/api/customers/{ctx.customer_keys[index]}', dict(JSON_HEADERS, **ctx.auth(n)), body
+
+    def update_user(i):
+        n = next(sequence['admin.update_user'])
+        # isAdmin bleibt False; ein Rollenwechsel würde die Tokens des Benutzers sperren
+        body = json.dumps({
+            'firstName': 'Bench', 'lastName': f'Benutzer {n % len(ctx.emails)}',
+            'position': f'Position {n}', 'coreHours': '09:00-17:00', 'phone': '', 'isAdmin': False,
+        })
+        return 'PUT', f'/api/admin/users/{ctx.emails[n % len(ctx.emails)]}', dict(JSON_HEADERS, **admin), body
+
+    def delete_user(i):
+        n = next(sequence['admin.delete_user'])
+        email = ctx.spare_emails[n] if n < len(ctx.spare_emails) else 'unbekannt@benchmark.local'
+        return 'DELETE', f'/api/admin/users/{email}', admin, None
+
+    scenarios = {
+        'time_matrix.add': add_entry,
+        'time_matrix.update': update_entry,
+        'time_matrix.delete': delete_entry,
+        'time_matrix.import': import_entries,
+        'admin.update_user': update_user,
+        'admin.delete_user': delete_user,
+    }
+    if ctx.project_keys and ctx.customer_keys:
+        scenarios.update({
+            'project.create': create_project,
+            'project.update': update_project,
+            'customer.create': create_customer,
+            'customer.update': update_customer,
+        })
+    if ctx.spare_project_keys:
+        scenarios['project.delete'] = delete_project
+    return scenarios
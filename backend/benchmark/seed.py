@@ -0,0 +1,228 @@
+"""
+Befüllt eine leere Datenbank mit einem synthetischen Data-Vault-Datenbestand.
+
+Das Schema kommt aus den regulären Migrationen (migrate.py), die Daten
+werden mengenbasiert mit generate_series erzeugt. Schlüssel sind aus der
+laufenden Nummer abgeleitet (md5 → uuid), damit Satelliten ohne Join auf
+ihre Hubs/Links verweisen können und Läufe reproduzierbar bleiben.
+
+Zeiteinträge erhalten eine gestaffelte Historie: ein Eintrag hat zwischen 1
+und 2 × history_depth − 1 Versionen (im Mittel history_depth), von denen
+nur die jüngste offen ist (t_to IS NULL).
+"""
+
+import time
+from datetime import date, datetime, timedelta
+
+from werkzeug.security import generate_password_hash
+
+BENCH_PASSWORD = 'bench-passwort'
+BENCH_REC_SRC = 'benchmark'
+
+SCALES = {
+    'small': {'users': 50, 'projects': 20, 'customers': 5, 'versions': 50_000, 'history_depth': 2},
+    'medium': {'users': 200, 'projects': 100, 'customers': 20, 'versions': 500_000, 'history_depth': 3},
+    'large': {'users': 1000, 'projects': 500, 'customers': 50, 'versions': 5_000_000, 'history_depth': 3},
+}
+
+# Verbindungen pro Stapel beim Erzeugen der Zeiteinträge
+LINK_BATCH = 100_000
+
+
+def user_email(n):
+    return f'bench{n}@benchmark.local'
+
+
+def project_name(n):
+    return f'Bench-Projekt {n}'
+
+
+def _progress(message, started):
+    print(f"[{time.monotonic() - started:7.1f}s] {message}", flush=True)
+
+
+def seed_master_data(cur, users, projects, customers, password_hash):
+    """Benutzer (mit einer historisierten Version), Kunden, Projekte und aktuelle Projektzuordnung."""
+    cur.execute("""
+        INSERT INTO h_user (hk_user, user_id, t_from, rec_src)
+        SELECT md5('bench-user-' || g)::uuid, 'bench' || g || '@benchmark.local',
+               CURRENT_TIMESTAMP - interval '400 days', %(src)s
+        FROM generate_series(1, %(users)s) g
+    """, {'users': users, 'src': BENCH_REC_SRC})
+    cur.execute("""
+        INSERT INTO s_user_details (hk_user, t_from, t_to, b_from, rec_src, first_name, last_name,
+                                    position, core_hours, telefon, is_admin)
+        SELECT md5('bench-user-' || g)::uuid, v.t_from, v.t_to, v.t_from::date, %(src)s,
+               'Vorname' || g, 'Nachname' || g,
+               CASE WHEN v.t_to IS NULL THEN 'Entwickler' ELSE 'Praktikant' END,
+               '08:00-16:30', '+49 000 ' || g, g = 1
+        FROM generate_series(1, %(users)s) g
+        CROSS JOIN (VALUES
+            (CURRENT_TIMESTAMP - interval '400 days', CURRENT_TIMESTAMP - interval '200 days'),
+            (CURRENT_TIMESTAMP - interval '200 days', NULL::timestamp)
+        ) AS v(t_from, t_to)
+    """, {'users': users, 'src': BENCH_REC_SRC})
+    cur.execute("""
+        INSERT INTO s_user_login (hk_user, t_from, b_from, rec_src, password_hash)
+        SELECT md5('bench-user-' || g)::uuid, CURRENT_TIMESTAMP - interval '400 days',
+               CURRENT_DATE - 400, %(src)s, %(hash)s
+        FROM generate_series(1, %(users)s) g
+    """, {'users': users, 'src': BENCH_REC_SRC, 'hash': password_hash})
+
+    cur.execute("""
+        INSERT INTO h_customer (hk_customer, customer_name, t_from, rec_src)
+        SELECT md5('bench-customer-' || g)::uuid, 'Bench-Kunde ' || g,
+               CURRENT_TIMESTAMP - interval '400 days', %(src)s
+        FROM generate_series(1, %(customers)s) g
+    """, {'customers': customers, 'src': BENCH_REC_SRC})
+    cur.execute("""
+        INSERT INTO s_customer_details (hk_customer, t_from, b_from, rec_src, address, contact_person)
+        SELECT md5('bench-customer-' || g)::uuid, CURRENT_TIMESTAMP - interval '400 days',
+               CURRENT_DATE - 400, %(src)s, 'Musterstraße ' || g, 'Ansprechpartner ' || g
+        FROM generate_series(1, %(customers)s) g
+    """, {'customers': customers, 'src': BENCH_REC_SRC})
+
+    cur.execute("""
+        INSERT INTO h_project (hk_project, project_name, t_from, rec_src)
+        SELECT md5('bench-project-' || g)::uuid, 'Bench-Projekt ' || g,
+               CURRENT_TIMESTAMP - interval '400 days', %(src)s
+        FROM generate_series(1, %(projects)s) g
+    """, {'projects': projects, 'src': BENCH_REC_SRC})
+    cur.execute("""
+        INSERT INTO s_project_details (hk_project, t_from, t_to, b_from, rec_src, project_name, description,
+                                       customer_id, start_date, end_date, budget_days)
+        SELECT md5('bench-project-' || g)::uuid, v.t_from, v.t_to, v.t_from::date, %(src)s,
+               'Bench-Projekt ' || g, 'Beschreibung ' || g,
+               md5('bench-customer-' || (1 + g %% %(customers)s))::uuid,
+               CURRENT_DATE - 400, CURRENT_DATE + 365, CASE WHEN v.t_to IS NULL THEN 120 ELSE 100 END
+        FROM generate_series(1, %(projects)s) g
+        CROSS JOIN (VALUES
+            (CURRENT_TIMESTAMP - interval '400 days', CURRENT_TIMESTAMP - interval '100 days'),
+            (CURRENT_TIMESTAMP - interval '100 days', NULL::timestamp)
+        ) AS v(t_from, t_to)
+    """, {'projects': projects, 'customers': customers, 'src': BENCH_REC_SRC})
+    cur.execute("""
+        INSERT INTO s_user_current_project (hk_user, t_from, b_from, rec_src, hk_project)
+        SELECT md5('bench-user-' || g)::uuid, CURRENT_TIMESTAMP - interval '400 days', CURRENT_DATE - 400,
+               %(src)s, md5('bench-project-' || (1 + g %% %(projects)s))::uuid
+        FROM generate_series(1, %(users)s) g
+    """, {'users': users, 'projects': projects, 'src': BENCH_REC_SRC})
+
+
+def seed_timeentries(cur, first, last, users, projects, history_depth):
+    """
+    Legt die Links first..last samt Satellitenversionen an.
+
+    Eintrag g gehört Benutzer 1 + g % users; die Einträge eines Benutzers
+    verteilen sich rückwärts über die letzten 365 Tage (ab gestern).
+    """
+    params = {'first': first, 'last': last, 'users': users, 'projects': projects,
+              'spread': 2 * history_depth - 1, 'src': BENCH_REC_SRC}
+    cur.execute("""
+        INSERT INTO l_user_project_timeentry (hk_user_project_timeentry, hk_user, hk_project,
+                                              timeentry_id, t_from, rec_src)
+        SELECT md5('bench-link-' || g)::uuid,
+               md5('bench-user-' || (1 + g %% %(users)s))::uuid,
+               md5('bench-project-' || (1 + (g / %(users)s) %% %(projects)s))::uuid,
+               md5('bench-entry-' || g)::uuid::text,
+               (CURRENT_DATE - 1 - ((g / %(users)s) %% 365))::timestamp + interval '17 hours',
+               %(src)s
+        FROM generate_series(%(first)s, %(last)s) g
+    """, params)
+    cur.execute("""
+        INSERT INTO s_timeentry_details (hk_user_project_timeentry, t_from, t_to, b_from, rec_src,
+                                         entry_date, start_time, end_time, pause_minutes,
+                                         work_location, description)
+        SELECT md5('bench-link-' || g)::uuid,
+               x.d::timestamp + interval '17 hours' + v * interval '1 minute',
+               CASE WHEN v < x.n THEN x.d::timestamp + interval '17 hours' + (v + 1) * interval '1 minute' END,
+               x.d, %(src)s, x.d,
+               x.start_time,
+               x.start_time + interval '45 minutes' + v * interval '15 minutes',
+               CASE WHEN v %% 2 = 0 THEN 0 ELSE 15 END,
+               (ARRAY['Büro', 'Homeoffice', 'Kunde'])[1 + g %% 3],
+               'Version ' || v
+        FROM generate_series(%(first)s, %(last)s) g
+        CROSS JOIN LATERAL (
+            SELECT 1 + (g * 7919) %% %(spread)s AS n,
+                   CURRENT_DATE - 1 - ((g / %(users)s) %% 365) AS d,
+                   time '06:00' + ((g / %(users)s / 365) %% 10) * interval '1 hour' AS start_time
+        ) x
+        CROSS JOIN LATERAL generate_series(1, x.n) v
+    """, params)
+
+
+def seed(conn, scale):
+    """
+    Befüllt die Datenbank hinter ``conn`` (Schema muss migriert und leer sein).
+
+    Args:
+        scale (dict): users, projects, customers, versions, history_depth
+
+    Returns:
+        dict: tatsächlich erzeugte Zeilenzahlen
+    """
+    started = time.monotonic()
+    users, projects = scale['users'], scale['projects']
+    depth = max(1, scale['history_depth'])
+    links = max(1, scale['versions'] // depth)
+
+    with conn.cursor() as cur:
+        cur.execute("SELECT COUNT(*) FROM h_user WHERE rec_src = %s", (BENCH_REC_SRC,))
+        if cur.fetchone()[0]:
+            raise RuntimeError("Datenbank enthält bereits Benchmark-Daten")
+        seed_master_data(cur, users, projects, scale['customers'], generate_password_hash(BENCH_PASSWORD))
+    conn.commit()
+    _progress(f"{users} Benutzer, {projects} Projekte, {scale['customers']} Kunden angelegt", started)
+
+    # Monatspartitionen für den gesamten Zeitraum vorab anlegen (sonst Default-Partition)
+    from partitions import ensure_partitions
+    with conn.cursor() as cur:
+        ensure_partitions(cur, 's_timeentry_details', date.today() - timedelta(days=366), date.today())
+    conn.commit()
+
+    for first in range(1, links + 1, LINK_BATCH):
+        last = min(links, first + LINK_BATCH - 1)
+        with conn.cursor() as cur:
+            seed_timeentries(cur, first, last, users, projects, depth)
+        conn.commit()
+        _progress(f"Zeiteinträge {last}/{links}", started)
+
+    # PIT-Tabellen und Tagessummen wie im Betrieb aus den Satelliten ableiten
+    from pit import rebuild_all
+    from rollup import rebuild
+
+    class _CursorDb:
+        def __init__(self, cur):
+            self.cur = cur
+
+        def execute(self, query, params=None):
+            self.cur.execute(query, params)
+
+    with conn.cursor() as cur:
+        rebuild_all(_CursorDb(cur))
+        rebuild(cur)
+    conn.commit()
+    _progress("PIT-Tabellen und Tagessummen aufgebaut", started)
+
+    conn.autocommit = True
+    with conn.cursor() as cur:
+        cur.execute("VACUUM ANALYZE")
+    conn.autocommit = False
+    _progress("VACUUM ANALYZE abgeschlossen", started)
+
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT (SELECT COUNT(*) FROM h_user), (SELECT COUNT(*) FROM h_project),
+                   (SELECT COUNT(*) FROM l_user_project_timeentry), (SELECT COUNT(*) FROM s_timeentry_details)
+        """)
+        counts = cur.fetchone()
+    return {
+        'users': counts[0],
+        'projects': counts[1],
+        'timeentries': counts[2],
+        'timeentry_versions': counts[3],
+        'history_depth': depth,
+        'seeded_at': datetime.now().isoformat(timespec='seconds'),
+        'seed_seconds': round(time.monotonic() - started, 1),
+    }
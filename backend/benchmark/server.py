@@ -0,0 +1,96 @@
+"""
+Starten und Stoppen des Backends für Messungen.
+"""
+
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def server_command(mode, port, workers=4, threads=4):
+    """Startbefehl und zusätzliche Umgebungsvariablen einer Betriebsart."""
+    if mode == 'flask-dev':
+        return (
+            [sys.executable, '-m', 'flask', '--app', 'app', 'run', '--host', '127.0.0.1', '--port', str(port)],
+            {'FLASK_DEBUG': '1'},
+        )
+    if mode == 'gunicorn':
+        return (
+            [sys.executable, '-m', 'gunicorn', '-c', 'gunicorn.conf.py', '--bind', f'127.0.0.1:{port}', 'wsgi:app'],
+            {'GUNICORN_WORKERS': str(workers), 'GUNICORN_THREADS': str(threads)},
+        )
+    raise ValueError(f'Unbekannte Betriebsart: {mode}')
+
+
+def wait_until_ready(url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return True
+        except urllib.error.HTTPError:
+            return True
+        except OSError:
+            time.sleep(0.2)
+    return False
+
+
+class BackendServer:
+    """
+    Startet das Backend als Unterprozess auf einem freien Port.
+
+    Verwendung:
+        with BackendServer('gunicorn', env={'DB_HOST': ...}) as server:
+            run_load(server.base_url + '/api/ping')
+    """
+
+    def __init__(self, mode='gunicorn', env=None, workers=4, threads=4, ready_path='/api/ping'):
+        self.mode = mode
+        self.port = free_port()
+        self.base_url = f'http://127.0.0.1:{self.port}'
+        self.env = env or {}
+        self.workers = workers
+        self.threads = threads
+        self.ready_path = ready_path
+        self.process = None
+
+    def start(self):
+        command, extra_env = server_command(self.mode, self.port, self.workers, self.threads)
+        env = dict(os.environ, **self.env, **extra_env)
+        self.process = subprocess.Popen(
+            command, cwd=BACKEND_DIR, env=env,
+            stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, start_new_session=True
+        )
+        if not wait_until_ready(self.base_url + self.ready_path):
+            self.stop()
+            raise RuntimeError(f'{self.mode}: Server nicht erreichbar')
+        return self
+
+    def stop(self):
+        if self.process is None:
+            return
+        try:
+            os.killpg(self.process.pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        self.process.wait(timeout=30)
+        self.process = None
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
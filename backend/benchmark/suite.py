@@ -0,0 +1,179 @@
+"""
+Endpunkt-Benchmark gegen einen geseedeten Data-Vault-Bestand.
+
+Ablauf von ``run``:
+  1. PostgreSQL starten (native, Docker oder vorhandene Datenbank)
+  2. Schema über migrate.py anlegen und synthetische Daten erzeugen
+  3. Backend (gunicorn oder flask-dev) gegen diese Datenbank starten
+  4. Jedes Szenario nacheinander mit N parallelen Verbindungen belasten
+  5. p50/p95/p99, RPS und Abfragen pro Request als JSON speichern
+
+``compare`` stellt zwei gespeicherte Läufe gegenüber.
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+from datetime import datetime
+
+from benchmark.load import run_scenario
+from benchmark.postgres import LocalPostgres
+from benchmark.scenarios import ScenarioContext, build_scenarios
+from benchmark.seed import SCALES, seed
+from benchmark.server import BACKEND_DIR, BackendServer
+
+RESULTS_DIR = os.path.join(BACKEND_DIR, 'benchmark', 'results')
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=BACKEND_DIR,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def prepare_database(pg, scale, reseed):
+    """Migriert das Schema und seedet, falls noch keine Benchmark-Daten vorhanden sind."""
+    # migrate.py und pit.py verbinden sich über die DB_*-Variablen
+    os.environ.update(pg.env())
+    import migrate
+    migrate.migrate()
+
+    conn = pg.connect()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT COUNT(*) FROM h_user WHERE rec_src = 'benchmark'")
+            seeded = cur.fetchone()[0] > 0
+        conn.rollback()
+        if seeded and not reseed:
+            print("Benchmark-Daten bereits vorhanden, Seeding übersprungen")
+            return None
+        return seed(conn, scale)
+    finally:
+        conn.close()
+
+
+def measure_scenarios(server, pg, scenarios, args):
+    results = {}
+    for name, make_request in scenarios.items():
+        run_scenario(server.base_url, make_request, concurrency=args.concurrency, duration=args.warmup)
+        pg.reset_statement_stats()
+        result = run_scenario(server.base_url, make_request, concurrency=args.concurrency, duration=args.duration)
+        statements = pg.statement_count()
+        result['queries_per_request'] = (
+            round(statements / result['requests'], 2) if statements is not None and result['requests'] else None
+        )
+        results[name] = result
+        print(f"{name:<20} {result['rps']:>8} RPS  p50 {result['p50_ms']!s:>8}  p95 {result['p95_ms']!s:>8}  "
+              f"p99 {result['p99_ms']!s:>8}  Abfragen/Req {result['queries_per_request']!s:>6}  "
+              f"Fehler {result['errors']}", flush=True)
+    return results
+
+
+def cmd_run(args):
+    scale = dict(SCALES[args.scale])
+    for key in ('users', 'projects', 'customers', 'versions', 'history_depth'):
+        if getattr(args, key) is not None:
+            scale[key] = getattr(args, key)
+
+    with LocalPostgres(args.postgres) as pg:
+        dataset = prepare_database(pg, scale, args.reseed)
+        if args.seed_only:
+            return
+        server_env = dict(pg.env(), DB_POOL_MAX=str(max(args.threads, 4)), DEBUG_ROUTES='0')
+        with BackendServer(args.server, env=server_env, workers=args.workers, threads=args.threads) as server:
+            conn = pg.connect()
+            try:
+                ctx = ScenarioContext(server.base_url, conn, token_users=args.token_users, writes=args.writes)
+            finally:
+                conn.close()
+            scenarios = build_scenarios(ctx, include_writes=args.writes)
+            if args.only:
+                scenarios = {name: fn for name, fn in scenarios.items()
+                             if any(name == o or name.startswith(o + '.') for o in args.only)}
+            results = measure_scenarios(server, pg, scenarios, args)
+
+    output = args.output or os.path.join(
+        RESULTS_DIR, f"{datetime.now().strftime('%Y%m%d-%H%M%S')}-{args.server}-{args.scale}.json"
+    )
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({
+            'meta': {
+                'timestamp': datetime.now().isoformat(timespec='seconds'),
+                'git_revision': git_revision(),
+                'python': platform.python_version(),
+                'cpu_count': os.cpu_count(),
+                'postgres': pg.mode,
+                'server': args.server,
+                'workers': args.workers,
+                'threads': args.threads,
+                'concurrency': args.concurrency,
+                'duration_s': args.duration,
+                'scale': scale,
+                'dataset': dataset,
+            },
+            'results': results,
+        }, f, indent=2)
+    print(f"Ergebnisse gespeichert: {output}")
+
+
+def _delta(old, new):
+    if old in (None, 0) or new is None:
+        return ''
+    return f"{(new - old) / old * 100:+.1f}%"
+
+
+def cmd_compare(args):
+    with open(args.baseline, encoding='utf-8') as f:
+        baseline = json.load(f)
+    with open(args.candidate, encoding='utf-8') as f:
+        candidate = json.load(f)
+    print(f"Basis:     {args.baseline} ({baseline['meta'].get('git_revision')})")
+    print(f"Kandidat:  {args.candidate} ({candidate['meta'].get('git_revision')})")
+    print(f"{'Szenario':<20} {'RPS alt':>9} {'RPS neu':>9} {'Δ':>8} {'p95 alt':>9} {'p95 neu':>9} {'Δ':>8} "
+          f"{'Abfr. alt':>9} {'Abfr. neu':>9}")
+    for name in sorted(set(baseline['results']) | set(candidate['results'])):
+        old = baseline['results'].get(name, {})
+        new = candidate['results'].get(name, {})
+        print(f"{name:<20} {old.get('rps')!s:>9} {new.get('rps')!s:>9} {_delta(old.get('rps'), new.get('rps')):>8} "
+              f"{old.get('p95_ms')!s:>9} {new.get('p95_ms')!s:>9} {_delta(old.get('p95_ms'), new.get('p95_ms')):>8} "
+              f"{old.get('queries_per_request')!s:>9} {new.get('queries_per_request')!s:>9}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m benchmark', description='Endpunkt-Benchmark des Backends')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    run = sub.add_parser('run', help='Datenbank seeden und Endpunkte messen')
+    run.add_argument('--postgres', choices=['auto', 'native', 'docker', 'external'], default='auto')
+    run.add_argument('--scale', choices=sorted(SCALES), default='small')
+    run.add_argument('--users', type=int)
+    run.add_argument('--projects', type=int)
+    run.add_argument('--customers', type=int)
+    run.add_argument('--versions', type=int, help='Anzahl Versionen in s_timeentry_details')
+    run.add_argument('--history-depth', dest='history_depth', type=int, help='Mittlere Versionen je Zeiteintrag')
+    run.add_argument('--reseed', action='store_true', help='Auch bei vorhandenen Daten erneut seeden')
+    run.add_argument('--seed-only', action='store_true')
+    run.add_argument('--server', choices=['gunicorn', 'flask-dev'], default='gunicorn')
+    run.add_argument('--workers', type=int, default=4)
+    run.add_argument('--threads', type=int, default=4)
+    run.add_argument('--concurrency', type=int, default=16)
+    run.add_argument('--duration', type=float, default=15.0)
+    run.add_argument('--warmup', type=float, default=2.0)
+    run.add_argument('--token-users', dest='token_users', type=int, default=20)
+    run.add_argument('--writes', action='store_true', help='Schreibende Szenarien einschließen (verändert den Bestand)')
+    run.add_argument('--only', action='append', help='Nur dieses Szenario bzw. diesen Blueprint messen')
+    run.add_argument('--output', help='Pfad der JSON-Ergebnisdatei')
+    run.set_defaults(func=cmd_run)
+
+    compare = sub.add_parser('compare', help='Zwei Ergebnisdateien vergleichen')
+    compare.add_argument('baseline')
+    compare.add_argument('candidate')
+    compare.set_defaults(func=cmd_compare)
+
+    args = parser.parse_args(argv)
+    args.func(args)
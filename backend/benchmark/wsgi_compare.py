@@ -0,0 +1,60 @@
+"""
+Vergleich Entwicklungsserver gegen gunicorn.
+
+Startet nacheinander
+  * ``flask run`` mit FLASK_DEBUG=1 (bisheriges Setup aus Dockerfile/Compose)
+  * ``gunicorn -c gunicorn.conf.py wsgi:app``
+auf einem freien Port, belastet jeweils dieselben Endpunkte und gibt die
+Ergebnisse als Tabelle und optional als JSON aus.
+
+Aufruf (im Verzeichnis backend/):
+    python -m benchmark.wsgi_compare --duration 20 --concurrency 16
+    python -m benchmark.wsgi_compare --path /api/dashboard/summary --token <JWT>
+"""
+
+import argparse
+import json
+
+from benchmark.load import run_load
+from benchmark.server import BackendServer
+
+
+def measure(mode, paths, args):
+    with BackendServer(mode, workers=args.workers, threads=args.threads, ready_path=paths[0]) as server:
+        headers = {'Authorization': f'Bearer {args.token}'} if args.token else {}
+        results = {}
+        for path in paths:
+            # kurzes Aufwärmen, damit Pool und Imports nicht in die Messung fallen
+            run_load(server.base_url + path, concurrency=args.concurrency, duration=1.0, headers=headers)
+            results[path] = run_load(server.base_url + path, concurrency=args.concurrency,
+                                     duration=args.duration, headers=headers)
+        return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Durchsatzvergleich flask run vs. gunicorn')
+    parser.add_argument('--path', action='append', dest='paths',
+                        help='Zu messender Endpunkt (mehrfach möglich, Standard: /api/debug/pool)')
+    parser.add_argument('--token', help='JWT für geschützte Endpunkte')
+    parser.add_argument('--duration', type=float, default=10.0)
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--json', help='Ergebnisse zusätzlich in diese Datei schreiben')
+    args = parser.parse_args(argv)
+    paths = args.paths or ['/api/debug/pool']
+
+    results = {mode: measure(mode, paths, args) for mode in ('flask-dev', 'gunicorn')}
+
+    print(f"{'Modus':<10} {'Endpunkt':<28} {'RPS':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'Fehler':>7}")
+    for mode, per_path in results.items():
+        for path, r in per_path.items():
+            print(f"{mode:<10} {path:<28} {r['rps']:>8} {r['p50_ms']!s:>8} {r['p95_ms']!s:>8} "
+                  f"{r['p99_ms']!s:>8} {r['errors']:>7}")
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({'settings': vars(args), 'results': results}, f, indent=2)
+
+
+if __name__ == '__main__':
+    main()
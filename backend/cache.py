@@ -0,0 +1,338 @@
+"""
+Gemeinsamer Cache für berechnete Antworten.
+
+Einträge sind Bytes unter einem Schlüssel in einem Namensraum (NAMESPACE_TTL:
+catalog, identity, dashboard, reports). Jeder Namensraum hat eine eigene
+Standard-Lebensdauer und eigene Zähler für Treffer und Fehlschläge; clear()
+verwirft nur die Einträge des eigenen Namensraums.
+
+Das Backend wählt CACHE_BACKEND:
+  * ``memory`` (Standard) – LRU im Prozessspeicher, begrenzt auf
+    CACHE_MAX_BYTES (Schlüssel plus Wert); jeder Worker hat einen eigenen Bestand
+  * ``redis`` – ein Server mit Redis-Protokoll unter CACHE_URL, den alle
+    Worker und Container gemeinsam nutzen. Die Speichergrenze setzt dort der
+    Server (maxmemory mit Verdrängungsstrategie allkeys-lru).
+
+Der Redis-Client spricht RESP direkt über einen Socket und benötigt kein
+zusätzliches Paket; jeder kompatible Server (Redis, Valkey, KeyDB oder ein
+lokaler Ersatz für Tests) genügt. Ist der Server nicht erreichbar, verhält
+sich der Cache für CACHE_RETRY_DELAY Sekunden wie ein leerer Cache – die
+Endpunkte rechnen dann wie ohne Cache.
+
+Jeder Namensraum hängt zusätzlich an der Invalidierung (invalidation.py);
+die Einträge müssen daher nur so lange gelten, bis eine Benachrichtigung
+ankommt. Die Lebensdauer begrenzt den Schaden verlorener Benachrichtigungen.
+"""
+
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from urllib.parse import urlparse
+
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', 'memory')
+CACHE_URL = os.getenv('CACHE_URL', 'redis://cache:6379/0')
+CACHE_PREFIX = os.getenv('CACHE_PREFIX', 'mitarbeiterportal')
+CACHE_MAX_BYTES = int(os.getenv('CACHE_MAX_BYTES', str(64 * 1024 * 1024)))
+# Socket-Timeout je Befehl – ein langsamer Cache darf keinen Request aufhalten
+CACHE_TIMEOUT = float(os.getenv('CACHE_TIMEOUT', '0.25'))
+CACHE_RETRY_DELAY = float(os.getenv('CACHE_RETRY_DELAY', '5'))
+
+# Namensraum -> Standard-Lebensdauer in Sekunden
+NAMESPACE_TTL = {
+    'catalog': 3600,
+    'identity': 300,
+    'dashboard': 24 * 3600,
+    'reports': 3600,
+}
+
+
+class CacheError(Exception):
+    """Fehlerantwort oder Verbindungsproblem des Cache-Servers."""
+
+
+class MemoryBackend:
+    """LRU im Prozessspeicher mit Obergrenze in Bytes."""
+
+    def __init__(self, max_bytes=CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # Schlüssel -> (Wert, Ablaufzeitpunkt, Größe)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.evictions = 0
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if entry[1] <= time.monotonic():
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry[0]
+
+    def set(self, key, value, ttl):
+        size = len(key) + len(value)
+        with self._lock:
+            self._remove(key)
+            # Einträge über der Gesamtgrenze würden den ganzen Bestand verdrängen
+            if size > self.max_bytes:
+                return
+            self._entries[key] = (value, time.monotonic() + ttl, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def delete(self, keys):
+        with self._lock:
+            for key in keys:
+                self._remove(key)
+
+    def delete_prefix(self, prefix):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                self._remove(key)
+
+    def _remove(self, key):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._bytes -= entry[2]
+
+    def stats(self):
+        return {'bytes': self._bytes, 'entries': len(self._entries), 'evictions': self.evictions}
+
+
+def _encode_command(args):
+    parts = [b'*%d\r\n' % len(args)]
+    for arg in args:
+        if isinstance(arg, str):
+            arg = arg.encode('utf-8')
+        elif isinstance(arg, int):
+            arg = str(arg).encode('ascii')
+        parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+    return b''.join(parts)
+
+
+def _read_reply(reader):
+    line = reader.readline()
+    if not line.endswith(b'\r\n'):
+        raise ConnectionError("Verbindung zum Cache-Server unterbrochen")
+    kind, payload = line[:1], line[1:-2]
+    if kind == b'+':
+        return payload
+    if kind == b'-':
+        raise CacheError(payload.decode('utf-8', 'replace'))
+    if kind == b':':
+        return int(payload)
+    if kind == b'$':
+        length = int(payload)
+        if length < 0:
+            return None
+        data = reader.read(length + 2)
+        if len(data) != length + 2:
+            raise ConnectionError("Verbindung zum Cache-Server unterbrochen")
+        return data[:-2]
+    if kind == b'*':
+        length = int(payload)
+        return None if length < 0 else [_read_reply(reader) for _ in range(length)]
+    raise CacheError(f"Unbekannte Antwort des Cache-Servers: {line[:40]!r}")
+
+
+class RedisBackend:
+    """
+    Client für Server mit Redis-Protokoll (RESP2).
+
+    Hält je Prozess einige offene Verbindungen; nach einem fork() werden die
+    geerbten Sockets verworfen, da Eltern- und Kindprozess sie sonst teilen.
+    """
+
+    def __init__(self, url=CACHE_URL, timeout=CACHE_TIMEOUT, retry_delay=CACHE_RETRY_DELAY):
+        parsed = urlparse(url)
+        self.host = parsed.hostname or 'localhost'
+        self.port = parsed.port or 6379
+        self.password = parsed.password
+        self.db = int(parsed.path.lstrip('/') or 0)
+        self.timeout = timeout
+        self.retry_delay = retry_delay
+        self._lock = threading.Lock()
+        self._idle = []
+        self._pid = os.getpid()
+        self._down_until = 0.0
+        self.errors = 0
+
+    def _connect(self):
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        conn = (sock, sock.makefile('rb'))
+        if self.password:
+            self._roundtrip(conn, ('AUTH', self.password))
+        if self.db:
+            self._roundtrip(conn, ('SELECT', self.db))
+        return conn
+
+    @staticmethod
+    def _roundtrip(conn, args):
+        conn[0].sendall(_encode_command(args))
+        return _read_reply(conn[1])
+
+    def _acquire(self):
+        with self._lock:
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._idle = []
+            if self._idle:
+                return self._idle.pop()
+        return self._connect()
+
+    def _release(self, conn):
+        with self._lock:
+            if self._pid == os.getpid():
+                self._idle.append(conn)
+                return
+        conn[0].close()
+
+    def command(self, *args):
+        """
+        Führt einen Befehl aus.
+
+        Raises:
+            CacheError: Bei Fehlerantwort, Timeout oder unerreichbarem Server
+        """
+        if time.monotonic() < self._down_until:
+            raise CacheError("Cache-Server vorübergehend deaktiviert")
+        try:
+            conn = self._acquire()
+        except (OSError, CacheError) as e:
+            self._mark_down(e)
+            raise CacheError(str(e)) from e
+        try:
+            reply = self._roundtrip(conn, args)
+        except CacheError:
+            # Eine Fehlerantwort lässt die Verbindung intakt
+            self._release(conn)
+            raise
+        except (OSError, ValueError) as e:
+            conn[0].close()
+            self._mark_down(e)
+            raise CacheError(str(e)) from e
+        self._release(conn)
+        return reply
+
+    def _mark_down(self, error):
+        self.errors += 1
+        if time.monotonic() >= self._down_until:
+            print(f"Cache-Server {self.host}:{self.port} nicht erreichbar ({error}), "
+                  f"Cache für {self.retry_delay:g} s deaktiviert")
+        self._down_until = time.monotonic() + self.retry_delay
+
+    def get(self, key):
+        return self.command('GET', key)
+
+    def set(self, key, value, ttl):
+        self.command('SET', key, value, 'PX', max(1, int(ttl * 1000)))
+
+    def delete(self, keys):
+        if keys:
+            self.command('DEL', *keys)
+
+    def delete_prefix(self, prefix):
+        cursor = b'0'
+        while True:
+            cursor, keys = self.command('SCAN', cursor, 'MATCH', _glob_escape(prefix) + '*', 'COUNT', 500)
+            if keys:
+                self.command('DEL', *keys)
+            if cursor == b'0':
+                return
+
+    def stats(self):
+        return {'errors': self.errors}
+
+
+def _glob_escape(text):
+    for char in '\\*?[]':
+        text = text.replace(char, '\\' + char)
+    return text
+
+
+class Namespace:
+    """Sicht auf einen Namensraum des Backends mit eigenen Zählern."""
+
+    def __init__(self, name, ttl):
+        self.name = name
+        self.ttl = ttl
+        self.prefix = f'{CACHE_PREFIX}:{name}:'
+        self.hits = 0
+        self.misses = 0
+        self.sets = 0
+
+    def get(self, key):
+        """Wert als bytes oder None (auch wenn der Cache-Server nicht erreichbar ist)."""
+        try:
+            value = backend().get(self.prefix + key)
+        except CacheError:
+            value = None
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key, value, ttl=None):
+        try:
+            backend().set(self.prefix + key, value, ttl or self.ttl)
+            self.sets += 1
+        except CacheError:
+            pass
+
+    def delete(self, *keys):
+        try:
+            backend().delete([self.prefix + key for key in keys])
+        except CacheError:
+            pass
+
+    def clear(self):
+        """Verwirft alle Einträge des Namensraums."""
+        try:
+            backend().delete_prefix(self.prefix)
+        except CacheError:
+            pass
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses, 'sets': self.sets}
+
+
+_backend = None
+_backend_lock = threading.Lock()
+_namespaces = {}
+
+
+def backend():
+    """Das konfigurierte Backend (beim ersten Zugriff angelegt)."""
+    global _backend
+    if _backend is None:
+        with _backend_lock:
+            if _backend is None:
+                if CACHE_BACKEND == 'redis':
+                    _backend = RedisBackend()
+                elif CACHE_BACKEND == 'memory':
+                    _backend = MemoryBackend()
+                else:
+                    raise ValueError(f"Unbekanntes CACHE_BACKEND: {CACHE_BACKEND} (memory oder redis)")
+    return _backend
+
+
+def namespace(name):
+    """Namensraum ``name`` aus NAMESPACE_TTL; pro Prozess genau eine Instanz."""
+    if name not in _namespaces:
+        with _backend_lock:
+            _namespaces.setdefault(name, Namespace(name, NAMESPACE_TTL[name]))
+    return _namespaces[name]
+
+
+def stats():
+    """Zähler je Namensraum und Kennzahlen des Backends (für metrics.py)."""
+    return {name: ns.stats() for name, ns in _namespaces.items()}, backend().stats()
@@ -0,0 +1,91 @@
+"""
+Katalog der Projekte und Kunden im Prozessspeicher.
+
+Die Listen GET /api/projects und GET /api/customers ändern sich nur bei
+Schreibzugriffen auf Projekte oder Kunden, werden aber von fast jeder Seite
+beim Laden abgefragt. Der Katalog hält die fertig serialisierten Antworten
+und liefert sie ohne Datenbankzugriff aus, bis ein Schreibzugriff mit bump()
+die Katalogversion erhöht. Alle Einträge hängen an derselben Version, da die
+Projektliste auch die Kundennamen enthält.
+
+Jede Antwort trägt ein starkes ETag (SHA-256 der Antwortbytes). Es hängt nur
+vom Inhalt ab und ist damit in allen Worker-Prozessen gleich; Clients mit
+passendem If-None-Match erhalten 304 ohne Body.
+
+Schreibzugriffe anderer Prozesse kommen über invalidation.py an: jede
+Änderung an Projekten oder Kunden erhöht auch dort die Version.
+
+Die Einträge liegen im Namensraum ``catalog`` des gemeinsamen Caches
+(cache.py); mit CACHE_BACKEND=redis teilen sich alle Worker und Container
+einen Bestand. bump() verwirft dann den gemeinsamen Bestand, die Version
+bleibt prozesslokal.
+
+Ein Eintrag wird nur übernommen, wenn sich die Version während des Ladens
+nicht geändert hat – sonst könnte ein vor dem Commit gelesener Stand nach
+dem bump() im Cache landen.
+"""
+
+import hashlib
+import json
+import threading
+
+from flask import Response, request
+
+from cache import namespace
+from invalidation import subscribe
+
+# Länge des ETags (SHA-256, hexadezimal), das jedem Cache-Eintrag vorangestellt ist
+ETAG_LENGTH = 64
+
+
+class Catalog:
+    """Versionierter Cache serialisierter Katalogantworten: Name -> (Body, ETag)."""
+
+    def __init__(self):
+        self.version = 0
+        self._entries = namespace('catalog')
+        self._lock = threading.Lock()
+
+    def bump(self):
+        """Erhöht die Katalogversion und verwirft alle Einträge (nach dem Commit aufrufen)."""
+        with self._lock:
+            self.version += 1
+            self._entries.clear()
+
+    def get(self, name, load):
+        """
+        Liefert die Antwort ``name`` aus dem Cache oder lädt sie mit ``load()``.
+
+        Args:
+            load: Funktion ohne Argumente, die die Liste der Einträge (dicts) liefert
+
+        Returns:
+            tuple: (Body als bytes, ETag)
+        """
+        cached = self._entries.get(name)
+        if cached is not None:
+            return cached[ETAG_LENGTH:], cached[:ETAG_LENGTH].decode('ascii')
+        version = self.version
+        items = load()
+        # Gleiches Format wie stream_json
+        body = ('[' + ','.join(json.dumps(item, ensure_ascii=False, default=str) for item in items) + ']').encode('utf-8')
+        etag = hashlib.sha256(body).hexdigest()
+        with self._lock:
+            if self.version == version:
+                self._entries.set(name, etag.encode('ascii') + body)
+        return body, etag
+
+
+catalog = Catalog()
+subscribe('project', lambda hk_project: catalog.bump())
+subscribe('customer', lambda hk_customer: catalog.bump())
+
+
+def catalog_response(name, load):
+    """JSON-Antwort aus dem Katalog mit ETag; bei passendem If-None-Match 304."""
+    body, etag = catalog.get(name, load)
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    # Der Browser darf die Antwort behalten, muss sie aber vor jeder Verwendung prüfen
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response.make_conditional(request)
@@ -0,0 +1,186 @@
+"""
+Zusammenfassen gleichzeitiger, identischer GET-Requests (Single-Flight).
+
+Beim Öffnen des Portals kommen dieselben Listen (Projekte, Kunden, Benutzer)
+von vielen Clients fast gleichzeitig an. Statt jede Anfrage einzeln mit
+eigener Pool-Verbindung zu berechnen, rechnet nur der erste Request; alle
+weiteren mit demselben Schlüssel warten auf sein Ergebnis und erhalten eine
+Kopie der Antwort.
+
+Der Schlüssel besteht aus
+  * dem Endpunkt,
+  * den sortierten Query-Parametern (leere Werte entfallen),
+  * den Bedingungs-Headern (If-None-Match, If-Modified-Since) – eine 304
+    wird so nur mit Clients geteilt, die dieselbe Version besitzen,
+  * dem Berechtigungsbereich, den der Endpunkt über ``scope`` festlegt.
+
+Die Antwort des ersten Requests wird dafür gelesen. Gestreamte Antworten
+(JSON- und CSV-Export der Benutzerliste) werden nur bis COALESCE_MAX_BYTES
+gepuffert; größere streamt der erste Request mit konstantem Speicher weiter,
+und die Wartenden rechnen selbst. Das Zusammenfassen wirkt je Prozess.
+Wartende geben nach COALESCE_TIMEOUT Sekunden auf und rechnen selbst. Die
+Zahl der zusammengefassten Requests steht in der Metrik
+coalesced_requests_total.
+"""
+
+import itertools
+import os
+import threading
+from functools import wraps
+
+from flask import Response, current_app, request
+
+from metrics import Counter
+
+COALESCE_ENABLED = os.getenv('COALESCE_ENABLED', '1') == '1'
+COALESCE_TIMEOUT = float(os.getenv('COALESCE_TIMEOUT', '30'))
+# Größere gestreamte Antworten werden nicht geteilt
+COALESCE_MAX_BYTES = int(os.getenv('COALESCE_MAX_BYTES', str(1024 * 1024)))
+
+# Header, die sich auf die Antwort auswirken und daher zum Schlüssel gehören
+CONDITIONAL_HEADERS = ('If-None-Match', 'If-Modified-Since')
+
+coalesced_requests = Counter(
+    'coalesced_requests_total', 'Requests, die das Ergebnis eines gleichzeitigen Requests übernommen haben',
+    ('endpoint',)
+)
+leader_requests = Counter(
+    'coalesce_leader_requests_total', 'Requests, die selbst gerechnet haben', ('endpoint',)
+)
+
+
+class _Call:
+    """Eine laufende Berechnung, auf die weitere Requests warten können."""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight:
+    """Führt ``compute`` je Schlüssel höchstens einmal gleichzeitig aus."""
+
+    def __init__(self, timeout=COALESCE_TIMEOUT):
+        self.timeout = timeout
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, compute):
+        """
+        Returns:
+            tuple: (Ergebnis, True wenn es von einem anderen Aufruf übernommen wurde)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if call.done.wait(self.timeout):
+                if call.error is not None:
+                    # Eigene Ausnahme je Wartendem, die des ersten Requests
+                    # (samt Traceback) bleibt als Ursache erhalten
+                    raise RuntimeError("Gleichzeitige Berechnung fehlgeschlagen") from call.error
+                return call.result, True
+            return compute(), False
+
+        try:
+            call.result = compute()
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+            call.done.set()
+        return call.result, False
+
+
+flights = SingleFlight()
+
+
+def request_key(scope):
+    """Schlüssel des aktuellen Requests (siehe Moduldokumentation)."""
+    args = tuple(sorted((name, value) for name, value in request.args.items(multi=True) if value != ''))
+    conditions = tuple(request.headers.get(name, '') for name in CONDITIONAL_HEADERS)
+    return request.endpoint, args, conditions, scope
+
+
+class _Unshared:
+    """Antwort, die zu groß zum Teilen ist; nur der erste Request sendet sie."""
+
+    def __init__(self, response):
+        self.response = response
+
+
+def _materialize(rv):
+    """
+    Liest die Antwort des Views: (Body, Status, Header), oder _Unshared, wenn
+    eine gestreamte Antwort mehr als COALESCE_MAX_BYTES liefert.
+    """
+    response = current_app.make_response(rv)
+    if response.is_streamed:
+        chunks = []
+        size = 0
+        rest = response.iter_encoded()
+        try:
+            for chunk in rest:
+                chunks.append(chunk)
+                size += len(chunk)
+                if size > COALESCE_MAX_BYTES:
+                    break
+        except BaseException:
+            response.close()
+            raise
+        if size > COALESCE_MAX_BYTES:
+            # Gelesenes und Rest unverändert weiterstreamen; close() der
+            # Antwort muss weiterhin den serverseitigen Cursor freigeben
+            source = response.response
+            response.response = itertools.chain(chunks, rest)
+            if hasattr(source, 'close'):
+                response.call_on_close(source.close)
+            return _Unshared(response)
+        body = b''.join(chunks)
+        response.close()
+    else:
+        body = response.get_data()
+    headers = [(name, value) for name, value in response.headers.items() if name != 'Content-Length']
+    return body, response.status_code, headers
+
+
+def any_user():
+    """Bereich für Daten, die jeder Aufrufer gleich sieht (Projekt- und Kundenliste)."""
+    return 'alle'
+
+
+def coalesced(scope):
+    """
+    Fasst gleichzeitige identische Requests auf den View zusammen.
+
+    Args:
+        scope: Funktion ohne Argumente, die den Berechtigungsbereich des
+            angemeldeten Benutzers liefert (z.B. 'admin' oder die Benutzer-ID).
+            Nur Requests mit gleichem Bereich teilen sich ein Ergebnis.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            if not COALESCE_ENABLED:
+                return view(*args, **kwargs)
+            key = request_key(scope())
+            result, shared = flights.do(key, lambda: _materialize(view(*args, **kwargs)))
+            if isinstance(result, _Unshared):
+                if shared:
+                    return view(*args, **kwargs)
+                leader_requests.inc(request.endpoint)
+                return result.response
+            body, status, headers = result
+            if shared:
+                coalesced_requests.inc(request.endpoint)
+            else:
+                leader_requests.inc(request.endpoint)
+            return Response(body, status=status, headers=headers)
+        return wrapper
+    return decorator
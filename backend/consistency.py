@@ -0,0 +1,323 @@
+"""
+Konsistenzprüfung und Reparatur des Data Vault.
+
+Gefunden werden Zustände, die bei fehlerhaften oder abgebrochenen
+Schreibzugriffen entstehen und jede Abfrage auf die aktuelle Version
+verfälschen:
+
+  * mehrere offene Versionen (t_to IS NULL) je Schlüssel in einem Satelliten
+  * mehrere offene Links für denselben Zeiteintrag (hk_user, timeentry_id)
+  * offene Links auf geschlossene Hubs (gelöschter Benutzer bzw. Projekt)
+  * offene Zeiteintrag-Links ohne offene Version in s_timeentry_details
+  * offene Versionen in s_timeentry_details zu geschlossenen Links
+  * Projekte, deren Kunde (s_project_details.customer_id) geschlossen ist
+  * aktuelle Projektzuordnungen (s_user_current_project) auf geschlossene Projekte
+
+Doppelte Hubs prüft das Modul nicht; die Geschäftsschlüssel der Hubs sind
+UNIQUE. Jede Prüfung ist eine einzige mengenbasierte Abfrage, die Reparatur
+läuft in Stapeln zu CONSISTENCY_BATCH_SIZE Schlüsseln mit je einem Commit.
+Repariert wird durch Schließen (t_to bzw. b_to), nie durch Löschen:
+  * von mehreren offenen Versionen bleibt die jüngste offen
+  * von mehreren offenen Links bleibt der jüngste mit offener Version offen
+  * betroffene Zeiteinträge werden samt offener Version geschlossen
+  * Projekte eines geschlossenen Kunden werden wie beim Löschen geschlossen;
+    ihre Zeiteinträge und Zuordnungen erfassen die folgenden Prüfungen
+  * Zuordnungen auf geschlossene Projekte werden geschlossen
+Anschließend werden PIT-Tabellen und Tagessummen der betroffenen Schlüssel
+fortgeschrieben. Bei Versionen geschlossener Links ist offen, ob sie noch in
+den Tagessummen stecken; deren Tage werden daher aus pit_timeentry neu
+berechnet statt fortgeschrieben.
+
+Aufruf (z.B. nächtlich per Cron):
+    python consistency.py check                       # nur Bericht, Exit-Code 1 bei Funden
+    python consistency.py repair [--batch-size N]     # Bericht und Reparatur
+"""
+
+import argparse
+import sys
+import time
+
+from archive import primary_key
+from pit import refresh_project_pit, refresh_timeentry_pit, refresh_user_pit
+from rollup import apply_timeentry_delta, rebuild_days
+from satellite import SATELLITES, close_versions
+
+CONSISTENCY_BATCH_SIZE = 1000
+# Längstens so lange auf Sperren warten, bevor ein Stapel abbricht
+CONSISTENCY_LOCK_TIMEOUT = '2s'
+
+# Satellit -> PIT-Fortschreibung für die Schlüssel des Satelliten
+PIT_REFRESH = {
+    's_user_details': refresh_user_pit,
+    's_user_login': refresh_user_pit,
+    's_user_current_project': refresh_user_pit,
+    's_project_details': refresh_project_pit,
+    's_timeentry_details': refresh_timeentry_pit,
+}
+
+
+class Check:
+    """Eine Prüfung: Abfrage der betroffenen Schlüssel und deren Reparatur."""
+
+    def __init__(self, name, description, find, repair):
+        self.name = name
+        self.description = description
+        self.find = find
+        self.repair = repair
+
+
+def find_duplicate_versions(cur, table):
+    sat = SATELLITES[table]
+    cur.execute(f"""
+        SELECT {sat.key}::text
+        FROM {table}
+        WHERE t_to IS NULL
+        GROUP BY {sat.key}
+        HAVING COUNT(*) > 1
+    """)
+    return [row[0] for row in cur.fetchall()]
+
+
+def repair_duplicate_versions(cur, table, keys):
+    """Schließt je Schlüssel alle offenen Versionen außer der jüngsten."""
+    sat = SATELLITES[table]
+    pk = primary_key(table)
+    cur.execute(f"""
+        WITH neueste AS (
+            SELECT DISTINCT ON ({sat.key}) {', '.join(pk)}
+            FROM {table}
+            WHERE {sat.key} = ANY(%(keys)s::uuid[]) AND t_to IS NULL
+            ORDER BY {sat.key}, t_from DESC
+        )
+        UPDATE {table} s
+        SET t_to = CURRENT_TIMESTAMP, b_to = GREATEST(s.b_from, CURRENT_DATE)
+        WHERE s.{sat.key} = ANY(%(keys)s::uuid[]) AND s.t_to IS NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM neueste n WHERE {' AND '.join(f'n.{c} = s.{c}' for c in pk)}
+          )
+    """, {'keys': keys})
+    if table in PIT_REFRESH:
+        PIT_REFRESH[table](cur, keys)
+
+
+def find_duplicate_links(cur):
+    cur.execute("""
+        WITH doppelt AS (
+            SELECT hk_user, timeentry_id
+            FROM l_user_project_timeentry
+            WHERE t_to IS NULL AND timeentry_id IS NOT NULL
+            GROUP BY hk_user, timeentry_id
+            HAVING COUNT(*) > 1
+        ), rang AS (
+            SELECT l.hk_user_project_timeentry,
+                   ROW_NUMBER() OVER (
+                       PARTITION BY l.hk_user, l.timeentry_id
+                       ORDER BY EXISTS (
+                                    SELECT 1 FROM s_timeentry_details s
+                                    WHERE s.hk_user_project_timeentry = l.hk_user_project_timeentry
+                                      AND s.t_to IS NULL
+                                ) DESC,
+                                l.t_from DESC, l.hk_user_project_timeentry
+                   ) AS nr
+            FROM l_user_project_timeentry l
+            JOIN doppelt d ON d.hk_user = l.hk_user AND d.timeentry_id = l.timeentry_id
+            WHERE l.t_to IS NULL
+        )
+        SELECT hk_user_project_timeentry::text FROM rang WHERE nr > 1
+    """)
+    return [row[0] for row in cur.fetchall()]
+
+
+def find_links_to_closed_hubs(cur):
+    cur.execute("""
+        SELECT l.hk_user_project_timeentry::text
+        FROM l_user_project_timeentry l
+        JOIN h_user u ON u.hk_user = l.hk_user
+        JOIN h_project p ON p.hk_project = l.hk_project
+        WHERE l.t_to IS NULL AND (u.t_to IS NOT NULL OR p.t_to IS NOT NULL)
+    """)
+    return [row[0] for row in cur.fetchall()]
+
+
+def find_links_without_version(cur):
+    cur.execute("""
+        SELECT l.hk_user_project_timeentry::text
+        FROM l_user_project_timeentry l
+        WHERE l.t_to IS NULL
+          AND NOT EXISTS (
+              SELECT 1 FROM s_timeentry_details s
+              WHERE s.hk_user_project_timeentry = l.hk_user_project_timeentry AND s.t_to IS NULL
+          )
+    """)
+    return [row[0] for row in cur.fetchall()]
+
+
+def find_versions_of_closed_links(cur):
+    cur.execute("""
+        SELECT DISTINCT s.hk_user_project_timeentry::text
+        FROM s_timeentry_details s
+        JOIN l_user_project_timeentry l ON l.hk_user_project_timeentry = s.hk_user_project_timeentry
+        WHERE s.t_to IS NULL AND l.t_to IS NOT NULL
+    """)
+    return [row[0] for row in cur.fetchall()]
+
+
+def close_timeentry_links(cur, link_ids):
+    """
+    Schließt Zeiteintrag-Links samt offener Version. Die Stunden werden vorher
+    über pit_timeentry aus den Tagessummen herausgerechnet.
+    """
+    apply_timeentry_delta(cur, link_ids, -1)
+    close_versions(cur, 's_timeentry_details', link_ids)
+    cur.execute("""
+        UPDATE l_user_project_timeentry
+        SET t_to = CURRENT_TIMESTAMP
+        WHERE hk_user_project_timeentry = ANY(%s::uuid[]) AND t_to IS NULL
+    """, (link_ids,))
+    refresh_timeentry_pit(cur, link_ids)
+
+
+def close_versions_of_closed_links(cur, link_ids):
+    """
+    Schließt offene Versionen geschlossener Links. Ob ihre Stunden noch in
+    r_daily_hours stecken, hängt davon ab, wie der Link geschlossen wurde;
+    die betroffenen Tage werden deshalb neu berechnet statt fortgeschrieben.
+    """
+    cur.execute("""
+        SELECT p.hk_user, p.entry_date
+        FROM pit_timeentry p
+        WHERE p.hk_user_project_timeentry = ANY(%(keys)s::uuid[])
+        UNION
+        SELECT l.hk_user, s.entry_date
+        FROM l_user_project_timeentry l
+        JOIN s_timeentry_details s
+            ON s.hk_user_project_timeentry = l.hk_user_project_timeentry AND s.t_to IS NULL
+        WHERE l.hk_user_project_timeentry = ANY(%(keys)s::uuid[])
+    """, {'keys': link_ids})
+    days = cur.fetchall()
+    close_versions(cur, 's_timeentry_details', link_ids)
+    refresh_timeentry_pit(cur, link_ids)
+    rebuild_days(cur, days)
+
+
+def find_projects_of_closed_customers(cur):
+    cur.execute("""
+        SELECT DISTINCT p.hk_project::text
+        FROM h_project p
+        JOIN s_project_details d ON d.hk_project = p.hk_project AND d.t_to IS NULL
+        JOIN h_customer c ON c.hk_customer = d.customer_id
+        WHERE p.t_to IS NULL AND c.t_to IS NOT NULL
+    """)
+    return [row[0] for row in cur.fetchall()]
+
+
+def close_projects(cur, hk_projects):
+    """Schließt Projekte samt offener Version wie project.delete_project."""
+    cur.execute("""
+        UPDATE h_project
+        SET t_to = CURRENT_TIMESTAMP
+        WHERE hk_project = ANY(%s::uuid[]) AND t_to IS NULL
+    """, (hk_projects,))
+    close_versions(cur, 's_project_details', hk_projects)
+    refresh_project_pit(cur, hk_projects)
+
+
+def find_assignments_to_closed_projects(cur):
+    cur.execute("""
+        SELECT DISTINCT c.hk_user::text
+        FROM s_user_current_project c
+        JOIN h_project p ON p.hk_project = c.hk_project
+        WHERE c.t_to IS NULL AND p.t_to IS NOT NULL
+    """)
+    return [row[0] for row in cur.fetchall()]
+
+
+def close_assignments(cur, hk_users):
+    close_versions(cur, 's_user_current_project', hk_users)
+    refresh_user_pit(cur, hk_users)
+
+
+def checks():
+    """Alle Prüfungen in Reparaturreihenfolge."""
+    result = [
+        Check(f'{table}_doppelt_offen', f'{table}: mehrere offene Versionen je Schlüssel',
+              lambda cur, t=table: find_duplicate_versions(cur, t),
+              lambda cur, keys, t=table: repair_duplicate_versions(cur, t, keys))
+        for table in SATELLITES
+    ]
+    result += [
+        Check('projekte_geschlossener_kunde', 'Offene Projekte geschlossener Kunden',
+              find_projects_of_closed_customers, close_projects),
+        Check('zuordnung_geschlossenes_projekt', 'Aktuelle Projektzuordnungen auf geschlossene Projekte',
+              find_assignments_to_closed_projects, close_assignments),
+        Check('links_doppelt_offen', 'Zeiteintrag mit mehreren offenen Links',
+              find_duplicate_links, close_timeentry_links),
+        Check('links_geschlossener_hub', 'Offene Links auf geschlossene Benutzer/Projekte',
+              find_links_to_closed_hubs, close_timeentry_links),
+        Check('links_ohne_version', 'Offene Links ohne offene Zeiteintrag-Version',
+              find_links_without_version, close_timeentry_links),
+        Check('versionen_geschlossener_links', 'Offene Zeiteintrag-Versionen zu geschlossenen Links',
+              find_versions_of_closed_links, close_versions_of_closed_links),
+    ]
+    return result
+
+
+def run(db, repair=False, batch_size=CONSISTENCY_BATCH_SIZE, progress=print):
+    """
+    Führt alle Prüfungen aus und repariert auf Wunsch die Funde.
+    Committet nach jedem Reparaturstapel.
+
+    Returns:
+        list[tuple]: (Prüfung, gefunden, repariert, Sekunden) je Prüfung
+    """
+    report = []
+    for check in checks():
+        started = time.monotonic()
+        try:
+            keys = check.find(db.cur)
+            db.rollback()
+        except Exception:
+            db.rollback()
+            raise
+        repaired = 0
+        if repair:
+            for start in range(0, len(keys), batch_size):
+                batch = keys[start:start + batch_size]
+                try:
+                    db.cur.execute(f"SET LOCAL lock_timeout = '{CONSISTENCY_LOCK_TIMEOUT}'")
+                    check.repair(db.cur, batch)
+                    db.commit()
+                except Exception:
+                    db.rollback()
+                    raise
+                repaired += len(batch)
+                progress(f"  {check.name}: {repaired}/{len(keys)} repariert")
+        report.append((check, len(keys), repaired, time.monotonic() - started))
+    return report
+
+
+def main(argv=None):
+    from database import Database
+
+    parser = argparse.ArgumentParser(prog='python consistency.py', description='Konsistenz des Data Vault prüfen')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('check', help='Nur prüfen (Exit-Code 1 bei Funden)')
+    repair = sub.add_parser('repair', help='Prüfen und reparieren')
+    repair.add_argument('--batch-size', type=int, default=CONSISTENCY_BATCH_SIZE)
+    args = parser.parse_args(argv)
+
+    db = Database()
+    try:
+        report = run(db, repair=args.command == 'repair', batch_size=getattr(args, 'batch_size', CONSISTENCY_BATCH_SIZE))
+    finally:
+        db.close()
+
+    print(f"{'Prüfung':<62} {'gefunden':>9} {'repariert':>10} {'Dauer':>8}")
+    for check, found, repaired, seconds in report:
+        print(f"{check.description:<62} {found:>9} {repaired:>10} {seconds:>7.2f}s")
+    remaining = sum(found - repaired for _check, found, repaired, _seconds in report)
+    return 1 if remaining else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
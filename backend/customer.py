@@ -4,27 +4,26 @@ import psycopg2
 import hashlib
 import traceback  
 import uuid
+from catalog import catalog, catalog_response
+from coalesce import any_user, coalesced
 from database import Database  
+from db_pool import get_request_connection
+from satellite import write_versions
+from streaming import stream_json
+from temporal import parse_temporal_args
 
 customer_bp = Blueprint("customer", __name__)
 
 def get_db_conn():
     """
-    Stellt eine Verbindung zur Datenbank her und gibt diese zurück.
+    Gibt die Datenbankverbindung des aktuellen Requests zurück.
+    Die Verbindung stammt aus dem Pool und wird am Request-Ende automatisch
+    zurückgegeben – sie darf daher nicht selbst geschlossen werden.
     
     Returns:
         psycopg2.connection: Eine aktive Datenbankverbindung
     """
-    import psycopg2
-    from flask import current_app as app
-    
-    conn = psycopg2.connect(
-        host=app.config["DB_HOST"],
-        database=app.config["DB_NAME"],
-        user=app.config["DB_USER"],
-        password=app.config["DB_PASSWORD"],
-    )
-    return conn
+    return get_request_connection()
 
 def hash_hex(value):
     return hashlib.sha256(value.encode()).hexdigest()
@@ -33,31 +32,58 @@ def none_if_empty(val):
     return val if val not in ("", None) else None
 
 @customer_bp.route('/api/customers', methods=['GET'])
+@coalesced(any_user)
 def get_customers():
+    """
+    Query-Parameter (optional):
+        as_of: Stand der Datenbank zu diesem Zeitpunkt (ISO 8601)
+        valid_at: Fachlich an diesem Tag gültige Kundendaten (YYYY-MM-DD)
+    """
     try:
-        db = Database()
-        cur = db.cur
-        cur.execute("""
-            SELECT
-                c.hk_customer::text as hk_customer,
-                c.customer_name,
-                cd.address,
-                cd.contact_person
-            FROM h_customer c
-            LEFT JOIN s_customer_details cd ON c.hk_customer = cd.hk_customer
-                AND cd.t_to IS NULL
-            WHERE c.t_to IS NULL  
-            ORDER BY c.customer_name
-        """)
-        customers = []
-        for row in cur.fetchall():
-            customers.append({
+        temporal = parse_temporal_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        if temporal.active:
+            # Der Hub wird bei einer Reaktivierung wieder geöffnet; ob ein Kunde
+            # zum Zeitpunkt existierte, entscheidet daher die Satellitenversion
+            query = f"""
+                SELECT
+                    c.hk_customer::text as hk_customer,
+                    c.customer_name,
+                    cd.address,
+                    cd.contact_person
+                FROM h_customer c
+                JOIN {temporal.source('s_customer_details')} cd ON c.hk_customer = cd.hk_customer
+                    AND {temporal.condition('cd')}
+                ORDER BY c.customer_name
+            """
+        else:
+            query = """
+                SELECT
+                    c.hk_customer::text as hk_customer,
+                    c.customer_name,
+                    cd.address,
+                    cd.contact_person
+                FROM h_customer c
+                LEFT JOIN s_customer_details cd ON c.hk_customer = cd.hk_customer
+                    AND cd.t_to IS NULL
+                WHERE c.t_to IS NULL  
+                ORDER BY c.customer_name
+            """
+        
+        def serialize(row):
+            return {
                 'hk_customer': row[0],
                 'customer_name': row[1],
                 'address': row[2],
                 'contact_person': row[3]
-            })
-        return jsonify(customers), 200
+            }
+        
+        if temporal.active:
+            return stream_json(Database().stream(query, temporal.params()), serialize)
+        # Aktueller Stand aus dem Katalog; die Datenbank wird nur nach einem Schreibzugriff gelesen
+        return catalog_response('customers', lambda: [serialize(row) for row in Database().fetch_all(query)])
     except Exception as e:
         traceback.print_exc()  # Jetzt funktioniert diese Zeile
         return jsonify({'error': str(e)}), 500
@@ -124,8 +150,8 @@ def add_customer():
         ))
         
         conn.commit()
+        catalog.bump()
         cur.close()
-        conn.close()
         
         return jsonify({
             'success': True,
@@ -164,13 +190,13 @@ def delete_customer(hk_customer):
         
         cur.execute("""
             UPDATE s_customer_details
-            SET t_to = CURRENT_TIMESTAMP
+            SET t_to = CURRENT_TIMESTAMP, b_to = CURRENT_DATE
             WHERE hk_customer::text = %s AND t_to IS NULL
         """, (hk_customer,))
         
         conn.commit()
+        catalog.bump()
         cur.close()
-        conn.close()
         
         return jsonify({
             'success': True,
@@ -208,36 +234,21 @@ def update_customer(hk_customer):
             WHERE hk_customer::text = %s
         """, (data['customer_name'], hk_customer))
 
-        # Erst den alten Satelliten-Eintrag historisieren
-        cur.execute("""
-            UPDATE s_customer_details
-            SET t_to = CURRENT_TIMESTAMP
-            WHERE hk_customer::text = %s AND t_to IS NULL
-        """, (hk_customer,))
-
-        # Dann einen neuen Satelliten-Eintrag erstellen
-        cur.execute("""
-            INSERT INTO s_customer_details (
-                hk_customer, t_from, b_from, rec_src,
-                address, contact_person
-            ) VALUES (
-                %s, CURRENT_TIMESTAMP, CURRENT_DATE, %s,
-                %s, %s
-            )
-        """, (
-            hk_customer,
-            'API',
-            data.get('address', ''),
-            data.get('contact_person', '')
-        ))
+        # Alten Satelliten-Eintrag historisieren und neuen anlegen (eine Anweisung)
+        created = write_versions(cur, 's_customer_details', [{
+            'hk_customer': hk_customer,
+            'address': data.get('address', ''),
+            'contact_person': data.get('contact_person', '')
+        }])
 
         conn.commit()
+        catalog.bump()
         cur.close()
-        conn.close()
 
         return jsonify({
             'success': True,
-            'message': 'Kunde erfolgreich aktualisiert'
+            'message': 'Kunde erfolgreich aktualisiert',
+            'versionCreated': bool(created)
         }), 200
 
     except Exception as e:
@@ -247,19 +258,23 @@ def update_customer(hk_customer):
 # Beim Abrufen eines einzelnen Kunden
 @customer_bp.route('/api/customers/<hk_customer>', methods=['GET'])
 def get_customer(hk_customer):
+    try:
+        temporal = parse_temporal_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     try:
         conn = get_db_conn()
         cur = conn.cursor()
 
-        cur.execute("""
+        cur.execute(f"""
             SELECT 
                 c.customer_name,
                 cd.address,
                 cd.contact_person
             FROM h_customer c
-            JOIN s_customer_details cd ON c.hk_customer = cd.hk_customer
-            WHERE c.hk_customer::text = %s AND cd.t_to IS NULL
-        """, (hk_customer,))
+            JOIN {temporal.source('s_customer_details')} cd ON c.hk_customer = cd.hk_customer
+            WHERE c.hk_customer::text = %(hk_customer)s AND {temporal.condition('cd')}
+        """, dict(temporal.params(), hk_customer=hk_customer))
 
         customer = cur.fetchone()
         if not customer:
@@ -273,7 +288,6 @@ def get_customer(hk_customer):
         }
 
         cur.close()
-        conn.close()
 
         return jsonify(customer_data), 200
 
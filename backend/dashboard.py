@@ -1,83 +1,163 @@
-from flask import Blueprint, jsonify
-from flask_jwt_extended import jwt_required, get_jwt_identity
+"""
+Dashboard-Kennzahlen des angemeldeten Benutzers.
+
+Die Zusammenfassung ist die Startseite nach dem Login, ändert sich aber nur,
+wenn der Benutzer Zeiteinträge anlegt, ändert oder löscht. Sie liegt daher
+fertig serialisiert im Namensraum ``dashboard`` des Caches (cache.py),
+Schlüssel ``<hk_user>:<datum>``. Die Schreib-Endpunkte in time_matrix.py
+verwerfen den Eintrag nach dem Commit mit invalidate_summary(); Änderungen
+aus anderen Prozessen (Import per CLI, Konsistenzreparatur) kommen über
+invalidation.py an.
+
+Die 7- und 30-Tage-Fenster hängen vom Tag ab. Alle Abfragen rechnen deshalb
+mit dem Datum aus dem Schlüssel statt mit CURRENT_DATE, und ein Eintrag gilt
+höchstens bis Mitternacht. Der Header ``X-Cache`` (HIT/MISS) zeigt, ob die
+Antwort aus dem Cache kam.
+"""
+
+import threading
+from datetime import date, datetime, time, timedelta
+
+from flask import Blueprint, Response, current_app, jsonify
+from flask_jwt_extended import jwt_required
+
+from cache import namespace
 from database import Database
+from identity import current_hk_user
+from invalidation import subscribe
 
 dashboard_bp = Blueprint('dashboard', __name__)
 
+summaries = namespace('dashboard')
+
+# Invalidierungszähler je Benutzer; ein Ergebnis wird nur gespeichert, wenn
+# sich der Zähler während der Berechnung nicht geändert hat (wie catalog.py)
+_generations = {}
+_generation_all = 0
+_generation_lock = threading.Lock()
+
+
+def _generation(hk_user):
+    return _generation_all, _generations.get(hk_user, 0)
+
+
+def invalidate_summary(hk_user=None):
+    """Verwirft die Zusammenfassung eines Benutzers (nach dem Commit aufrufen); ohne Benutzer alle."""
+    global _generation_all
+    with _generation_lock:
+        if hk_user is None:
+            _generation_all += 1
+        else:
+            hk_user = str(hk_user)
+            _generations[hk_user] = _generations.get(hk_user, 0) + 1
+    if hk_user is None:
+        summaries.clear()
+    else:
+        summaries.delete(f'{hk_user}:{date.today().isoformat()}')
+
+
+subscribe('timeentry', invalidate_summary)
+# Die Zusammenfassung enthält Projektnamen
+subscribe('project', lambda hk_project: invalidate_summary())
+
+
+def seconds_until_midnight():
+    midnight = datetime.combine(date.today() + timedelta(days=1), time.min)
+    return max(1, int((midnight - datetime.now()).total_seconds()))
+
+
+def compute_summary(db, user_id, today):
+    """Alle Kennzahlen eines Benutzers zum Stichtag ``today``."""
+    params = {'hk_user': user_id, 'today': today}
+
+    # Alle Kennzahlen kommen aus den vorverdichteten Tagessummen (r_daily_hours),
+    # die bei jeder Änderung eines Zeiteintrags fortgeschrieben werden.
+
+    # Projekte und gebuchte Stunden
+    projects = db.fetch_all("""
+        SELECT p.project_name, SUM(r.hours) as stunden
+        FROM r_daily_hours r
+        JOIN h_project p ON r.hk_project = p.hk_project
+        WHERE r.hk_user = %(hk_user)s AND r.entry_count > 0
+        GROUP BY p.project_name
+        ORDER BY stunden DESC
+    """, params)
+    projektStunden = [{"projektName": row[0], "stunden": float(row[1])} for row in projects]
+
+    # Zeiteinträge der letzten 7 Tage (für Wochenchart)
+    week = db.fetch_all("""
+        SELECT r.entry_date, SUM(r.hours) as stunden
+        FROM r_daily_hours r
+        WHERE r.hk_user = %(hk_user)s AND r.entry_count > 0
+              AND r.entry_date >= %(today)s::date - INTERVAL '6 days'
+        GROUP BY r.entry_date
+        ORDER BY r.entry_date
+    """, params)
+    wochenStunden = [{"datum": str(row[0]), "stunden": float(row[1])} for row in week]
+
+    # Top 3 Projekte
+    topProjekte = projektStunden[:3]
+
+    # Arbeitsorte (letzte 30 Tage)
+    standorte = db.fetch_all("""
+        SELECT NULLIF(r.work_location, '') as standort, SUM(r.hours) as stunden
+        FROM r_daily_hours r
+        WHERE r.hk_user = %(hk_user)s AND r.entry_count > 0
+              AND r.entry_date >= %(today)s::date - INTERVAL '29 days'
+        GROUP BY r.work_location
+        ORDER BY stunden DESC
+    """, params)
+    standortStunden = [{"standort": row[0], "stunden": float(row[1])} for row in standorte]
+
+    # Monatszusammenfassung
+    monatsSummary = db.fetch_one("""
+        SELECT COUNT(DISTINCT r.entry_date) as arbeitstage,
+               SUM(r.hours) as gesamtstunden
+        FROM r_daily_hours r
+        WHERE r.hk_user = %(hk_user)s AND r.entry_count > 0
+              AND r.entry_date >= date_trunc('month', %(today)s::date)::date
+              AND r.entry_date < (date_trunc('month', %(today)s::date) + INTERVAL '1 month')::date
+    """, params)
+    monatsSummary = {
+        "arbeitstage": int(monatsSummary[0] or 0),
+        "gesamtstunden": float(monatsSummary[1] or 0)
+    }
+
+    return {
+        "projektStunden": projektStunden,
+        "wochenStunden": wochenStunden,
+        "topProjekte": topProjekte,
+        "standortStunden": standortStunden,
+        "monatsSummary": monatsSummary
+    }
+
+
 @dashboard_bp.route('/api/dashboard/summary', methods=['GET'])
 @jwt_required()
 def dashboard_summary():
+    # hk_user kommt aus dem Token, keine Abfrage auf h_user nötig
+    user_id = current_hk_user()
+    if not user_id:
+        return jsonify({"error": "Benutzer nicht gefunden"}), 404
+
+    today = date.today()
+    key = f'{user_id}:{today.isoformat()}'
+    body = summaries.get(key)
+    if body is not None:
+        response = Response(body, mimetype='application/json')
+        response.headers['X-Cache'] = 'HIT'
+        return response
+
+    generation = _generation(user_id)
     db = Database()
     try:
-        user = get_jwt_identity()
-        # Hole User-ID (UUID) aus der Datenbank
-        user_result = db.fetch_one("SELECT hk_user FROM h_user WHERE user_id = %s", (user,))
-        if not user_result:
-            return jsonify({"error": "Benutzer nicht gefunden"}), 404
-        user_id = str(user_result[0])
-
-        # Projekte und gebuchte Stunden
-        projects = db.fetch_all("""
-            SELECT p.project_name, 
-                   SUM(EXTRACT(EPOCH FROM (s.end_time - s.start_time))/3600 - COALESCE(s.pause_minutes,0)/60.0) as stunden
-            FROM l_user_project_timeentry l
-            JOIN h_project p ON l.hk_project = p.hk_project
-            JOIN s_timeentry_details s ON l.hk_user_project_timeentry = s.hk_user_project_timeentry
-            WHERE l.hk_user = %s AND l.t_to IS NULL
-            GROUP BY p.project_name
-            ORDER BY stunden DESC
-        """, (user_id,))
-        projektStunden = [{"projektName": row[0], "stunden": float(row[1])} for row in projects]
-
-        # Zeiteinträge der letzten 7 Tage (für Wochenchart)
-        week = db.fetch_all("""
-            SELECT s.entry_date, 
-                   SUM(EXTRACT(EPOCH FROM (s.end_time - s.start_time))/3600 - COALESCE(s.pause_minutes,0)/60.0) as stunden
-            FROM l_user_project_timeentry l
-            JOIN s_timeentry_details s ON l.hk_user_project_timeentry = s.hk_user_project_timeentry
-            WHERE l.hk_user = %s AND l.t_to IS NULL
-                  AND s.entry_date >= CURRENT_DATE - INTERVAL '6 days'
-            GROUP BY s.entry_date
-            ORDER BY s.entry_date
-        """, (user_id,))
-        wochenStunden = [{"datum": str(row[0]), "stunden": float(row[1])} for row in week]
-
-        # Top 3 Projekte
-        topProjekte = projektStunden[:3]
-
-        # Arbeitsorte (letzte 30 Tage)
-        standorte = db.fetch_all("""
-            SELECT s.work_location, 
-                   SUM(EXTRACT(EPOCH FROM (s.end_time - s.start_time))/3600 - COALESCE(s.pause_minutes,0)/60.0) as stunden
-            FROM l_user_project_timeentry l
-            JOIN s_timeentry_details s ON l.hk_user_project_timeentry = s.hk_user_project_timeentry
-            WHERE l.hk_user = %s AND l.t_to IS NULL
-                  AND s.entry_date >= CURRENT_DATE - INTERVAL '29 days'
-            GROUP BY s.work_location
-            ORDER BY stunden DESC
-        """, (user_id,))
-        standortStunden = [{"standort": row[0], "stunden": float(row[1])} for row in standorte]
-
-        # Monatszusammenfassung
-        monatsSummary = db.fetch_one("""
-            SELECT COUNT(DISTINCT s.entry_date) as arbeitstage,
-                   SUM(EXTRACT(EPOCH FROM (s.end_time - s.start_time))/3600 - COALESCE(s.pause_minutes,0)/60.0) as gesamtstunden
-            FROM l_user_project_timeentry l
-            JOIN s_timeentry_details s ON l.hk_user_project_timeentry = s.hk_user_project_timeentry
-            WHERE l.hk_user = %s AND l.t_to IS NULL
-                  AND date_trunc('month', s.entry_date) = date_trunc('month', CURRENT_DATE)
-        """, (user_id,))
-        monatsSummary = {
-            "arbeitstage": int(monatsSummary[0] or 0),
-            "gesamtstunden": float(monatsSummary[1] or 0)
-        }
-
-        return jsonify({
-            "projektStunden": projektStunden,
-            "wochenStunden": wochenStunden,
-            "topProjekte": topProjekte,
-            "standortStunden": standortStunden,
-            "monatsSummary": monatsSummary
-        })
+        summary = compute_summary(db, user_id, today)
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+    # Gleiche Serialisierung wie jsonify
+    body = current_app.json.dumps(summary).encode('utf-8')
+    if _generation(user_id) == generation:
+        summaries.set(key, body, ttl=seconds_until_midnight())
+    response = Response(body, mimetype='application/json')
+    response.headers['X-Cache'] = 'MISS'
+    return response
@@ -1,12 +1,16 @@
 """
 Datenbankverbindungsmodul für das Mitarbeiterportal.
-Implementiert die direkte PostgreSQL-Verbindung mit psycopg2.
+Implementiert den PostgreSQL-Zugriff mit psycopg2. Innerhalb eines Requests
+wird die Verbindung aus dem Pool (siehe db_pool.py) verwendet.
 """
 
 import psycopg2
 import os
 import traceback
-from datetime import datetime
+from flask import has_app_context
+from db_pool import connection_params, get_request_connection
+from pit import as_key_list, refresh_user_pit, refresh_project_pit
+from satellite import close_versions, write_versions
 import hashlib
 import uuid
 
@@ -14,29 +18,35 @@ class Database:
     def __init__(self):
         self.conn = None
         self.cur = None
+        self.pooled = False
         self.connect()
 
     def connect(self):
-        """Stellt die Verbindung zur Datenbank her."""
+        """
+        Stellt die Verbindung zur Datenbank her.
+        Innerhalb eines App-Kontexts wird die Request-Verbindung aus dem Pool
+        verwendet, sonst (z.B. in Skripten) eine eigene Verbindung geöffnet.
+        """
         try:
-            self.conn = psycopg2.connect(
-                host=os.getenv('DB_HOST', 'db'),
-                port=os.getenv('DB_PORT', '5432'),
-                dbname=os.getenv('DB_NAME', 'mitarbeiterportal'),
-                user=os.getenv('DB_USER', 'admin'),
-                password=os.getenv('DB_PASSWORD', 'secret')
-            )
+            if has_app_context():
+                self.conn = get_request_connection()
+                self.pooled = True
+            else:
+                self.conn = psycopg2.connect(**connection_params())
+                print("Datenbankverbindung erfolgreich hergestellt")
             self.cur = self.conn.cursor()
-            print("Datenbankverbindung erfolgreich hergestellt")
         except Exception as e:
             print(f"Fehler beim Verbinden zur Datenbank: {e}")
             raise
 
     def close(self):
-        """Schließt die Datenbankverbindung."""
+        """
+        Schließt den Cursor. Eigene Verbindungen werden geschlossen, die
+        Pool-Verbindung gibt der Teardown-Handler am Request-Ende zurück.
+        """
         if self.cur:
             self.cur.close()
-        if self.conn:
+        if self.conn and not self.pooled:
             self.conn.close()
 
     def commit(self):
@@ -69,6 +79,34 @@ class Database:
         self.execute(query, params)
         return self.cur.fetchall()
 
+    def stream(self, query, params=None, itersize=None):
+        """
+        Führt eine SQL-Abfrage über einen serverseitigen (benannten) Cursor aus
+        und liefert die Datensätze einzeln. Es werden jeweils nur ``itersize``
+        Zeilen vom Server geholt, der Speicherbedarf bleibt damit konstant.
+
+        Args:
+            query (str): Die SQL-Abfrage
+            params (tuple/dict, optional): Parameter der Abfrage
+            itersize (int, optional): Zeilen pro Roundtrip (Standard: DB_STREAM_ITERSIZE)
+        """
+        cursor = self.conn.cursor(name=f"stream_{uuid.uuid4().hex}")
+        cursor.itersize = itersize or int(os.getenv('DB_STREAM_ITERSIZE', '2000'))
+        try:
+            cursor.execute(query, params)
+            for row in cursor:
+                yield row
+        except Exception as e:
+            print(f"Fehler beim Streamen der Abfrage: {e}")
+            self.rollback()
+            raise
+        finally:
+            try:
+                cursor.close()
+            except psycopg2.Error:
+                # Nach einem Rollback existiert der Cursor serverseitig nicht mehr
+                pass
+
     def insert_user(self, email, first_name, last_name, password_hash):
         """Fügt einen neuen Benutzer in die Datenbank ein."""
         try:
@@ -101,7 +139,8 @@ class Database:
                 """,
                 (hk_user, 'WEB_APP', password_hash)
             )
-            
+
+            refresh_user_pit(self, hk_user)
             self.conn.commit()
             return hk_user
         except Exception as e:
@@ -110,47 +149,48 @@ class Database:
             traceback.print_exc()
             raise
 
-    def get_user_by_email(self, email):
+    def get_user_by_email(self, email, temporal=None):
+        """
+        Args:
+            temporal (TemporalQuery, optional): Stand zu einem Zeitpunkt statt der aktuellen Version
+        """
+        if temporal is not None and temporal.active:
+            return self.fetch_one(f"""
+                SELECT h.hk_user, h.user_id, d.first_name, d.last_name, d.position, d.core_hours, d.telefon, l.password_hash, d.is_admin
+                FROM h_user h
+                LEFT JOIN {temporal.source('s_user_details')} d ON d.hk_user = h.hk_user AND {temporal.condition('d')}
+                LEFT JOIN {temporal.source('s_user_login')} l ON l.hk_user = h.hk_user AND {temporal.condition('l')}
+                WHERE h.user_id = %(email)s AND h.t_to IS NULL
+            """, dict(temporal.params(), email=email))
         return self.fetch_one("""
             SELECT h.hk_user, h.user_id, d.first_name, d.last_name, d.position, d.core_hours, d.telefon, l.password_hash, d.is_admin
             FROM h_user h
-            LEFT JOIN s_user_details d ON h.hk_user = d.hk_user AND d.t_to IS NULL
-            LEFT JOIN s_user_login l ON h.hk_user = l.hk_user AND l.t_to IS NULL
+            LEFT JOIN pit_user p ON p.hk_user = h.hk_user
+            LEFT JOIN s_user_details d ON d.hk_user = h.hk_user AND d.t_from = p.user_details_t_from
+            LEFT JOIN s_user_login l ON l.hk_user = h.hk_user AND l.t_from = p.user_login_t_from
             WHERE h.user_id = %s AND h.t_to IS NULL
         """, (email,))
 
     def update_user_details(self, hk_user, update_data):
-        """Aktualisiert die Benutzerdetails."""
-        try:
-            now = datetime.utcnow()
-            today = datetime.now().date()
-
-            # Aktuelle Details als historisch markieren
-            self.execute(
-                """
-                UPDATE s_user_details
-                SET t_to = %s, b_to = %s
-                WHERE hk_user = %s AND t_to IS NULL
-                """,
-                (now, today, hk_user)
-            )
-
-            # Neue Details einfügen
-            self.execute(
-                """
-                INSERT INTO s_user_details 
-                (hk_user, t_from, b_from, rec_src, first_name, last_name, position, core_hours, telefon)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-                """,
-                (hk_user, now, today, 'API',
-                 update_data.get('firstName'),
-                 update_data.get('lastName'),
-                 update_data.get('position'),
-                 update_data.get('coreHours'),
-                 update_data.get('telefon'))
-            )
+        """
+        Aktualisiert die Benutzerdetails (nicht übergebene Attribute wie is_admin bleiben erhalten).
 
+        Returns:
+            bool: True, wenn eine neue Version angelegt wurde; False bei unveränderten Werten
+        """
+        try:
+            created = write_versions(self, 's_user_details', [{
+                'hk_user': hk_user,
+                'first_name': update_data.get('firstName'),
+                'last_name': update_data.get('lastName'),
+                'position': update_data.get('position'),
+                'core_hours': update_data.get('coreHours'),
+                'telefon': update_data.get('telefon'),
+            }])
+            if created:
+                refresh_user_pit(self, hk_user)
             self.commit()
+            return bool(created)
         except Exception as e:
             self.rollback()
             raise
@@ -164,32 +204,12 @@ class Database:
             new_password_hash (str): Der Hash des neuen Passworts
         """
         try:
-            now = datetime.utcnow()
-            today = datetime.now().date()
-
             # Debug-Ausgabe
             print(f"Aktualisiere Passwort für hk_user {hk_user}")
 
-            # Aktuelle Login-Daten als historisch markieren
-            self.execute(
-                """
-                UPDATE s_user_login
-                SET t_to = %s, b_to = %s
-                WHERE hk_user = %s AND t_to IS NULL
-                """,
-                (now, today, hk_user)
-            )
-
-            # Neue Login-Daten einfügen
-            self.execute(
-                """
-                INSERT INTO s_user_login 
-                (hk_user, t_from, b_from, rec_src, password_hash)
-                VALUES (%s, %s, %s, %s, %s)
-                """,
-                (hk_user, now, today, 'API', new_password_hash)
-            )
+            write_versions(self, 's_user_login', [{'hk_user': hk_user, 'password_hash': new_password_hash}])
 
+            refresh_user_pit(self, hk_user)
             self.commit()
             print(f"Passwort erfolgreich aktualisiert für hk_user {hk_user}")
         except Exception as e:
@@ -239,11 +259,11 @@ class Database:
         Args:
             hk_user (bytes): Die ID des Benutzers
             hk_project (bytes oder None): Die ID des Projekts oder None, wenn kein Projekt ausgewählt ist
+
+        Returns:
+            bool: True, wenn sich die Zuordnung geändert hat
         """
         try:
-            now = datetime.utcnow()
-            today = datetime.now().date()
-            
             # Debug-Ausgabe
             print(f"UPDATE_USER_PROJECT:")
             print(f"- hk_user: {hk_user.hex() if isinstance(hk_user, bytes) else hk_user}")
@@ -252,19 +272,13 @@ class Database:
             else:
                 print("- hk_project: None (kein Projekt)")
             
-            # Aktuelle Projektverknüpfungen als historisch markieren
-            rows_updated = self.execute(
-                """
-                UPDATE s_user_current_project
-                SET t_to = %s, b_to = %s
-                WHERE hk_user = %s AND t_to IS NULL
-                """,
-                (now, today, hk_user)
-            ).rowcount
-            print(f"- Historisierte Einträge: {rows_updated}")
-            
-            # Wenn ein Projekt gesetzt wird, fügen wir es ein
-            if hk_project:
+            if not hk_project:
+                # Kein Projekt: nur die aktuelle Zuordnung schließen
+                changed = close_versions(self, 's_user_current_project', hk_user)
+                print(f"- Historisierte Einträge: {len(changed)}")
+            else:
+                hk_project = as_key_list(hk_project)[0]
+
                 # Prüfen, ob das Projekt existiert
                 project_exists = self.fetch_one("""
                     SELECT COUNT(*) FROM h_project 
@@ -273,47 +287,30 @@ class Database:
                 
                 if not project_exists or project_exists[0] == 0:
                     print(f"- Projekt existiert nicht in h_project. Erstelle es zuerst")
-                    # Projekt erstellen
-                    self.execute("""
-                        INSERT INTO h_project (hk_project, t_from, rec_src)
-                        VALUES (%s, %s, %s)
-                    """, (hk_project, now, 'API'))
-                    
-                    # Projektdetails erstellen
+                    project_name = f'Projekt {hk_project[:8]}'
                     self.execute("""
-                        INSERT INTO s_project_details 
-                        (hk_project, t_from, b_from, rec_src, project_name, project_description)
-                        VALUES (%s, %s, %s, %s, %s, %s)
-                    """, (hk_project, now, today, 'API', f'Projekt {hk_project.hex()[:8]}', 'Automatisch erstellt'))
-                    
-                    print(f"- Projekt wurde erstellt: {hk_project.hex()}")
+                        INSERT INTO h_project (hk_project, project_name, t_from, rec_src)
+                        VALUES (%s, %s, CURRENT_TIMESTAMP, %s)
+                    """, (hk_project, project_name, 'API'))
+                    write_versions(self, 's_project_details', [{
+                        'hk_project': hk_project,
+                        'project_name': project_name,
+                        'description': 'Automatisch erstellt',
+                    }])
+                    refresh_project_pit(self, hk_project)
+                    print(f"- Projekt wurde erstellt: {hk_project}")
                 
-                # Projekt-Benutzer-Verknüpfung erstellen
-                self.execute(
-                    """
-                    INSERT INTO s_user_current_project 
-                    (hk_user, hk_project, t_from, b_from, rec_src)
-                    VALUES (%s, %s, %s, %s, %s)
-                    """,
-                    (hk_user, hk_project, now, today, 'API')
-                )
-                print(f"- Neue Projekt-Benutzer-Verknüpfung erstellt")
-                
-                # Nach dem Einfügen überprüfen, ob die Verknüpfung erstellt wurde
-                check = self.fetch_one("""
-                    SELECT hk_project::text
-                    FROM s_user_current_project
-                    WHERE hk_user = %s AND hk_project = %s AND t_to IS NULL
-                """, (hk_user, hk_project))
-                
-                if check:
-                    print(f"- ERFOLG: Verknüpfung wurde erstellt und ist aktiv: {check[0]}")
-                else:
-                    print("- FEHLER: Verknüpfung konnte nicht erstellt werden!")
+                # Alte Zuordnung schließen und neue anlegen in einer Anweisung
+                changed = write_versions(self, 's_user_current_project', [{'hk_user': hk_user, 'hk_project': hk_project}])
+                print(f"- Neue Projekt-Benutzer-Verknüpfung erstellt" if changed else "- Projekt unverändert")
             
+            if changed:
+                refresh_user_pit(self, hk_user)
+
             # WICHTIG: Commit der Transaktion!
             self.commit()
             print("- Transaktion erfolgreich abgeschlossen")
+            return bool(changed)
             
         except Exception as e:
             # Bei einem Fehler Rollback durchführen
@@ -0,0 +1,284 @@
+"""
+Verbindungspool für das Mitarbeiterportal.
+Hält eine begrenzte Anzahl von PostgreSQL-Verbindungen offen und gibt pro
+Request genau eine Verbindung über Flask ``g`` aus. Die Rückgabe an den Pool
+erfolgt im Teardown-Handler der App.
+"""
+
+import os
+import threading
+import time
+from collections import deque
+
+import psycopg2
+import psycopg2.extensions
+from flask import g
+
+from metrics import InstrumentedCursor, observe_pool_wait
+
+
+class PoolTimeoutError(Exception):
+    """Wird ausgelöst, wenn innerhalb des Timeouts keine Verbindung frei wird."""
+
+
+def connection_params():
+    """Liest die Verbindungsparameter aus den Umgebungsvariablen."""
+    return {
+        'host': os.getenv('DB_HOST', 'db'),
+        'port': os.getenv('DB_PORT', '5432'),
+        'dbname': os.getenv('DB_NAME', 'mitarbeiterportal'),
+        'user': os.getenv('DB_USER', 'admin'),
+        'password': os.getenv('DB_PASSWORD', 'secret'),
+    }
+
+
+class ConnectionPool:
+    """
+    Threadsicherer Pool mit Mindest- und Höchstgröße.
+
+    Args:
+        minconn (int): Anzahl Verbindungen, die beim Start geöffnet werden
+        maxconn (int): Maximale Anzahl gleichzeitig offener Verbindungen
+        timeout (float): Sekunden, die checkout() auf eine freie Verbindung wartet
+        health_check_interval (float): Verbindungen, die länger als diese Anzahl
+            Sekunden unbenutzt waren, werden vor der Ausgabe mit ``SELECT 1`` geprüft
+    """
+
+    def __init__(self, minconn=1, maxconn=10, timeout=5.0, health_check_interval=30.0, **connect_kwargs):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError("Ungültige Poolgröße: minconn=%s, maxconn=%s" % (minconn, maxconn))
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.health_check_interval = health_check_interval
+        self._connect_kwargs = connect_kwargs
+        self._cond = threading.Condition()
+        self._idle = deque()  # (conn, zeitpunkt_der_rueckgabe)
+        self._in_use = set()
+        self._opening = 0
+        self._closed = False
+
+        # Statistik
+        self._checkouts = 0
+        self._checkout_failures = 0
+        self._health_check_failures = 0
+        self._waits = 0
+        self._wait_time_total = 0.0
+        self._wait_time_max = 0.0
+
+        for _ in range(minconn):
+            try:
+                self._idle.append((self._connect(), time.monotonic()))
+            except psycopg2.Error as e:
+                # Datenbank evtl. noch nicht bereit – Verbindungen werden bei Bedarf geöffnet
+                print(f"Pool: Vorab-Verbindung fehlgeschlagen: {e}")
+                break
+
+    def _connect(self):
+        return psycopg2.connect(**self._connect_kwargs)
+
+    def _total(self):
+        return len(self._idle) + len(self._in_use) + self._opening
+
+    def _is_healthy(self, conn, idle_since):
+        """Prüft eine Verbindung vor der Ausgabe."""
+        if conn.closed:
+            return False
+        status = conn.get_transaction_status()
+        if status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            return False
+        if time.monotonic() - idle_since < self.health_check_interval:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except psycopg2.Error:
+            return False
+
+    def _discard(self, conn):
+        try:
+            if not conn.closed:
+                conn.close()
+        except psycopg2.Error:
+            pass
+
+    def checkout(self):
+        """
+        Gibt eine geprüfte Verbindung aus dem Pool zurück.
+
+        Raises:
+            PoolTimeoutError: Wenn innerhalb von ``timeout`` keine Verbindung frei wird
+        """
+        started = time.monotonic()
+        deadline = started + self.timeout
+        waited = False
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise PoolTimeoutError("Verbindungspool wurde geschlossen")
+                while not self._idle and self._total() >= self.maxconn:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self._checkout_failures += 1
+                        self._record_wait(time.monotonic() - started, waited)
+                        raise PoolTimeoutError(
+                            f"Keine freie Datenbankverbindung nach {self.timeout:.1f}s "
+                            f"(max. {self.maxconn} Verbindungen)"
+                        )
+                    waited = True
+                    self._cond.wait(remaining)
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    self._opening += 1  # Platz reservieren, solange geprüft wird
+                    fresh = False
+                else:
+                    conn, idle_since = None, None
+                    self._opening += 1
+                    fresh = True
+
+            # Verbindungsaufbau und Health-Check außerhalb des Locks
+            try:
+                if fresh:
+                    conn = self._connect()
+                elif not self._is_healthy(conn, idle_since):
+                    with self._cond:
+                        self._health_check_failures += 1
+                    self._discard(conn)
+                    conn = self._connect()
+            except psycopg2.Error:
+                with self._cond:
+                    self._opening -= 1
+                    self._checkout_failures += 1
+                    self._cond.notify()
+                raise
+
+            with self._cond:
+                self._opening -= 1
+                self._in_use.add(conn)
+                self._checkouts += 1
+                self._record_wait(time.monotonic() - started, waited)
+            return conn
+
+    def _record_wait(self, duration, waited):
+        observe_pool_wait(duration)
+        if waited:
+            self._waits += 1
+        self._wait_time_total += duration
+        self._wait_time_max = max(self._wait_time_max, duration)
+
+    def checkin(self, conn):
+        """Gibt eine Verbindung an den Pool zurück und beendet offene Transaktionen."""
+        healthy = not conn.closed
+        if healthy and conn.get_transaction_status() != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+            try:
+                conn.rollback()
+            except psycopg2.Error:
+                healthy = False
+        with self._cond:
+            self._in_use.discard(conn)
+            if healthy and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+            else:
+                self._discard(conn)
+            self._cond.notify()
+
+    def stats(self):
+        """Liefert eine Momentaufnahme der Poolauslastung."""
+        with self._cond:
+            return {
+                'min': self.minconn,
+                'max': self.maxconn,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'opening': self._opening,
+                'checkouts': self._checkouts,
+                'checkout_failures': self._checkout_failures,
+                'health_check_failures': self._health_check_failures,
+                'waits': self._waits,
+                'wait_time_total_ms': round(self._wait_time_total * 1000, 3),
+                'wait_time_avg_ms': round(self._wait_time_total * 1000 / self._checkouts, 3) if self._checkouts else 0.0,
+                'wait_time_max_ms': round(self._wait_time_max * 1000, 3),
+            }
+
+    def closeall(self):
+        """Schließt alle freien Verbindungen; ausgegebene werden bei der Rückgabe geschlossen."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._discard(conn)
+            self._cond.notify_all()
+
+
+_pool = None
+_pool_lock = threading.Lock()
+# Pools aus dem Elternprozess: nur referenziert halten, nie im Kind schließen –
+# sonst beendet der Destruktor die Verbindungen, die der Elternprozess noch nutzt
+_inherited_pools = []
+
+
+def get_pool():
+    """Gibt den prozessweiten Pool zurück und legt ihn beim ersten Aufruf an."""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                _pool = ConnectionPool(
+                    minconn=int(os.getenv('DB_POOL_MIN', '1')),
+                    maxconn=int(os.getenv('DB_POOL_MAX', '10')),
+                    timeout=float(os.getenv('DB_POOL_TIMEOUT', '5')),
+                    health_check_interval=float(os.getenv('DB_POOL_HEALTHCHECK_INTERVAL', '30')),
+                    # Alle Cursor auf Pool-Verbindungen werden gemessen (siehe metrics.py)
+                    cursor_factory=InstrumentedCursor,
+                    **connection_params()
+                )
+    return _pool
+
+
+def reset_after_fork():
+    """
+    Verwirft einen vom Elternprozess geerbten Pool (z.B. im post_fork-Hook von
+    gunicorn). Jeder Worker legt beim ersten Request seinen eigenen Pool an.
+    """
+    global _pool, _pool_lock
+    if _pool is not None:
+        _inherited_pools.append(_pool)
+    _pool = None
+    _pool_lock = threading.Lock()
+
+
+def close_pool():
+    """Schließt den Pool des aktuellen Prozesses (z.B. beim Beenden eines Workers)."""
+    if _pool is not None:
+        _pool.closeall()
+
+
+def pool_stats():
+    """Statistik des Pools oder ``None``, falls er noch nicht angelegt wurde."""
+    return _pool.stats() if _pool is not None else None
+
+
+def get_request_connection():
+    """
+    Gibt die Verbindung des aktuellen Requests zurück.
+    Beim ersten Aufruf im Request wird sie aus dem Pool geholt.
+    """
+    conn = g.get('db_conn')
+    if conn is None:
+        conn = get_pool().checkout()
+        g.db_conn = conn
+    return conn
+
+
+def release_request_connection(exc=None):
+    """Teardown-Handler: gibt die Verbindung des Requests an den Pool zurück."""
+    conn = g.pop('db_conn', None)
+    if conn is not None:
+        get_pool().checkin(conn)
+
+
+def init_app(app):
+    """Registriert die Rückgabe der Request-Verbindung bei der App."""
+    app.teardown_appcontext(release_request_connection)
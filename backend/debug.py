@@ -0,0 +1,162 @@
+"""
+Debug-Endpunkte zur Kontrolle von Tabelleninhalten und Verbindungspool.
+"""
+
+from flask import Blueprint, jsonify
+from database import Database
+import db_pool
+
+debug_bp = Blueprint('debug', __name__)
+
+# Debug-Endpunkt, um Tabellenstrukturen zu überprüfen
+@debug_bp.route("/api/debug/tables")
+def debug_tables():
+    db = Database()
+    try:
+        # Überprüfe, ob die s_user_current_project Tabelle existiert
+        project_table_exists = db.fetch_one("""
+            SELECT EXISTS (
+               SELECT FROM information_schema.tables 
+               WHERE table_name = 's_user_current_project'
+            );
+        """)
+        
+        # Überprüfe Projekteinträge für einen Beispielbenutzer
+        sample_user = db.fetch_one("SELECT hk_user FROM h_user LIMIT 1")
+        if sample_user:
+            user_projects = db.fetch_all("""
+                SELECT encode(hk_user, 'hex') as user_id, 
+                       encode(hk_project, 'hex') as project_id, 
+                       t_from, t_to
+                FROM s_user_current_project
+                WHERE hk_user = %s
+                ORDER BY t_from DESC
+            """, (sample_user[0],))
+        else:
+            user_projects = []
+        
+        return jsonify({
+            "s_user_current_project_exists": project_table_exists[0] if project_table_exists else False,
+            "sample_user_projects": [
+                {
+                    "user_id": p[0],
+                    "project_id": p[1],
+                    "t_from": p[2].isoformat() if p[2] else None,
+                    "t_to": p[3].isoformat() if p[3] else None
+                }
+                for p in user_projects
+            ]
+        })
+    except Exception as e:
+        return jsonify({"error": str(e)}), 500
+    finally:
+        db.close()
+
+@debug_bp.route("/api/debug/project-table")
+def debug_project_table():
+    db = Database()
+    try:
+        # Überprüfe, ob die Tabelle existiert
+        table_exists = db.fetch_one("""
+            SELECT EXISTS (
+                SELECT FROM information_schema.tables 
+                WHERE table_schema = 'public' 
+                AND table_name = 's_user_current_project'
+            )
+        """)
+        
+        # Wenn die Tabelle existiert, hole einige Einträge
+        if table_exists and table_exists[0]:
+            entries = db.fetch_all("""
+                SELECT 
+                    encode(hk_user, 'hex') as hk_user,
+                    encode(hk_project, 'hex') as hk_project,
+                    t_from,
+                    t_to,
+                    rec_src
+                FROM s_user_current_project
+                ORDER BY t_from DESC
+                LIMIT 10
+            """)
+            
+            formatted_entries = []
+            for entry in entries:
+                formatted_entries.append({
+                    'hk_user': entry[0],
+                    'hk_project': entry[1],
+                    't_from': str(entry[2]),
+                    't_to': str(entry[3]) if entry[3] else None,
+                    'rec_src': entry[4]
+                })
+            
+            return jsonify({
+                'table_exists': True,
+                'entries': formatted_entries
+            })
+        else:
+            return jsonify({
+                'table_exists': False,
+                'message': 'Tabelle s_user_current_project existiert nicht'
+            })
+    except Exception as e:
+        return jsonify({
+            'error': str(e)
+        }), 500
+    finally:
+        db.close()
+
+@debug_bp.route("/api/debug/pool")
+def debug_pool():
+    """Debug-Endpunkt mit der aktuellen Auslastung des Verbindungspools"""
+    stats = db_pool.pool_stats()
+    if stats is None:
+        return jsonify({'initialized': False})
+    return jsonify({'initialized': True, **stats})
+
+@debug_bp.route("/api/debug/check-projects")
+def debug_check_projects():
+    """Debug-Endpunkt zum Überprüfen aller Projekteinträge"""
+    db = Database()
+    try:
+        # Alle User mit ihren Projektzuordnungen in einer Abfrage (json_agg je User)
+        users = db.fetch_all("""
+            SELECT
+                u.user_id,
+                replace(u.hk_user::text, '-', '') AS hk_user_hex,
+                COALESCE(
+                    json_agg(
+                        json_build_object(
+                            'project_hex', replace(cp.hk_project::text, '-', ''),
+                            't_from', cp.t_from::text,
+                            't_to', cp.t_to::text,
+                            'project_name', COALESCE(p.project_name, 'Unbekannt'),
+                            'is_active', cp.t_to IS NULL
+                        ) ORDER BY cp.t_from DESC
+                    ) FILTER (WHERE cp.hk_user IS NOT NULL),
+                    '[]'::json
+                ) AS projects,
+                COALESCE(bool_or(cp.t_to IS NULL) FILTER (WHERE cp.hk_user IS NOT NULL), FALSE) AS has_active_project
+            FROM h_user u
+            LEFT JOIN s_user_current_project cp ON cp.hk_user = u.hk_user
+            LEFT JOIN s_project_details p ON p.hk_project = cp.hk_project AND p.t_to IS NULL
+            GROUP BY u.user_id, u.hk_user
+            ORDER BY u.user_id
+        """)
+
+        return jsonify({
+            'users_with_projects': [
+                {
+                    'email': user[0],
+                    'hk_user': user[1],
+                    'projects': user[2],
+                    'has_active_project': user[3]
+                }
+                for user in users
+            ]
+        })
+    except Exception as e:
+        return jsonify({
+            'error': str(e)
+        }), 500
+    finally:
+        db.close()
@@ -0,0 +1,76 @@
+"""
+gunicorn-Konfiguration für das Backend.
+
+Mehrere Worker-Prozesse mit je mehreren Threads (gthread). Die App wird vor
+dem Fork geladen (preload_app); Verbindungspool, Protokoll-Writer und
+Invalidierungs-Listener werden in jedem Worker neu initialisiert, damit kein Prozess Sockets oder Threads
+des Elternprozesses weiterverwendet.
+
+Pro Worker hält der Pool bis zu DB_POOL_MAX Verbindungen. Insgesamt öffnet
+das Backend also höchstens GUNICORN_WORKERS × DB_POOL_MAX Verbindungen;
+DB_POOL_MAX sollte mindestens GUNICORN_THREADS betragen.
+"""
+
+import multiprocessing
+import os
+
+bind = os.getenv('GUNICORN_BIND', '0.0.0.0:5050')
+workers = int(os.getenv('GUNICORN_WORKERS', str(multiprocessing.cpu_count() * 2 + 1)))
+threads = int(os.getenv('GUNICORN_THREADS', '4'))
+worker_class = 'gthread'
+preload_app = os.getenv('GUNICORN_PRELOAD', '1') == '1'
+timeout = int(os.getenv('GUNICORN_TIMEOUT', '60'))
+graceful_timeout = int(os.getenv('GUNICORN_GRACEFUL_TIMEOUT', '30'))
+keepalive = int(os.getenv('GUNICORN_KEEPALIVE', '5'))
+# Worker nach einer Anzahl Requests neu starten (0 = nie)
+max_requests = int(os.getenv('GUNICORN_MAX_REQUESTS', '0'))
+max_requests_jitter = int(os.getenv('GUNICORN_MAX_REQUESTS_JITTER', '0'))
+accesslog = os.getenv('GUNICORN_ACCESSLOG') or None
+errorlog = '-'
+loglevel = os.getenv('GUNICORN_LOGLEVEL', 'info')
+
+
+def on_starting(server):
+    """Monatspartitionen der kommenden Monate anlegen und abgelaufene Protokollmonate löschen."""
+    from database import Database
+    from partitions import run_maintenance
+
+    try:
+        db = Database()
+    except Exception as e:
+        server.log.warning("Partitionspflege übersprungen: %s", e)
+        return
+    try:
+        created, dropped = run_maintenance(db)
+        db.commit()
+        if created:
+            server.log.info("Partitionen angelegt: %s", ", ".join(created))
+        if dropped:
+            server.log.info("Partitionen gelöscht: %s", ", ".join(dropped))
+    except Exception as e:
+        db.rollback()
+        server.log.warning("Partitionspflege fehlgeschlagen: %s", e)
+    finally:
+        db.close()
+
+
+def post_fork(server, worker):
+    """Eigener Pool, Protokoll-Thread und Invalidierungs-Listener pro Worker."""
+    import db_pool
+    from invalidation import listener
+    from log import writer
+
+    db_pool.reset_after_fork()
+    writer.reset_after_fork()
+    listener.reset_after_fork()
+
+
+def worker_exit(server, worker):
+    """Anstehende Protokolleinträge schreiben und Verbindungen schließen."""
+    import db_pool
+    from invalidation import listener
+    from log import writer
+
+    listener.stop()
+    writer.stop()
+    db_pool.close_pool()
@@ -0,0 +1,164 @@
+"""
+Identität des angemeldeten Benutzers aus dem JWT.
+
+Beim Login erhält das Token zusätzlich die Claims ``hk_user`` und ``is_admin``.
+Die Endpunkte lesen sie über current_hk_user() / current_is_admin(), ohne
+die Datenbank abzufragen. Damit Änderungen durch einen Admin (Rechte
+entzogen, Benutzer gelöscht) trotzdem sofort greifen, werden alle vor dem
+Zeitpunkt einer Sperre ausgestellten Tokens des Benutzers abgelehnt. Die
+Sperren hält jeder Prozess im Speicher und lädt sie höchstens alle
+TOKEN_REVOCATION_REFRESH Sekunden neu, bei einer neuen Sperre in einem
+anderen Prozess sofort (Benachrichtigung über invalidation.py).
+
+``iat`` hat nur Sekundengenauigkeit. Abgelehnt werden daher Tokens, die in
+einer vollen Sekunde vor der Sperre ausgestellt wurden; ein direkt danach
+(in derselben Sekunde) ausgestelltes Token bleibt gültig. Der Sperrzeitpunkt
+stammt immer aus der Datenbank, nie aus der Uhr des App-Servers.
+
+Ältere Tokens ohne Claim ``hk_user`` werden über den Namensraum
+``identity`` des gemeinsamen Caches (cache.py) aufgelöst; jede Änderung an
+einem Benutzer verwirft diese Zuordnungen.
+"""
+
+import math
+import os
+import threading
+import time
+
+from flask import current_app, g
+from flask_jwt_extended import get_jwt, get_jwt_identity
+
+from cache import namespace
+from database import Database
+from invalidation import INVALIDATION_ENABLED, subscribe
+
+# Mit Invalidierung nur noch als Rückfallebene, ohne sie bestimmt der Wert die Verzögerung
+TOKEN_REVOCATION_REFRESH = float(os.getenv('TOKEN_REVOCATION_REFRESH', '300' if INVALIDATION_ENABLED else '30'))
+
+# user_id -> hk_user für Tokens ohne Claim; ein leerer Wert steht für "kein Benutzer"
+user_keys = namespace('identity')
+subscribe('user', lambda hk_user: user_keys.clear())
+
+
+def identity_claims(hk_user, is_admin):
+    """Zusätzliche Claims für create_access_token."""
+    return {'hk_user': str(hk_user), 'is_admin': bool(is_admin)}
+
+
+def current_hk_user():
+    """
+    hk_user des angemeldeten Benutzers aus dem Token.
+    Ältere Tokens ohne Claim werden einmal pro Request über den Cache bzw.
+    die Datenbank aufgelöst.
+    """
+    hk_user = get_jwt().get('hk_user')
+    if hk_user:
+        return hk_user
+    if 'identity_hk_user' not in g:
+        user_id = str(get_jwt_identity())
+        cached = user_keys.get(user_id)
+        if cached is None:
+            db = Database()
+            try:
+                row = db.fetch_one(
+                    "SELECT hk_user FROM h_user WHERE user_id = %s AND t_to IS NULL", (user_id,)
+                )
+            finally:
+                db.close()
+            cached = str(row[0]).encode('ascii') if row else b''
+            user_keys.set(user_id, cached)
+        g.identity_hk_user = cached.decode('ascii') or None
+    return g.identity_hk_user
+
+
+def current_is_admin():
+    """Admin-Flag des angemeldeten Benutzers aus dem Token (Fallback: Datenbank)."""
+    claims = get_jwt()
+    if 'is_admin' in claims:
+        return bool(claims['is_admin'])
+    from admin import is_admin
+    return bool(is_admin(get_jwt_identity()))
+
+
+class RevocationCache:
+    """Prozesslokale Sicht auf auth_token_revocations: hk_user -> Sperrzeitpunkt (Epoch)."""
+
+    def __init__(self, refresh_interval=TOKEN_REVOCATION_REFRESH):
+        self.refresh_interval = refresh_interval
+        self._revoked = {}
+        self._loaded_at = None
+        self._lock = threading.Lock()
+
+    def _max_token_age(self):
+        expires = current_app.config.get('JWT_ACCESS_TOKEN_EXPIRES')
+        return expires.total_seconds() if expires else 24 * 3600
+
+    def _refresh_if_due(self):
+        now = time.monotonic()
+        if self._loaded_at is not None and now - self._loaded_at < self.refresh_interval:
+            return
+        with self._lock:
+            if self._loaded_at is not None and now - self._loaded_at < self.refresh_interval:
+                return
+            # Ältere Sperren betreffen nur bereits abgelaufene Tokens
+            db = Database()
+            try:
+                rows = db.fetch_all("""
+                    SELECT hk_user::text, EXTRACT(EPOCH FROM revoked_at)
+                    FROM auth_token_revocations
+                    WHERE revoked_at > NOW() - make_interval(secs => %s)
+                """, (self._max_token_age(),))
+            finally:
+                db.close()
+            self._revoked = {row[0]: float(row[1]) for row in rows}
+            self._loaded_at = now
+
+    def revoked_at(self, hk_user):
+        self._refresh_if_due()
+        return self._revoked.get(hk_user)
+
+    def mark(self, hk_user, revoked_at):
+        """Übernimmt eine neue Sperre (Epoch laut Datenbank) sofort in den Cache dieses Prozesses."""
+        self._revoked[str(hk_user)] = revoked_at
+
+    def invalidate(self):
+        """Erzwingt ein Neuladen beim nächsten Zugriff."""
+        self._loaded_at = None
+
+
+revocations = RevocationCache()
+subscribe('revocation', lambda hk_user: revocations.invalidate())
+
+
+def revoke_user_tokens(db, hk_user):
+    """
+    Sperrt alle bis jetzt ausgestellten Tokens eines Benutzers.
+    Läuft in der Transaktion des Aufrufers (``db`` = Database oder Cursor);
+    erst nach dessen Commit revocations.mark() mit dem Rückgabewert aufrufen,
+    sonst sperrt der Prozess bei einem Rollback Tokens ohne gespeicherte Sperre.
+
+    Returns:
+        float: Zeitpunkt der Sperre (Epoch laut Datenbank)
+    """
+    cur = getattr(db, 'cur', db)
+    cur.execute("""
+        INSERT INTO auth_token_revocations (hk_user, revoked_at)
+        VALUES (%s, NOW())
+        ON CONFLICT (hk_user) DO UPDATE SET revoked_at = EXCLUDED.revoked_at
+        RETURNING EXTRACT(EPOCH FROM revoked_at)
+    """, (str(hk_user),))
+    return float(cur.fetchone()[0])
+
+
+def is_token_revoked(jwt_header, jwt_payload):
+    """Blocklist-Callback für Flask-JWT-Extended."""
+    hk_user = jwt_payload.get('hk_user')
+    if not hk_user:
+        return False
+    revoked_at = revocations.revoked_at(hk_user)
+    return revoked_at is not None and jwt_payload.get('iat', 0) < math.floor(revoked_at)
+
+
+def init_app(jwt):
+    """Registriert die Sperrprüfung beim JWTManager."""
+    jwt.token_in_blocklist_loader(is_token_revoked)
@@ -0,0 +1,161 @@
+"""
+Prozessübergreifende Cache-Invalidierung über PostgreSQL LISTEN/NOTIFY.
+
+Trigger auf Hubs, Links und Satelliten (Migration 0012) senden bei jeder
+Änderung '<entität>:<schlüssel>' auf dem Kanal CHANNEL – erst mit dem
+Commit und unabhängig davon, welcher Prozess (Worker, CLI, psql) schreibt.
+Jeder Worker-Prozess hält einen Listener-Thread mit eigener Verbindung
+außerhalb des Pools und ruft für jede Nachricht die mit subscribe()
+registrierten Handler auf, z.B.:
+
+    subscribe('project', lambda hk_project: catalog.bump())
+
+Entitäten: user, project, customer (Hub-Schlüssel) sowie timeentry und
+revocation (jeweils hk_user).
+
+Während eines Verbindungsabbruchs gehen Nachrichten verloren. Nach jedem
+(Neu-)Verbinden erhalten deshalb alle Handler einmal ``None`` als Schlüssel
+und verwerfen ihren gesamten Bestand.
+
+Wie der Protokoll-Writer (log.py) startet der Thread beim ersten Request
+des Prozesses; nach einem fork() setzt reset_after_fork() ihn zurück.
+"""
+
+import os
+import select
+import threading
+import time
+
+import psycopg2
+
+from db_pool import connection_params
+
+CHANNEL = 'cache_invalidation'
+INVALIDATION_ENABLED = os.getenv('INVALIDATION_ENABLED', '1') == '1'
+# Wartezeit vor einem erneuten Verbindungsversuch
+INVALIDATION_RECONNECT_DELAY = float(os.getenv('INVALIDATION_RECONNECT_DELAY', '5'))
+# Höchstens so lange blockiert select(), damit stop() zeitnah greift
+POLL_INTERVAL = 1.0
+
+# Entität -> Liste von Handlern handler(schlüssel)
+_handlers = {}
+
+
+def subscribe(entity, handler):
+    """Registriert ``handler(schlüssel)`` für Änderungen an ``entity``; ``None`` heißt: alles verwerfen."""
+    _handlers.setdefault(entity, []).append(handler)
+
+
+def dispatch(entity, key):
+    """Ruft die Handler einer Entität auf; Fehler einzelner Handler stoppen die übrigen nicht."""
+    for handler in _handlers.get(entity, ()):
+        try:
+            handler(key)
+        except Exception as e:
+            print(f"Cache-Invalidierung: Handler für {entity} fehlgeschlagen: {e}")
+
+
+def dispatch_all():
+    """Alle Caches vollständig verwerfen (nach dem (Neu-)Verbinden)."""
+    for entity in list(_handlers):
+        dispatch(entity, None)
+
+
+def parse_payload(payload):
+    """'project:<uuid>' -> ('project', '<uuid>'); leerer Schlüssel -> None."""
+    entity, _, key = payload.partition(':')
+    return entity, key or None
+
+
+class InvalidationListener:
+    """Hintergrund-Thread, der CHANNEL abonniert und die Handler aufruft."""
+
+    def __init__(self, reconnect_delay=INVALIDATION_RECONNECT_DELAY):
+        self.reconnect_delay = reconnect_delay
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self.connected = False
+        self.received = 0
+        self.reconnects = 0
+
+    def ensure_started(self):
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='cache-invalidation', daemon=True)
+            self._thread.start()
+
+    def _run(self):
+        while not self._stopping.is_set():
+            conn = None
+            try:
+                conn = psycopg2.connect(**connection_params())
+                conn.autocommit = True
+                conn.cursor().execute(f"LISTEN {CHANNEL}")
+                self.connected = True
+                dispatch_all()
+                while not self._stopping.is_set():
+                    if select.select([conn], [], [], POLL_INTERVAL) == ([], [], []):
+                        continue
+                    conn.poll()
+                    while conn.notifies:
+                        notify = conn.notifies.pop(0)
+                        self.received += 1
+                        dispatch(*parse_payload(notify.payload))
+            except Exception as e:
+                if not self._stopping.is_set():
+                    print(f"Cache-Invalidierung: Verbindung verloren ({e}), neuer Versuch in {self.reconnect_delay:g} s")
+                    self.reconnects += 1
+            finally:
+                self.connected = False
+                if conn is not None:
+                    try:
+                        conn.close()
+                    except psycopg2.Error:
+                        pass
+            self._stopping.wait(self.reconnect_delay)
+
+    def wait_connected(self, timeout=5.0):
+        """Wartet, bis der Listener verbunden ist (für Skripte und Tests)."""
+        deadline = time.monotonic() + timeout
+        while not self.connected and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self.connected
+
+    def stop(self, timeout=5.0):
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+
+    def reset_after_fork(self):
+        """Der Thread des Elternprozesses läuft im Kind nicht weiter."""
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self.connected = False
+        self.received = 0
+        self.reconnects = 0
+
+    def stats(self):
+        return {
+            'connected': int(self.connected),
+            'received': self.received,
+            'reconnects': self.reconnects,
+        }
+
+
+listener = InvalidationListener()
+
+
+def init_app(app):
+    """Startet den Listener mit dem ersten Request des Prozesses."""
+    if INVALIDATION_ENABLED:
+        app.before_request(listener.ensure_started)
@@ -1,41 +1,303 @@
+"""
+Ereignisprotokollierung für das Mitarbeiterportal.
+
+log_event() stellt Ereignisse nur in eine prozesslokale Warteschlange. Ein
+Hintergrund-Thread schreibt sie gesammelt (alle LOG_FLUSH_INTERVAL_MS
+Millisekunden oder sobald LOG_BATCH_SIZE Ereignisse anstehen) mit einem
+mehrzeiligen INSERT in app_logs und zählt sie in derselben Anweisung in
+die Tagessummen r_daily_log_events. Ist die Datenbank nicht erreichbar oder die
+Warteschlange voll, landen die Ereignisse als JSON-Zeilen in LOG_SPILL_FILE
+und werden nach dem nächsten erfolgreichen Schreiben nachgetragen.
+
+Alle gunicorn-Worker teilen sich die Spill-Datei. Anhängen und das
+Übernehmen zum Nachtragen laufen daher unter einer Dateisperre (flock auf
+LOG_SPILL_FILE.lock). Zum Nachtragen wird die Datei in eine eigene Datei
+``<spill>.replay.<pid>`` umbenannt; Nachtragsdateien abgestürzter Prozesse
+übernimmt der nächste Lauf.
+"""
+
+import atexit
+import fcntl
+import glob
 import json
 import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
 from datetime import datetime
-from database import Database
-import hashlib
 
-def log_event(event_type, user_id=None, details=None):
-    """Protokolliert ein Ereignis in der Datenbank.
+from psycopg2.extras import execute_values
+
+from db_pool import get_pool
+
+LOG_BATCH_SIZE = int(os.getenv('LOG_BATCH_SIZE', '200'))
+LOG_FLUSH_INTERVAL_MS = int(os.getenv('LOG_FLUSH_INTERVAL_MS', '500'))
+LOG_QUEUE_SIZE = int(os.getenv('LOG_QUEUE_SIZE', '10000'))
+LOG_SPILL_FILE = os.getenv('LOG_SPILL_FILE', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app_logs.spill.jsonl'))
+LOG_SPILL_MAX_BYTES = int(os.getenv('LOG_SPILL_MAX_BYTES', str(50 * 1024 * 1024)))
+
+# Platzhalter in r_daily_log_events für Ereignisse ohne bekannten Benutzer
+ANONYMOUS_USER = '00000000-0000-0000-0000-000000000000'
+
+
+class EventLogWriter:
+    """Sammelt Ereignisse und schreibt sie im Hintergrund stapelweise in app_logs."""
+
+    def __init__(self, batch_size=LOG_BATCH_SIZE, flush_interval_ms=LOG_FLUSH_INTERVAL_MS,
+                 queue_size=LOG_QUEUE_SIZE, spill_file=LOG_SPILL_FILE):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval_ms / 1000.0
+        self.queue_size = queue_size
+        self.spill_file = spill_file
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self.written = 0
+        self.spilled = 0
+        self.dropped = 0
+
+    def _ensure_started(self):
+        # Nach einem fork() läuft der Thread des Elternprozesses nicht mit –
+        # daher pro Prozess-ID eine eigene Warteschlange und einen eigenen Thread
+        if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+            return
+        with self._lock:
+            if self._pid == os.getpid() and self._thread is not None and self._thread.is_alive():
+                return
+            self._pid = os.getpid()
+            self._queue = queue.Queue(maxsize=self.queue_size)
+            self._stopping.clear()
+            self._thread = threading.Thread(target=self._run, name='event-log-writer', daemon=True)
+            self._thread.start()
+
+    def submit(self, event):
+        """Stellt ein Ereignis in die Warteschlange (blockiert nie)."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(event)
+        except queue.Full:
+            self._spill([event])
+
+    def _run(self):
+        while not self._stopping.is_set() or not self._queue.empty():
+            batch = []
+            try:
+                batch.append(self._queue.get(timeout=self.flush_interval))
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            self._write(batch)
+            for _ in batch:
+                self._queue.task_done()
+
+    def _write(self, batch):
+        """Schreibt einen Stapel; bei Fehlern wird er in die Spill-Datei ausgelagert."""
+        pool = get_pool()
+        try:
+            conn = pool.checkout()
+        except Exception as e:
+            print(f"Protokollierung: keine Datenbankverbindung ({e}), lagere {len(batch)} Ereignisse aus")
+            self._spill(batch)
+            return
+        try:
+            with conn.cursor() as cur:
+                self._insert(cur, batch)
+            conn.commit()
+            self.written += len(batch)
+            self._replay_spill(conn)
+        except Exception as e:
+            conn.rollback()
+            print(f"Fehler beim Protokollieren der Ereignisse in der Datenbank: {e}")
+            self._spill(batch)
+        finally:
+            pool.checkin(conn)
+
+    def _insert(self, cur, batch):
+        # E-Mail-Adressen ohne bekannten hk_user mit einer Abfrage auflösen
+        emails = sorted({e['user_id'] for e in batch if e.get('user_id') and not e.get('hk_user')})
+        resolved = {}
+        if emails:
+            cur.execute(
+                "SELECT user_id, hk_user FROM h_user WHERE user_id = ANY(%s) AND t_to IS NULL",
+                (emails,)
+            )
+            resolved = dict(cur.fetchall())
+        rows = [
+            (
+                e['timestamp'],
+                e['event_type'],
+                e.get('hk_user') or resolved.get(e.get('user_id')),
+                json.dumps(e['details']) if e.get('details') else None,
+                e.get('rec_src', 'API'),
+            )
+            for e in batch
+        ]
+        # Protokollzeilen und Tagessummen (r_daily_log_events) in einer Anweisung
+        execute_values(cur, f"""
+            WITH neu AS (
+                INSERT INTO app_logs (timestamp, event_type, hk_user, details, rec_src)
+                VALUES %s
+                RETURNING timestamp, event_type, hk_user
+            )
+            INSERT INTO r_daily_log_events AS r (day, event_type, hk_user, event_count)
+            SELECT timestamp::date, event_type, COALESCE(hk_user, '{ANONYMOUS_USER}'), COUNT(*)
+            FROM neu
+            GROUP BY 1, 2, 3
+            ON CONFLICT (day, event_type, hk_user) DO UPDATE SET
+                event_count = r.event_count + EXCLUDED.event_count
+        """, rows, template='(%s::timestamp, %s, %s::uuid, %s::jsonb, %s)', page_size=len(rows))
+
+    @contextmanager
+    def _spill_locked(self):
+        """Sperrt die Spill-Datei gegen Threads dieses und aller anderen Prozesse."""
+        with self._spill_lock:
+            with open(self.spill_file + '.lock', 'a') as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _spill(self, events):
+        """Hängt Ereignisse an die Spill-Datei an, solange deren Größenlimit nicht erreicht ist."""
+        try:
+            with self._spill_locked():
+                size = os.path.getsize(self.spill_file) if os.path.exists(self.spill_file) else 0
+                if size >= LOG_SPILL_MAX_BYTES:
+                    self.dropped += len(events)
+                    print(f"Protokollierung: Spill-Datei voll, {len(events)} Ereignisse verworfen")
+                    return
+                with open(self.spill_file, 'a', encoding='utf-8') as f:
+                    for event in events:
+                        f.write(json.dumps(event, default=str) + '\n')
+                self.spilled += len(events)
+        except OSError as e:
+            self.dropped += len(events)
+            print(f"Protokollierung: Spill-Datei nicht beschreibbar ({e}), {len(events)} Ereignisse verworfen")
+
+    def _orphaned_replay_files(self):
+        """Nachtragsdateien von Prozessen, die nicht mehr laufen."""
+        orphaned = []
+        for path in glob.glob(glob.escape(self.spill_file) + '.replay.*'):
+            try:
+                pid = int(path.rsplit('.', 1)[1])
+            except ValueError:
+                continue
+            if pid == os.getpid():
+                continue
+            try:
+                os.kill(pid, 0)
+            except ProcessLookupError:
+                orphaned.append(path)
+            except PermissionError:
+                pass
+        return orphaned
+
+    def _replay_spill(self, conn):
+        """Trägt ausgelagerte Ereignisse nach, sobald die Datenbank wieder erreichbar ist."""
+        replay_file = f'{self.spill_file}.replay.{os.getpid()}'
+        orphaned = self._orphaned_replay_files()
+        if not os.path.exists(self.spill_file) and not orphaned:
+            return
+        with self._spill_locked():
+            # Ein anderer Worker kann die Datei inzwischen übernommen haben
+            if os.path.exists(self.spill_file):
+                os.replace(self.spill_file, replay_file)
+            with open(replay_file, 'a', encoding='utf-8') as out:
+                for path in self._orphaned_replay_files():
+                    with open(path, encoding='utf-8') as f:
+                        out.write(f.read())
+                    os.remove(path)
+        with open(replay_file, encoding='utf-8') as f:
+            events = [json.loads(line) for line in f if line.strip()]
+        try:
+            with conn.cursor() as cur:
+                for start in range(0, len(events), self.batch_size):
+                    self._insert(cur, events[start:start + self.batch_size])
+            conn.commit()
+            os.remove(replay_file)
+            self.written += len(events)
+            if events:
+                print(f"Protokollierung: {len(events)} ausgelagerte Ereignisse nachgetragen")
+        except Exception as e:
+            conn.rollback()
+            print(f"Protokollierung: Nachtragen fehlgeschlagen ({e})")
+            with self._spill_locked():
+                with open(self.spill_file, 'a', encoding='utf-8') as out:
+                    with open(replay_file, encoding='utf-8') as f:
+                        out.write(f.read())
+                os.remove(replay_file)
+
+    def flush(self, timeout=5.0):
+        """Wartet, bis alle anstehenden Ereignisse geschrieben (oder ausgelagert) sind."""
+        if self._queue is None or self._pid != os.getpid():
+            return
+        deadline = time.monotonic() + timeout
+        while self._queue.unfinished_tasks and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def stop(self, timeout=5.0):
+        """Beendet den Hintergrund-Thread nach dem Schreiben aller Ereignisse."""
+        if self._thread is None or self._pid != os.getpid():
+            return
+        self._stopping.set()
+        self._thread.join(timeout)
+
+    def reset_after_fork(self):
+        """
+        Setzt Warteschlange, Thread und Zähler im neuen Prozess zurück.
+        Ereignisse, die im Elternprozess noch anstanden, schreibt dieser selbst.
+        """
+        self._lock = threading.Lock()
+        self._spill_lock = threading.Lock()
+        self._pid = None
+        self._queue = None
+        self._thread = None
+        self._stopping = threading.Event()
+        self.written = 0
+        self.spilled = 0
+        self.dropped = 0
+
+    def stats(self):
+        return {
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'written': self.written,
+            'spilled': self.spilled,
+            'dropped': self.dropped,
+        }
+
+
+writer = EventLogWriter()
+atexit.register(writer.stop)
+
+
+def log_event(event_type, user_id=None, details=None, hk_user=None):
+    """Protokolliert ein Ereignis asynchron in der Datenbank.
 
     Args:
         event_type (str): Die Art des Ereignisses (z.B. 'login_success', 'login_failed').
         user_id (str, optional): Die user_id des Benutzers, falls relevant. Defaults to None.
         details (dict, optional): Zusätzliche Details zum Ereignis. Defaults to None.
+        hk_user (str, optional): Der bereits bekannte hk_user; erspart die Auflösung
+            über die user_id. Defaults to None.
     """
-    db = Database()
-    try:
-        hk_user = None
-        if user_id:
-            # Hole den hk_user anhand der user_id (E-Mail)
-            user = db.get_user_by_email(user_id)
-            if user:
-                hk_user = user[0] # hk_user ist das erste Feld im user-Tuple
-
-        timestamp = datetime.utcnow()
-        rec_src = 'API' # Oder eine passendere Quelle
-
-        db.execute(
-            """
-            INSERT INTO APP_LOGS (timestamp, event_type, hk_user, details, rec_src)
-            VALUES (%s, %s, %s, %s, %s)
-            """,
-            (timestamp, event_type, hk_user, json.dumps(details) if details else None, rec_src)
-        )
-        db.commit()
-
-    except Exception as e:
-        db.rollback()
-        # Hier sollte eine alternative Protokollierung stattfinden, falls die DB nicht verfügbar ist
-        print(f"Fehler beim Protokollieren des Ereignisses in der Datenbank: {e}")
-    finally:
-        db.close() 
\ No newline at end of file
+    writer.submit({
+        'timestamp': datetime.utcnow().isoformat(),
+        'event_type': event_type,
+        'user_id': user_id,
+        'hk_user': str(hk_user) if hk_user else None,
+        'details': details,
+        'rec_src': 'API',
+    })
@@ -0,0 +1,348 @@
+"""
+Laufzeitmetriken des Backends im Prometheus-Textformat.
+
+Erfasst werden:
+  * Dauer je Endpunkt (http_request_duration_seconds)
+  * Dauer und gelieferte Zeilen je SQL-Anweisung (db_query_duration_seconds,
+    db_query_rows_total); Anweisungen werden normalisiert und über eine
+    kurze statement_id referenziert (Klartext in db_statement_info)
+  * Anzahl Anweisungen pro Request (db_queries_per_request)
+  * Wartezeit auf eine Pool-Verbindung (db_pool_wait_seconds) und
+    Poolauslastung
+
+Die Messung der Anweisungen geschieht in InstrumentedCursor, den der
+Verbindungspool als cursor_factory setzt. Damit sind Database-Aufrufe und
+die direkt geöffneten Cursor in project.py/customer.py gleichermaßen
+erfasst. Anweisungen über SLOW_QUERY_MS werden mit normalisiertem SQL
+protokolliert.
+
+Die Werte gelten pro Prozess; unter gunicorn trägt jede Serie das Label
+``worker`` (PID).
+"""
+
+import hashlib
+import hmac
+import logging
+import os
+import re
+import threading
+import time
+from functools import lru_cache
+
+import psycopg2.extensions
+from flask import Blueprint, Response, abort, current_app, g, has_request_context, request
+
+import query_guard
+
+SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', '200'))
+METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+
+slow_query_logger = logging.getLogger('slow_query')
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+COUNT_BUCKETS = (1, 2, 3, 5, 10, 20, 50, 100, 250)
+
+metrics_bp = Blueprint('metrics', __name__)
+
+
+# --- SQL-Normalisierung -------------------------------------------------------
+
+_COMMENT_RE = re.compile(r'--[^\n]*|/\*.*?\*/', re.S)
+# E'...' wie '...'; execute_values und mogrify setzen Werte als Literale ein
+_STRING_RE = re.compile(r"(?:\b[Ee])?'(?:[^']|'')*'")
+_PLACEHOLDER_RE = re.compile(r'%\(\w+\)s|%s')
+_NUMBER_RE = re.compile(r'(?<![\w.])-?\d+(?:\.\d+)?\b')
+_SPACE_RE = re.compile(r'\s+')
+# Die folgenden Muster setzen einfachen Leerraum voraus.
+# NULL/TRUE/FALSE als Wert; IS [NOT] NULL und NOT NULL gehören zur Anweisung
+_KEYWORD_VALUE_RE = re.compile(r'(?<!\bIS )(?<!\bNOT )\b(?:NULL|TRUE|FALSE)\b', re.I)
+# ?::uuid, ?::varchar(?), ?::uuid[], ?::timestamp with time zone, ?::text::date
+_CAST_RE = re.compile(
+    r'\?(?: ?:: ?(?:timestamp with(?:out)? time zone|time with(?:out)? time zone|double precision'
+    r'|character varying|"?[\w.]+"?)(?: ?\( ?\?(?: ?, ?\?)* ?\))?(?: ?\[ ?\])*)+',
+    re.I
+)
+_ARRAY_RE = re.compile(r'\bARRAY ?\[ ?\?(?: ?, ?\?)* ?\]', re.I)
+_IN_RE = re.compile(r'\bIN ?(?:\?|\( ?\?(?: ?, ?\?)* ?\))', re.I)
+_VALUES_RE = re.compile(r'\b(VALUES) ?\( ?\?(?: ?, ?\?)* ?\)(?: ?, ?\( ?\?(?: ?, ?\?)* ?\))*', re.I)
+_LIST_RE = re.compile(r'\( ?\?(?: ?, ?\?)+ ?\)')
+
+
+@lru_cache(maxsize=2048)
+def normalize_sql(sql):
+    """
+    Macht aus einer Anweisung eine Vorlage ohne konkrete Werte:
+    Parameter und Literale (auch NULL, TRUE, FALSE) samt Typumwandlung werden
+    zu ``?``; ARRAY[...], IN-Listen und VALUES-Zeilen schrumpfen auf einen
+    Platzhalter, damit die statement_id nicht von der Anzahl der Werte abhängt.
+    """
+    text = _COMMENT_RE.sub(' ', sql)
+    text = _STRING_RE.sub('?', text)
+    text = _PLACEHOLDER_RE.sub('?', text)
+    text = _NUMBER_RE.sub('?', text)
+    text = _SPACE_RE.sub(' ', text)
+    text = _KEYWORD_VALUE_RE.sub('?', text)
+    text = _CAST_RE.sub('?', text)
+    # ARRAY[?, ?]::uuid[] – die Umwandlung hinter dem Array erst jetzt
+    text = _CAST_RE.sub('?', _ARRAY_RE.sub('?', text))
+    text = _IN_RE.sub('IN (?)', text)
+    text = _VALUES_RE.sub(r'\1 (?)', text)
+    text = _LIST_RE.sub('(?)', text)
+    return text.strip()
+
+
+@lru_cache(maxsize=2048)
+def statement_id(normalized):
+    return hashlib.md5(normalized.encode('utf-8')).hexdigest()[:12]
+
+
+# --- Metrik-Typen ---------------------------------------------------------------
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', ' ')
+
+
+def _format_labels(names, values, extra=None):
+    pairs = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.extend(f'{n}="{_escape(v)}"' for n, v in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def render(self, worker):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        with self._lock:
+            items = list(self._values.items())
+        for values, total in items:
+            lines.append(f"{self.name}{_format_labels(self.labels + ('worker',), values + (worker,))} {total}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._values = {}  # Labelwerte -> [Zähler je Bucket..., Summe, Anzahl]
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [0] * len(self.buckets) + [0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    entry[i] += 1
+            entry[-2] += value
+            entry[-1] += 1
+
+    def render(self, worker):
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            items = [(values, list(entry)) for values, entry in self._values.items()]
+        names = self.labels + ('worker',)
+        for values, entry in items:
+            values = values + (worker,)
+            for bound, count in zip(self.buckets, entry):
+                lines.append(f"{self.name}_bucket{_format_labels(names, values, [('le', bound)])} {count}")
+            lines.append(f"{self.name}_bucket{_format_labels(names, values, [('le', '+Inf')])} {entry[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(names, values)} {entry[-2]:.6f}")
+            lines.append(f"{self.name}_count{_format_labels(names, values)} {entry[-1]}")
+        return lines
+
+
+request_duration = Histogram(
+    'http_request_duration_seconds', 'Bearbeitungsdauer je Endpunkt', ('endpoint', 'method', 'status')
+)
+query_duration = Histogram(
+    'db_query_duration_seconds', 'Dauer je SQL-Anweisung', ('endpoint', 'statement_id')
+)
+query_rows = Counter(
+    'db_query_rows_total', 'Von SELECT-Anweisungen gelieferte Zeilen', ('endpoint', 'statement_id')
+)
+queries_per_request = Histogram(
+    'db_queries_per_request', 'SQL-Anweisungen pro Request', ('endpoint',), buckets=COUNT_BUCKETS
+)
+slow_queries = Counter(
+    'db_slow_queries_total', 'Anweisungen über SLOW_QUERY_MS', ('endpoint', 'statement_id')
+)
+pool_wait = Histogram('db_pool_wait_seconds', 'Wartezeit auf eine Pool-Verbindung')
+
+_statements = {}  # statement_id -> normalisiertes SQL
+_statements_lock = threading.Lock()
+
+
+# --- Erfassung -------------------------------------------------------------------
+
+def current_endpoint():
+    if has_request_context():
+        return request.endpoint or 'unbekannt'
+    return 'hintergrund'
+
+
+def observe_query(sql, duration, rows):
+    """Erfasst eine ausgeführte Anweisung (wird von InstrumentedCursor aufgerufen)."""
+    normalized = normalize_sql(sql)
+    sid = statement_id(normalized)
+    if sid not in _statements:
+        with _statements_lock:
+            _statements[sid] = normalized
+    endpoint = current_endpoint()
+    query_duration.observe(duration, endpoint, sid)
+    if rows:
+        query_rows.inc(endpoint, sid, amount=rows)
+    if has_request_context():
+        g.metrics_queries = g.get('metrics_queries', 0) + 1
+        g.metrics_query_time = g.get('metrics_query_time', 0.0) + duration
+        query_guard.record(normalized)
+    if duration * 1000 >= SLOW_QUERY_MS:
+        slow_queries.inc(endpoint, sid)
+        slow_query_logger.warning(
+            "Langsame Abfrage (%.1f ms, Endpunkt %s, %s Zeilen): %s",
+            duration * 1000, endpoint, rows, normalized
+        )
+
+
+def observe_pool_wait(duration):
+    pool_wait.observe(duration)
+
+
+def _sql_text(cursor, query):
+    if isinstance(query, bytes):
+        return query.decode('utf-8', 'replace')
+    if isinstance(query, str):
+        return query
+    # psycopg2.sql.Composed
+    return query.as_string(cursor)
+
+
+class InstrumentedCursor(psycopg2.extensions.cursor):
+    """Cursor, der Dauer und Ergebnisgröße jeder Anweisung erfasst."""
+
+    def execute(self, query, vars=None):
+        started = time.perf_counter()
+        try:
+            return super().execute(query, vars)
+        finally:
+            rows = self.rowcount if self.description is not None and self.rowcount > 0 else 0
+            observe_query(_sql_text(self, query), time.perf_counter() - started, rows)
+
+    def executemany(self, query, vars_list):
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            observe_query(_sql_text(self, query), time.perf_counter() - started, 0)
+
+
+def _before_request():
+    g.metrics_started = time.perf_counter()
+
+
+def _after_request(response):
+    g.metrics_status = response.status_code
+    # Bei gestreamten Antworten laufen weitere Abfragen erst danach – der Header
+    # enthält dann nur die Abfragen bis zum Beginn der Ausgabe
+    if not response.is_streamed:
+        response.headers['Server-Timing'] = (
+            f'db;dur={g.get("metrics_query_time", 0.0) * 1000:.1f};desc="{g.get("metrics_queries", 0)} Abfragen"'
+        )
+    return response
+
+
+def _teardown_request(exc=None):
+    started = g.pop('metrics_started', None)
+    if started is None or request.endpoint in (None, 'metrics.metrics', 'static'):
+        return
+    endpoint = request.endpoint
+    status = g.get('metrics_status', 500 if exc else 200)
+    request_duration.observe(time.perf_counter() - started, endpoint, request.method, status)
+    queries_per_request.observe(g.get('metrics_queries', 0), endpoint)
+
+
+def render_metrics():
+    """Alle Metriken im Prometheus-Textformat."""
+    import cache
+    import db_pool
+    from coalesce import coalesced_requests, leader_requests
+    from invalidation import listener
+    from log import writer
+
+    worker = os.getpid()
+    lines = []
+    for metric in (request_duration, query_duration, query_rows, queries_per_request, slow_queries, pool_wait,
+                   coalesced_requests, leader_requests):
+        lines.extend(metric.render(worker))
+
+    lines += ['# HELP db_statement_info Normalisierter SQL-Text je statement_id', '# TYPE db_statement_info gauge']
+    with _statements_lock:
+        statements = list(_statements.items())
+    for sid, sql in statements:
+        lines.append(f'db_statement_info{_format_labels(("statement_id", "sql", "worker"), (sid, sql, worker))} 1')
+
+    stats = db_pool.pool_stats()
+    if stats:
+        for key in ('max', 'in_use', 'idle', 'checkouts', 'checkout_failures', 'waits'):
+            name = f'db_pool_{key}'
+            kind = 'counter' if key in ('checkouts', 'checkout_failures', 'waits') else 'gauge'
+            lines += [f'# TYPE {name} {kind}', f'{name}{{worker="{worker}"}} {stats[key]}']
+
+    for key, value in writer.stats().items():
+        name = f'app_log_events_{key}'
+        lines += [f'# TYPE {name} {"gauge" if key == "queued" else "counter"}', f'{name}{{worker="{worker}"}} {value}']
+
+    for key, value in listener.stats().items():
+        name = f'cache_invalidation_{key}'
+        lines += [f'# TYPE {name} {"gauge" if key == "connected" else "counter"}', f'{name}{{worker="{worker}"}} {value}']
+
+    namespaces, backend_stats = cache.stats()
+    lines += ['# HELP cache_requests_total Cache-Zugriffe je Namensraum und Ergebnis', '# TYPE cache_requests_total counter']
+    for name, counts in namespaces.items():
+        for result, key in (('hit', 'hits'), ('miss', 'misses')):
+            labels = _format_labels(('namespace', 'result', 'worker'), (name, result, worker))
+            lines.append(f'cache_requests_total{labels} {counts[key]}')
+    lines += ['# TYPE cache_sets_total counter']
+    for name, counts in namespaces.items():
+        lines.append(f'cache_sets_total{_format_labels(("namespace", "worker"), (name, worker))} {counts["sets"]}')
+    for key, value in backend_stats.items():
+        name = f'cache_backend_{key}'
+        lines += [f'# TYPE {name} {"counter" if key in ("evictions", "errors") else "gauge"}', f'{name}{{worker="{worker}"}} {value}']
+    return '\n'.join(lines) + '\n'
+
+
+@metrics_bp.route('/api/metrics')
+def metrics():
+    """
+    Prometheus-Endpunkt, nur mit Bearer-Token aus METRICS_TOKEN.
+
+    Die Ausgabe enthält den SQL-Text aller Anweisungen; ohne gesetztes Token
+    ist der Endpunkt daher abgeschaltet (404), außer im Debug-Modus.
+    """
+    if not METRICS_TOKEN:
+        if not current_app.debug:
+            abort(404)
+    elif not hmac.compare_digest(request.headers.get('Authorization', ''), f'Bearer {METRICS_TOKEN}'):
+        abort(401)
+    return Response(render_metrics(), content_type='text/plain; version=0.0.4; charset=utf-8')
+
+
+def init_app(app):
+    """Registriert Zeitmessung je Request und den Metrik-Endpunkt."""
+    app.before_request(_before_request)
+    app.after_request(_after_request)
+    app.teardown_request(_teardown_request)
+    app.register_blueprint(metrics_bp)
@@ -0,0 +1,247 @@
+"""
+Migrationsrunner für das Mitarbeiterportal.
+Spielt die versionierten SQL-Dateien aus ``migrations/`` in aufsteigender
+Reihenfolge ein und merkt sich angewendete Versionen in ``schema_migrations``.
+
+Aufruf:
+    python migrate.py            # alle ausstehenden Migrationen anwenden
+    python migrate.py status     # Übersicht angewendet / ausstehend
+
+Dateien heißen ``NNNN_beschreibung.sql``. Steht in den ersten Zeilen
+``-- migrate:no-transaction``, werden die Anweisungen einzeln im Autocommit
+ausgeführt (nötig für ``CREATE INDEX CONCURRENTLY``). Alle Migrationen müssen
+idempotent sein (``IF NOT EXISTS``), damit ein abgebrochener Lauf einfach
+wiederholt werden kann.
+"""
+
+import hashlib
+import os
+import re
+import sys
+
+from database import Database
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+FILENAME_PATTERN = re.compile(r'^(\d{4})_([\w\-]+)\.sql$')
+NO_TRANSACTION_MARKER = '-- migrate:no-transaction'
+CONCURRENT_INDEX_PATTERN = re.compile(
+    r'CREATE\s+(?:UNIQUE\s+)?INDEX\s+CONCURRENTLY\s+IF\s+NOT\s+EXISTS\s+(\w+)', re.IGNORECASE
+)
+
+# Beliebige, aber feste Nummer für pg_advisory_lock, damit nie zwei Runner parallel laufen
+ADVISORY_LOCK_ID = 48151623
+
+
+class Migration:
+    def __init__(self, version, name, path):
+        self.version = version
+        self.name = name
+        self.path = path
+        with open(path, encoding='utf-8') as f:
+            self.sql = f.read()
+        self.checksum = hashlib.sha256(self.sql.encode('utf-8')).hexdigest()
+        header = self.sql.lstrip().splitlines()[:3]
+        self.transactional = not any(line.strip() == NO_TRANSACTION_MARKER for line in header)
+
+    def __repr__(self):
+        return f"{self.version:04d}_{self.name}"
+
+
+def load_migrations(directory=MIGRATIONS_DIR):
+    """Liest alle Migrationsdateien sortiert nach Version ein."""
+    migrations = []
+    seen = set()
+    for filename in sorted(os.listdir(directory)):
+        match = FILENAME_PATTERN.match(filename)
+        if not match:
+            continue
+        version = int(match.group(1))
+        if version in seen:
+            raise ValueError(f"Doppelte Migrationsversion {version:04d}")
+        seen.add(version)
+        migrations.append(Migration(version, match.group(2), os.path.join(directory, filename)))
+    return migrations
+
+
+def split_statements(sql):
+    """
+    Zerlegt ein SQL-Skript in einzelne Anweisungen.
+    Berücksichtigt Strings, Kommentare und Dollar-Quoting ($$ ... $$).
+    """
+    statements = []
+    current = []
+    i = 0
+    length = len(sql)
+    while i < length:
+        ch = sql[i]
+        if sql.startswith('--', i):
+            end = sql.find('\n', i)
+            end = length if end == -1 else end
+            current.append(sql[i:end])
+            i = end
+        elif sql.startswith('/*', i):
+            end = sql.find('*/', i + 2)
+            end = length if end == -1 else end + 2
+            current.append(sql[i:end])
+            i = end
+        elif ch == "'":
+            end = i + 1
+            while end < length:
+                if sql[end] == "'" and sql.startswith("''", end):
+                    end += 2
+                    continue
+                if sql[end] == "'":
+                    break
+                end += 1
+            current.append(sql[i:end + 1])
+            i = end + 1
+        elif ch == '$':
+            tag = re.match(r'\$[A-Za-z_]*\$', sql[i:])
+            if tag:
+                end = sql.find(tag.group(0), i + len(tag.group(0)))
+                end = length if end == -1 else end + len(tag.group(0))
+                current.append(sql[i:end])
+                i = end
+            else:
+                current.append(ch)
+                i += 1
+        elif ch == ';':
+            statements.append(''.join(current))
+            current = []
+            i += 1
+        else:
+            current.append(ch)
+            i += 1
+    statements.append(''.join(current))
+
+    def has_code(stmt):
+        without_comments = re.sub(r'--[^\n]*', '', stmt)
+        return without_comments.strip() != ''
+
+    return [stmt.strip() for stmt in statements if has_code(stmt)]
+
+
+def ensure_migrations_table(db):
+    db.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            checksum CHAR(64) NOT NULL,
+            applied_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        )
+    """)
+    db.commit()
+
+
+def applied_migrations(db):
+    rows = db.fetch_all("SELECT version, checksum FROM schema_migrations ORDER BY version")
+    return {row[0]: row[1] for row in rows}
+
+
+def _drop_invalid_indexes(db, migration):
+    """
+    Ein abgebrochenes CREATE INDEX CONCURRENTLY hinterlässt einen ungültigen
+    Index, den IF NOT EXISTS überspringen würde. Solche Reste vorher entfernen.
+    """
+    names = CONCURRENT_INDEX_PATTERN.findall(migration.sql)
+    if not names:
+        return
+    invalid = db.fetch_all("""
+        SELECT c.relname
+        FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE NOT i.indisvalid AND c.relname = ANY(%s)
+    """, (names,))
+    for (name,) in invalid:
+        print(f"  Entferne ungültigen Index {name} aus abgebrochenem Lauf")
+        db.execute(f'DROP INDEX CONCURRENTLY IF EXISTS "{name}"')
+
+
+def apply_migration(db, migration):
+    """Wendet eine einzelne Migration an und trägt sie in schema_migrations ein."""
+    print(f"Wende Migration {migration!r} an ...")
+    if migration.transactional:
+        try:
+            db.cur.execute(migration.sql)
+            db.execute(
+                "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+                (migration.version, migration.name, migration.checksum)
+            )
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        return
+
+    db.commit()  # autocommit lässt sich nur außerhalb einer Transaktion umschalten
+    db.conn.autocommit = True
+    try:
+        _drop_invalid_indexes(db, migration)
+        for statement in split_statements(migration.sql):
+            db.cur.execute(statement)
+        db.execute(
+            "INSERT INTO schema_migrations (version, name, checksum) VALUES (%s, %s, %s)",
+            (migration.version, migration.name, migration.checksum)
+        )
+    finally:
+        db.conn.autocommit = False
+
+
+def migrate(db=None):
+    """
+    Wendet alle ausstehenden Migrationen an.
+
+    Returns:
+        list: Die angewendeten Migrationen
+    """
+    own_db = db is None
+    db = db or Database()
+    try:
+        ensure_migrations_table(db)
+        db.execute("SELECT pg_advisory_lock(%s)", (ADVISORY_LOCK_ID,))
+        db.commit()
+        try:
+            done = applied_migrations(db)
+            pending = []
+            for migration in load_migrations():
+                if migration.version in done:
+                    if done[migration.version] != migration.checksum:
+                        print(f"WARNUNG: Migration {migration!r} wurde nach dem Anwenden verändert")
+                    continue
+                pending.append(migration)
+            for migration in pending:
+                apply_migration(db, migration)
+            print(f"{len(pending)} Migration(en) angewendet")
+            return pending
+        finally:
+            db.execute("SELECT pg_advisory_unlock(%s)", (ADVISORY_LOCK_ID,))
+            db.commit()
+    finally:
+        if own_db:
+            db.close()
+
+
+def status(db=None):
+    """Gibt eine Übersicht über angewendete und ausstehende Migrationen aus."""
+    own_db = db is None
+    db = db or Database()
+    try:
+        ensure_migrations_table(db)
+        done = applied_migrations(db)
+        for migration in load_migrations():
+            state = 'angewendet' if migration.version in done else 'ausstehend'
+            print(f"{migration!r:45} {state}")
+    finally:
+        if own_db:
+            db.close()
+
+
+if __name__ == '__main__':
+    command = sys.argv[1] if len(sys.argv) > 1 else 'up'
+    if command == 'up':
+        migrate()
+    elif command == 'status':
+        status()
+    else:
+        print(f"Unbekannter Befehl: {command} (erlaubt: up, status)")
+        sys.exit(2)
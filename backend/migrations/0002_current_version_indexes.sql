@@ -0,0 +1,39 @@
+-- migrate:no-transaction
+-- Partielle Indizes für die Abfragen der aktuellen Version (t_to IS NULL).
+-- CONCURRENTLY sperrt die Tabellen nicht für Schreibzugriffe, läuft aber
+-- nicht innerhalb einer Transaktion – daher die Markierung oben.
+
+-- Benutzer: Profil, Login, Admin-Check, aktuelles Projekt
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_user_details_current
+    ON s_user_details (hk_user) WHERE t_to IS NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_user_login_current
+    ON s_user_login (hk_user) WHERE t_to IS NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_user_current_project_current
+    ON s_user_current_project (hk_user) WHERE t_to IS NULL;
+
+-- Projekte und Kunden
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_project_details_current
+    ON s_project_details (hk_project) WHERE t_to IS NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_project_details_customer_current
+    ON s_project_details (customer_id) WHERE t_to IS NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_customer_details_current
+    ON s_customer_details (hk_customer) WHERE t_to IS NULL;
+
+-- Zeiteinträge: Link nach Benutzer, Satellit nach Link und Datum.
+-- hk_user und entry_date liegen in verschiedenen Tabellen, daher zwei Indizes,
+-- die gemeinsam den Zugriff (hk_user, entry_date) abdecken.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_l_user_project_timeentry_user_current
+    ON l_user_project_timeentry (hk_user) WHERE t_to IS NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_l_user_project_timeentry_user_entry
+    ON l_user_project_timeentry (hk_user, timeentry_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_timeentry_details_current
+    ON s_timeentry_details (hk_user_project_timeentry, entry_date) WHERE t_to IS NULL;
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_timeentry_details_date_current
+    ON s_timeentry_details (entry_date) WHERE t_to IS NULL;
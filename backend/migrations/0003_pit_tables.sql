@@ -0,0 +1,68 @@
+-- Point-in-Time-Tabellen (PIT): je Hub- bzw. Link-Schlüssel der t_from der
+-- aktuell gültigen Satellitenversion. Lesezugriffe joinen darüber direkt auf
+-- den Primärschlüssel des Satelliten statt alle Versionen zu durchsuchen.
+-- Gepflegt werden sie von pit.py in derselben Transaktion wie der Schreibzugriff.
+
+CREATE TABLE IF NOT EXISTS pit_user (
+    hk_user UUID PRIMARY KEY,
+    user_details_t_from TIMESTAMP NULL,
+    user_login_t_from TIMESTAMP NULL,
+    user_current_project_t_from TIMESTAMP NULL,
+    snapshot_ts TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (hk_user) REFERENCES h_user(hk_user)
+);
+
+CREATE TABLE IF NOT EXISTS pit_project (
+    hk_project UUID PRIMARY KEY,
+    project_details_t_from TIMESTAMP NULL,
+    snapshot_ts TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (hk_project) REFERENCES h_project(hk_project)
+);
+
+-- Nur offene Links mit offenem Satelliten. hk_user, entry_date und start_time
+-- werden mitgeführt, damit Abfragen je Benutzer und Zeitraum einen Index nutzen.
+CREATE TABLE IF NOT EXISTS pit_timeentry (
+    hk_user_project_timeentry UUID PRIMARY KEY,
+    hk_user UUID NOT NULL,
+    hk_project UUID NOT NULL,
+    timeentry_id VARCHAR(255),
+    timeentry_details_t_from TIMESTAMP NOT NULL,
+    entry_date DATE NOT NULL,
+    start_time TIME NOT NULL,
+    snapshot_ts TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    FOREIGN KEY (hk_user_project_timeentry) REFERENCES l_user_project_timeentry(hk_user_project_timeentry)
+);
+
+CREATE INDEX IF NOT EXISTS ix_pit_timeentry_user_date
+    ON pit_timeentry (hk_user, entry_date, start_time, timeentry_id);
+
+-- Erstbefüllung aus dem aktuellen Datenbestand
+INSERT INTO pit_user (hk_user, user_details_t_from, user_login_t_from, user_current_project_t_from)
+SELECT
+    h.hk_user,
+    (SELECT MAX(d.t_from) FROM s_user_details d WHERE d.hk_user = h.hk_user AND d.t_to IS NULL),
+    (SELECT MAX(l.t_from) FROM s_user_login l WHERE l.hk_user = h.hk_user AND l.t_to IS NULL),
+    (SELECT MAX(c.t_from) FROM s_user_current_project c WHERE c.hk_user = h.hk_user AND c.t_to IS NULL)
+FROM h_user h
+ON CONFLICT (hk_user) DO NOTHING;
+
+INSERT INTO pit_project (hk_project, project_details_t_from)
+SELECT
+    h.hk_project,
+    (SELECT MAX(d.t_from) FROM s_project_details d WHERE d.hk_project = h.hk_project AND d.t_to IS NULL)
+FROM h_project h
+ON CONFLICT (hk_project) DO NOTHING;
+
+INSERT INTO pit_timeentry (
+    hk_user_project_timeentry, hk_user, hk_project, timeentry_id,
+    timeentry_details_t_from, entry_date, start_time
+)
+SELECT DISTINCT ON (l.hk_user_project_timeentry)
+    l.hk_user_project_timeentry, l.hk_user, l.hk_project, l.timeentry_id,
+    s.t_from, s.entry_date, s.start_time
+FROM l_user_project_timeentry l
+JOIN s_timeentry_details s
+    ON s.hk_user_project_timeentry = l.hk_user_project_timeentry AND s.t_to IS NULL
+WHERE l.t_to IS NULL
+ORDER BY l.hk_user_project_timeentry, s.t_from DESC
+ON CONFLICT (hk_user_project_timeentry) DO NOTHING;
@@ -0,0 +1,32 @@
+-- Tägliche Stundensummen je Benutzer, Projekt und Arbeitsort.
+-- Wird von rollup.py bei jedem Anlegen, Ändern und Löschen eines Zeiteintrags
+-- um die Differenz fortgeschrieben; das Dashboard liest nur noch diese Zeilen.
+-- work_location ist Teil des Primärschlüssels, daher '' statt NULL.
+
+CREATE TABLE IF NOT EXISTS r_daily_hours (
+    hk_user UUID NOT NULL,
+    entry_date DATE NOT NULL,
+    hk_project UUID NOT NULL,
+    work_location VARCHAR(255) NOT NULL DEFAULT '',
+    hours NUMERIC(12, 4) NOT NULL DEFAULT 0,
+    entry_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (hk_user, entry_date, hk_project, work_location),
+    FOREIGN KEY (hk_user) REFERENCES h_user(hk_user),
+    FOREIGN KEY (hk_project) REFERENCES h_project(hk_project)
+);
+
+-- Erstbefüllung aus den aktuell gültigen Zeiteinträgen
+INSERT INTO r_daily_hours (hk_user, entry_date, hk_project, work_location, hours, entry_count)
+SELECT
+    p.hk_user,
+    s.entry_date,
+    p.hk_project,
+    COALESCE(s.work_location, ''),
+    COALESCE(SUM(EXTRACT(EPOCH FROM (s.end_time - s.start_time))/3600 - COALESCE(s.pause_minutes, 0)/60.0), 0),
+    COUNT(*)
+FROM pit_timeentry p
+JOIN s_timeentry_details s
+    ON s.hk_user_project_timeentry = p.hk_user_project_timeentry
+   AND s.t_from = p.timeentry_details_t_from
+GROUP BY p.hk_user, s.entry_date, p.hk_project, COALESCE(s.work_location, '')
+ON CONFLICT (hk_user, entry_date, hk_project, work_location) DO NOTHING;
@@ -0,0 +1,10 @@
+-- migrate:no-transaction
+-- Index in der Sortierreihenfolge von GET /api/time-entries
+-- (Datum absteigend, Beginn und ID aufsteigend). Damit liest jede Seite der
+-- Keyset-Paginierung nur die benötigten Indexeinträge und sortiert nicht nach.
+-- Er ersetzt ix_pit_timeentry_user_date, der nur aufsteigend sortiert ist.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_pit_timeentry_user_keyset
+    ON pit_timeentry (hk_user, entry_date DESC, start_time, timeentry_id);
+
+DROP INDEX CONCURRENTLY IF EXISTS ix_pit_timeentry_user_date;
@@ -0,0 +1,12 @@
+-- Sperrzeitpunkte für Tokens: alle vor revoked_at ausgestellten JWTs eines
+-- Benutzers werden abgelehnt (z.B. nach Rechteänderung oder Löschung durch
+-- einen Admin). Die Backend-Prozesse halten die Tabelle im Speicher.
+
+CREATE TABLE IF NOT EXISTS auth_token_revocations (
+    hk_user UUID PRIMARY KEY,
+    revoked_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    FOREIGN KEY (hk_user) REFERENCES h_user(hk_user)
+);
+
+CREATE INDEX IF NOT EXISTS ix_auth_token_revocations_revoked_at
+    ON auth_token_revocations (revoked_at);
@@ -0,0 +1,66 @@
+-- HASHDIFF je Satellitenversion: md5 über die beschreibenden Attribute
+-- (alle Spalten außer Schlüssel, t_from/t_to, b_from/b_to, rec_src und
+-- hash_diff selbst). satellite.write_versions() vergleicht den Wert mit der
+-- offenen Version und legt bei unveränderten Attributen keine neue an.
+--
+-- Berechnet wird im Trigger über to_jsonb(NEW), damit jeder Schreibpfad
+-- (auch Importe, Seeding und direkte INSERTs) denselben Wert erzeugt.
+-- jsonb sortiert die Schlüssel und gibt Datum/Zeit unabhängig von DateStyle
+-- aus; satellite.py bildet den Vergleichswert auf dieselbe Weise.
+-- Das Argument des Triggers ist die Schlüsselspalte des Satelliten.
+
+CREATE OR REPLACE FUNCTION sat_hash_diff() RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    NEW.hash_diff := md5((
+        to_jsonb(NEW) - ARRAY[TG_ARGV[0], 't_from', 't_to', 'b_from', 'b_to', 'rec_src', 'hash_diff']
+    )::text);
+    RETURN NEW;
+END
+$$;
+
+ALTER TABLE s_user_details ADD COLUMN IF NOT EXISTS hash_diff CHAR(32);
+ALTER TABLE s_user_login ADD COLUMN IF NOT EXISTS hash_diff CHAR(32);
+ALTER TABLE s_user_current_project ADD COLUMN IF NOT EXISTS hash_diff CHAR(32);
+ALTER TABLE s_project_details ADD COLUMN IF NOT EXISTS hash_diff CHAR(32);
+ALTER TABLE s_customer_details ADD COLUMN IF NOT EXISTS hash_diff CHAR(32);
+ALTER TABLE s_timeentry_details ADD COLUMN IF NOT EXISTS hash_diff CHAR(32);
+
+DROP TRIGGER IF EXISTS trg_s_user_details_hash_diff ON s_user_details;
+CREATE TRIGGER trg_s_user_details_hash_diff
+    BEFORE INSERT OR UPDATE ON s_user_details
+    FOR EACH ROW EXECUTE FUNCTION sat_hash_diff('hk_user');
+
+DROP TRIGGER IF EXISTS trg_s_user_login_hash_diff ON s_user_login;
+CREATE TRIGGER trg_s_user_login_hash_diff
+    BEFORE INSERT OR UPDATE ON s_user_login
+    FOR EACH ROW EXECUTE FUNCTION sat_hash_diff('hk_user');
+
+DROP TRIGGER IF EXISTS trg_s_user_current_project_hash_diff ON s_user_current_project;
+CREATE TRIGGER trg_s_user_current_project_hash_diff
+    BEFORE INSERT OR UPDATE ON s_user_current_project
+    FOR EACH ROW EXECUTE FUNCTION sat_hash_diff('hk_user');
+
+DROP TRIGGER IF EXISTS trg_s_project_details_hash_diff ON s_project_details;
+CREATE TRIGGER trg_s_project_details_hash_diff
+    BEFORE INSERT OR UPDATE ON s_project_details
+    FOR EACH ROW EXECUTE FUNCTION sat_hash_diff('hk_project');
+
+DROP TRIGGER IF EXISTS trg_s_customer_details_hash_diff ON s_customer_details;
+CREATE TRIGGER trg_s_customer_details_hash_diff
+    BEFORE INSERT OR UPDATE ON s_customer_details
+    FOR EACH ROW EXECUTE FUNCTION sat_hash_diff('hk_customer');
+
+DROP TRIGGER IF EXISTS trg_s_timeentry_details_hash_diff ON s_timeentry_details;
+CREATE TRIGGER trg_s_timeentry_details_hash_diff
+    BEFORE INSERT OR UPDATE ON s_timeentry_details
+    FOR EACH ROW EXECUTE FUNCTION sat_hash_diff('hk_user_project_timeentry');
+
+-- Nachberechnung nur für die offenen Versionen; nur diese werden verglichen.
+-- Der Trigger setzt den Wert beim UPDATE.
+UPDATE s_user_details SET hash_diff = NULL WHERE t_to IS NULL AND hash_diff IS NULL;
+UPDATE s_user_login SET hash_diff = NULL WHERE t_to IS NULL AND hash_diff IS NULL;
+UPDATE s_user_current_project SET hash_diff = NULL WHERE t_to IS NULL AND hash_diff IS NULL;
+UPDATE s_project_details SET hash_diff = NULL WHERE t_to IS NULL AND hash_diff IS NULL;
+UPDATE s_customer_details SET hash_diff = NULL WHERE t_to IS NULL AND hash_diff IS NULL;
+UPDATE s_timeentry_details SET hash_diff = NULL WHERE t_to IS NULL AND hash_diff IS NULL;
@@ -0,0 +1,127 @@
+-- Monatliche Range-Partitionierung von s_timeentry_details nach entry_date.
+--
+-- Satellitenversionen werden nie gelöscht, die Tabelle wächst also stetig.
+-- Abfragen mit Zeitraum (GET /api/time-entries?from=..&to=..) lesen nach der
+-- Umstellung nur noch die betroffenen Monatspartitionen.
+--
+-- Partitionen heißen <tabelle>_JJJJMM. Die Default-Partition nimmt Zeilen
+-- ohne passende Monatspartition auf, damit ein Insert nie fehlschlägt;
+-- ensure_month_partitions() verschiebt sie beim Anlegen der Partition dorthin.
+-- partitions.py ruft die Funktion regelmäßig für die kommenden Monate auf.
+--
+-- Der Primärschlüssel muss den Partitionsschlüssel enthalten und lautet
+-- daher (hk_user_project_timeentry, t_from, entry_date).
+
+CREATE OR REPLACE FUNCTION ensure_month_partitions(parent TEXT, first_month DATE, last_month DATE)
+RETURNS SETOF TEXT
+LANGUAGE plpgsql AS $$
+DECLARE
+    month DATE := date_trunc('month', first_month)::date;
+    next_month DATE;
+    part TEXT;
+    part_column TEXT;
+    default_part TEXT;
+BEGIN
+    SELECT a.attname INTO part_column
+    FROM pg_partitioned_table pt
+    JOIN pg_attribute a ON a.attrelid = pt.partrelid AND a.attnum = pt.partattrs[0]
+    WHERE pt.partrelid = parent::regclass;
+    IF part_column IS NULL THEN
+        RAISE EXCEPTION 'Tabelle % ist nicht partitioniert', parent;
+    END IF;
+
+    SELECT c.relname INTO default_part
+    FROM pg_partitioned_table pt
+    JOIN pg_class c ON c.oid = pt.partdefid
+    WHERE pt.partrelid = parent::regclass;
+
+    WHILE month <= last_month LOOP
+        next_month := (month + INTERVAL '1 month')::date;
+        part := parent || '_' || to_char(month, 'YYYYMM');
+        IF to_regclass(part) IS NULL THEN
+            EXECUTE format('CREATE TABLE %I (LIKE %I INCLUDING DEFAULTS INCLUDING CONSTRAINTS)', part, parent);
+            -- Bereits in der Default-Partition gelandete Zeilen übernehmen
+            IF default_part IS NOT NULL THEN
+                EXECUTE format(
+                    'WITH verschoben AS (DELETE FROM %I WHERE %I >= %L AND %I < %L RETURNING *) '
+                    'INSERT INTO %I SELECT * FROM verschoben',
+                    default_part, part_column, month, part_column, next_month, part
+                );
+            END IF;
+            EXECUTE format(
+                'ALTER TABLE %I ATTACH PARTITION %I FOR VALUES FROM (%L) TO (%L)',
+                parent, part, month, next_month
+            );
+            RETURN NEXT part;
+        END IF;
+        month := next_month;
+    END LOOP;
+END
+$$;
+
+DO $$
+DECLARE
+    first_month DATE;
+    last_month DATE;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('s_timeentry_details')) IS DISTINCT FROM 'r' THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE s_timeentry_details RENAME TO s_timeentry_details_alt;
+    ALTER TABLE s_timeentry_details_alt RENAME CONSTRAINT s_timeentry_details_pkey TO s_timeentry_details_alt_pkey;
+    DROP INDEX IF EXISTS ix_s_timeentry_details_current;
+    DROP INDEX IF EXISTS ix_s_timeentry_details_date_current;
+
+    CREATE TABLE s_timeentry_details (
+        hk_user_project_timeentry UUID NOT NULL,
+        t_from TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        t_to TIMESTAMP NULL,
+        b_from DATE NOT NULL DEFAULT CURRENT_DATE,
+        b_to DATE NULL,
+        rec_src VARCHAR(255) NOT NULL,
+        entry_date DATE NOT NULL,
+        start_time TIME NOT NULL,
+        end_time TIME,
+        pause_minutes INT,
+        work_location VARCHAR(255),
+        description TEXT,
+        hash_diff CHAR(32),
+        PRIMARY KEY (hk_user_project_timeentry, t_from, entry_date),
+        FOREIGN KEY (hk_user_project_timeentry) REFERENCES l_user_project_timeentry(hk_user_project_timeentry)
+    ) PARTITION BY RANGE (entry_date);
+
+    CREATE TABLE s_timeentry_details_default PARTITION OF s_timeentry_details DEFAULT;
+
+    -- Monatspartitionen für den vorhandenen Bestand und das kommende Jahr
+    SELECT LEAST(MIN(entry_date), CURRENT_DATE), GREATEST(MAX(entry_date), CURRENT_DATE)
+    INTO first_month, last_month
+    FROM s_timeentry_details_alt;
+    PERFORM ensure_month_partitions('s_timeentry_details', first_month, (last_month + INTERVAL '12 months')::date);
+
+    -- hash_diff wird unverändert übernommen (Trigger existiert noch nicht)
+    INSERT INTO s_timeentry_details (
+        hk_user_project_timeentry, t_from, t_to, b_from, b_to, rec_src, entry_date,
+        start_time, end_time, pause_minutes, work_location, description, hash_diff
+    )
+    SELECT hk_user_project_timeentry, t_from, t_to, b_from, b_to, rec_src, entry_date,
+           start_time, end_time, pause_minutes, work_location, description, hash_diff
+    FROM s_timeentry_details_alt;
+
+    DROP TABLE s_timeentry_details_alt;
+END
+$$;
+
+-- Partitionierte Indizes; jede Partition erhält ihren eigenen Index
+CREATE INDEX IF NOT EXISTS ix_s_timeentry_details_current
+    ON s_timeentry_details (hk_user_project_timeentry, entry_date) WHERE t_to IS NULL;
+
+CREATE INDEX IF NOT EXISTS ix_s_timeentry_details_date_current
+    ON s_timeentry_details (entry_date) WHERE t_to IS NULL;
+
+DROP TRIGGER IF EXISTS trg_s_timeentry_details_hash_diff ON s_timeentry_details;
+CREATE TRIGGER trg_s_timeentry_details_hash_diff
+    BEFORE INSERT OR UPDATE ON s_timeentry_details
+    FOR EACH ROW EXECUTE FUNCTION sat_hash_diff('hk_user_project_timeentry');
+
+ANALYZE s_timeentry_details;
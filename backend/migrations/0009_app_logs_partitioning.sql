@@ -0,0 +1,81 @@
+-- app_logs: monatliche Range-Partitionierung nach timestamp, Indizes für die
+-- Admin-Abfrage (GET /api/admin/logs) und Tagessummen je Ereignistyp und Benutzer.
+--
+-- Alte Protokolle werden nicht per DELETE entfernt, sondern partitions.py
+-- löscht ganze Monatspartitionen außerhalb von LOG_RETENTION_MONTHS. Die
+-- Tagessummen in r_daily_log_events bleiben darüber hinaus erhalten.
+--
+-- Der Primärschlüssel enthält den Partitionsschlüssel und lautet daher
+-- (log_entry_id, timestamp); die Sequenz der bisherigen SERIAL-Spalte wird
+-- weiterverwendet.
+
+DO $$
+DECLARE
+    first_month DATE;
+    last_month DATE;
+BEGIN
+    IF (SELECT relkind FROM pg_class WHERE oid = to_regclass('app_logs')) IS DISTINCT FROM 'r' THEN
+        RETURN;
+    END IF;
+
+    ALTER TABLE app_logs RENAME TO app_logs_alt;
+    ALTER TABLE app_logs_alt RENAME CONSTRAINT app_logs_pkey TO app_logs_alt_pkey;
+    ALTER SEQUENCE app_logs_log_entry_id_seq OWNED BY NONE;
+    ALTER SEQUENCE app_logs_log_entry_id_seq AS BIGINT;
+
+    CREATE TABLE app_logs (
+        log_entry_id BIGINT NOT NULL DEFAULT nextval('app_logs_log_entry_id_seq'),
+        timestamp TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP,
+        event_type VARCHAR(255) NOT NULL,
+        hk_user UUID NULL,
+        details JSONB NULL,
+        rec_src VARCHAR(255) NOT NULL,
+        PRIMARY KEY (log_entry_id, timestamp)
+    ) PARTITION BY RANGE (timestamp);
+
+    CREATE TABLE app_logs_default PARTITION OF app_logs DEFAULT;
+
+    SELECT LEAST(MIN(timestamp)::date, CURRENT_DATE), CURRENT_DATE
+    INTO first_month, last_month
+    FROM app_logs_alt;
+    PERFORM ensure_month_partitions('app_logs', first_month, (last_month + INTERVAL '3 months')::date);
+
+    INSERT INTO app_logs (log_entry_id, timestamp, event_type, hk_user, details, rec_src)
+    SELECT log_entry_id, timestamp, event_type, hk_user, details, rec_src
+    FROM app_logs_alt;
+
+    DROP TABLE app_logs_alt;
+    ALTER SEQUENCE app_logs_log_entry_id_seq OWNED BY app_logs.log_entry_id;
+END
+$$;
+
+-- Admin-Abfrage: nach Ereignistyp bzw. Benutzer, neueste zuerst
+CREATE INDEX IF NOT EXISTS ix_app_logs_event_type_timestamp
+    ON app_logs (event_type, timestamp DESC);
+
+CREATE INDEX IF NOT EXISTS ix_app_logs_hk_user_timestamp
+    ON app_logs (hk_user, timestamp DESC) WHERE hk_user IS NOT NULL;
+
+-- Tagessummen je Ereignistyp und Benutzer. Ereignisse ohne bekannten
+-- Benutzer (z.B. Login mit unbekannter E-Mail) zählen unter der Null-UUID,
+-- da hk_user Teil des Primärschlüssels ist. Fortgeschrieben vom Protokoll-
+-- Writer (log.py) in derselben Anweisung wie der INSERT in app_logs.
+CREATE TABLE IF NOT EXISTS r_daily_log_events (
+    day DATE NOT NULL,
+    event_type VARCHAR(255) NOT NULL,
+    hk_user UUID NOT NULL DEFAULT '00000000-0000-0000-0000-000000000000',
+    event_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (day, event_type, hk_user)
+);
+
+CREATE INDEX IF NOT EXISTS ix_r_daily_log_events_user_day
+    ON r_daily_log_events (hk_user, day);
+
+-- Erstbefüllung aus dem vorhandenen Protokoll
+INSERT INTO r_daily_log_events (day, event_type, hk_user, event_count)
+SELECT timestamp::date, event_type, COALESCE(hk_user, '00000000-0000-0000-0000-000000000000'), COUNT(*)
+FROM app_logs
+GROUP BY 1, 2, 3
+ON CONFLICT (day, event_type, hk_user) DO NOTHING;
+
+ANALYZE app_logs;
@@ -0,0 +1,61 @@
+-- Archivtabellen für geschlossene Satellitenversionen.
+--
+-- archive.py verschiebt Versionen, deren t_to vor einem Stichtag liegt, in
+-- <satellit>_archive (gleiche Spalten, kein Trigger, keine Indizes auf der
+-- offenen Version). Damit enthalten die Satelliten selbst fast nur noch die
+-- aktuellen Versionen und die jüngere Historie.
+--
+-- Für Abfragen über die gesamte Historie (z.B. Stand zu einem Zeitpunkt)
+-- vereinen die Views <satellit>_history beide Tabellen.
+
+CREATE TABLE IF NOT EXISTS s_user_details_archive (LIKE s_user_details INCLUDING DEFAULTS);
+CREATE TABLE IF NOT EXISTS s_user_login_archive (LIKE s_user_login INCLUDING DEFAULTS);
+CREATE TABLE IF NOT EXISTS s_user_current_project_archive (LIKE s_user_current_project INCLUDING DEFAULTS);
+CREATE TABLE IF NOT EXISTS s_project_details_archive (LIKE s_project_details INCLUDING DEFAULTS);
+CREATE TABLE IF NOT EXISTS s_customer_details_archive (LIKE s_customer_details INCLUDING DEFAULTS);
+CREATE TABLE IF NOT EXISTS s_timeentry_details_archive (LIKE s_timeentry_details INCLUDING DEFAULTS);
+
+-- Primärschlüssel wie im Satelliten. Eine Version, die schon im Archiv liegt,
+-- lässt den Stapel in archive.py mit einem Fehler abbrechen (siehe dort)
+CREATE UNIQUE INDEX IF NOT EXISTS ux_s_user_details_archive
+    ON s_user_details_archive (hk_user, t_from);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_s_user_login_archive
+    ON s_user_login_archive (hk_user, t_from);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_s_user_current_project_archive
+    ON s_user_current_project_archive (hk_user, t_from);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_s_project_details_archive
+    ON s_project_details_archive (hk_project, t_from);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_s_customer_details_archive
+    ON s_customer_details_archive (hk_customer, t_from);
+CREATE UNIQUE INDEX IF NOT EXISTS ux_s_timeentry_details_archive
+    ON s_timeentry_details_archive (hk_user_project_timeentry, t_from, entry_date);
+
+CREATE OR REPLACE VIEW s_user_details_history AS
+    SELECT * FROM s_user_details
+    UNION ALL
+    SELECT * FROM s_user_details_archive;
+
+CREATE OR REPLACE VIEW s_user_login_history AS
+    SELECT * FROM s_user_login
+    UNION ALL
+    SELECT * FROM s_user_login_archive;
+
+CREATE OR REPLACE VIEW s_user_current_project_history AS
+    SELECT * FROM s_user_current_project
+    UNION ALL
+    SELECT * FROM s_user_current_project_archive;
+
+CREATE OR REPLACE VIEW s_project_details_history AS
+    SELECT * FROM s_project_details
+    UNION ALL
+    SELECT * FROM s_project_details_archive;
+
+CREATE OR REPLACE VIEW s_customer_details_history AS
+    SELECT * FROM s_customer_details
+    UNION ALL
+    SELECT * FROM s_customer_details_archive;
+
+CREATE OR REPLACE VIEW s_timeentry_details_history AS
+    SELECT * FROM s_timeentry_details
+    UNION ALL
+    SELECT * FROM s_timeentry_details_archive;
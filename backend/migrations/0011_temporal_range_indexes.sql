@@ -0,0 +1,80 @@
+-- migrate:no-transaction
+-- GiST-Indizes auf den Gültigkeitszeiträumen für Abfragen zu einem Zeitpunkt
+-- (Query-Parameter as_of und valid_at, siehe temporal.py).
+--
+-- Die Ausdrücke müssen exakt denen der Abfragen entsprechen:
+--   tsrange(t_from, t_to) @> <zeitpunkt>    Transaktionszeit
+--   daterange(b_from, b_to) @> <datum>      fachliche Gültigkeit
+-- Offene Versionen (t_to bzw. b_to NULL) ergeben nach oben offene Bereiche.
+-- Einzelne Schlüssel werden über den Primärschlüssel (<schlüssel>, t_from)
+-- gefunden; die GiST-Indizes tragen die Listen (alle Projekte, Kunden,
+-- Benutzer zum Zeitpunkt). Indiziert sind Satelliten und Archivtabellen, da
+-- die Views <satellit>_history beide lesen.
+--
+-- s_timeentry_details ist partitioniert; dort ist kein CONCURRENTLY möglich,
+-- der Index wird je Partition angelegt.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_user_details_t_range
+    ON s_user_details USING gist (tsrange(t_from, t_to));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_user_details_b_range
+    ON s_user_details USING gist (daterange(b_from, b_to));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_user_details_archive_t_range
+    ON s_user_details_archive USING gist (tsrange(t_from, t_to));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_user_details_archive_b_range
+    ON s_user_details_archive USING gist (daterange(b_from, b_to));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_user_login_t_range
+    ON s_user_login USING gist (tsrange(t_from, t_to));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_user_login_b_range
+    ON s_user_login USING gist (daterange(b_from, b_to));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_user_login_archive_t_range
+    ON s_user_login_archive USING gist (tsrange(t_from, t_to));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_user_login_archive_b_range
+    ON s_user_login_archive USING gist (daterange(b_from, b_to));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_user_current_project_t_range
+    ON s_user_current_project USING gist (tsrange(t_from, t_to));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_user_current_project_b_range
+    ON s_user_current_project USING gist (daterange(b_from, b_to));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_user_current_project_archive_t_range
+    ON s_user_current_project_archive USING gist (tsrange(t_from, t_to));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_user_current_project_archive_b_range
+    ON s_user_current_project_archive USING gist (daterange(b_from, b_to));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_project_details_t_range
+    ON s_project_details USING gist (tsrange(t_from, t_to));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_project_details_b_range
+    ON s_project_details USING gist (daterange(b_from, b_to));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_project_details_archive_t_range
+    ON s_project_details_archive USING gist (tsrange(t_from, t_to));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_project_details_archive_b_range
+    ON s_project_details_archive USING gist (daterange(b_from, b_to));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_customer_details_t_range
+    ON s_customer_details USING gist (tsrange(t_from, t_to));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_customer_details_b_range
+    ON s_customer_details USING gist (daterange(b_from, b_to));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_customer_details_archive_t_range
+    ON s_customer_details_archive USING gist (tsrange(t_from, t_to));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_customer_details_archive_b_range
+    ON s_customer_details_archive USING gist (daterange(b_from, b_to));
+
+CREATE INDEX IF NOT EXISTS ix_s_timeentry_details_t_range
+    ON s_timeentry_details USING gist (tsrange(t_from, t_to));
+CREATE INDEX IF NOT EXISTS ix_s_timeentry_details_b_range
+    ON s_timeentry_details USING gist (daterange(b_from, b_to));
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_timeentry_details_archive_t_range
+    ON s_timeentry_details_archive USING gist (tsrange(t_from, t_to));
+CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_s_timeentry_details_archive_b_range
+    ON s_timeentry_details_archive USING gist (daterange(b_from, b_to));
+
+ANALYZE s_user_details;
+ANALYZE s_project_details;
+ANALYZE s_customer_details;
+ANALYZE s_timeentry_details;
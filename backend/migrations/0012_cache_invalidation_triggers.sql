@@ -0,0 +1,103 @@
+-- Benachrichtigungen für die Cache-Invalidierung (invalidation.py).
+--
+-- Jede Änderung an Hubs, Links und Satelliten sendet auf dem Kanal
+-- cache_invalidation die Nachricht '<entität>:<schlüssel>'. PostgreSQL stellt
+-- sie erst mit dem Commit zu (nach einem Rollback gar nicht) und fasst
+-- gleiche Nachrichten einer Transaktion zusammen – ein Import vieler
+-- Zeiteinträge eines Benutzers ergibt also eine einzige Nachricht.
+--
+-- Entitäten und Schlüssel:
+--   user        hk_user      (h_user, s_user_details, s_user_login, s_user_current_project)
+--   project     hk_project   (h_project, s_project_details)
+--   customer    hk_customer  (h_customer, s_customer_details)
+--   timeentry   hk_user      (l_user_project_timeentry, s_timeentry_details)
+--   revocation  hk_user      (auth_token_revocations)
+--
+-- Satelliten lösen nur bei INSERT und UPDATE aus; das Archivieren
+-- geschlossener Versionen (DELETE, archive.py) betrifft keinen Cache.
+
+CREATE OR REPLACE FUNCTION notify_cache_invalidation()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+DECLARE
+    zeile JSONB;
+BEGIN
+    IF TG_OP = 'DELETE' THEN
+        zeile := to_jsonb(OLD);
+    ELSE
+        zeile := to_jsonb(NEW);
+    END IF;
+    PERFORM pg_notify('cache_invalidation', TG_ARGV[0] || ':' || COALESCE(zeile ->> TG_ARGV[1], ''));
+    RETURN NULL;
+END
+$$;
+
+-- Zeiteintrag-Versionen tragen nur den Link-Schlüssel; Caches sind je Benutzer
+CREATE OR REPLACE FUNCTION notify_timeentry_invalidation()
+RETURNS trigger
+LANGUAGE plpgsql AS $$
+BEGIN
+    PERFORM pg_notify('cache_invalidation', 'timeentry:' || COALESCE((
+        SELECT l.hk_user::text
+        FROM l_user_project_timeentry l
+        WHERE l.hk_user_project_timeentry = NEW.hk_user_project_timeentry
+    ), ''));
+    RETURN NULL;
+END
+$$;
+
+DROP TRIGGER IF EXISTS trg_h_user_notify ON h_user;
+CREATE TRIGGER trg_h_user_notify
+    AFTER INSERT OR UPDATE OR DELETE ON h_user
+    FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation('user', 'hk_user');
+
+DROP TRIGGER IF EXISTS trg_s_user_details_notify ON s_user_details;
+CREATE TRIGGER trg_s_user_details_notify
+    AFTER INSERT OR UPDATE ON s_user_details
+    FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation('user', 'hk_user');
+
+DROP TRIGGER IF EXISTS trg_s_user_login_notify ON s_user_login;
+CREATE TRIGGER trg_s_user_login_notify
+    AFTER INSERT OR UPDATE ON s_user_login
+    FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation('user', 'hk_user');
+
+DROP TRIGGER IF EXISTS trg_s_user_current_project_notify ON s_user_current_project;
+CREATE TRIGGER trg_s_user_current_project_notify
+    AFTER INSERT OR UPDATE ON s_user_current_project
+    FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation('user', 'hk_user');
+
+DROP TRIGGER IF EXISTS trg_h_project_notify ON h_project;
+CREATE TRIGGER trg_h_project_notify
+    AFTER INSERT OR UPDATE OR DELETE ON h_project
+    FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation('project', 'hk_project');
+
+DROP TRIGGER IF EXISTS trg_s_project_details_notify ON s_project_details;
+CREATE TRIGGER trg_s_project_details_notify
+    AFTER INSERT OR UPDATE ON s_project_details
+    FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation('project', 'hk_project');
+
+DROP TRIGGER IF EXISTS trg_h_customer_notify ON h_customer;
+CREATE TRIGGER trg_h_customer_notify
+    AFTER INSERT OR UPDATE OR DELETE ON h_customer
+    FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation('customer', 'hk_customer');
+
+DROP TRIGGER IF EXISTS trg_s_customer_details_notify ON s_customer_details;
+CREATE TRIGGER trg_s_customer_details_notify
+    AFTER INSERT OR UPDATE ON s_customer_details
+    FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation('customer', 'hk_customer');
+
+DROP TRIGGER IF EXISTS trg_l_user_project_timeentry_notify ON l_user_project_timeentry;
+CREATE TRIGGER trg_l_user_project_timeentry_notify
+    AFTER INSERT OR UPDATE OR DELETE ON l_user_project_timeentry
+    FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation('timeentry', 'hk_user');
+
+-- Auf der partitionierten Tabelle angelegt, gilt für alle Partitionen
+DROP TRIGGER IF EXISTS trg_s_timeentry_details_notify ON s_timeentry_details;
+CREATE TRIGGER trg_s_timeentry_details_notify
+    AFTER INSERT OR UPDATE ON s_timeentry_details
+    FOR EACH ROW EXECUTE FUNCTION notify_timeentry_invalidation();
+
+DROP TRIGGER IF EXISTS trg_auth_token_revocations_notify ON auth_token_revocations;
+CREATE TRIGGER trg_auth_token_revocations_notify
+    AFTER INSERT OR UPDATE OR DELETE ON auth_token_revocations
+    FOR EACH ROW EXECUTE FUNCTION notify_cache_invalidation('revocation', 'hk_user');
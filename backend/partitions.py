@@ -0,0 +1,181 @@
+"""
+Pflege der monatlichen Range-Partitionen.
+
+Partitioniert sind die Tabellen in PARTITIONED_TABLES (Migrationen 0008 und
+0009). ensure_partitions() legt über die Datenbankfunktion
+ensure_month_partitions() die Monatspartitionen bis PARTITION_MONTHS_AHEAD
+Monate im Voraus an und übernimmt dabei Zeilen, die bis dahin in der
+Default-Partition gelandet sind. drop_expired_partitions() löscht für Tabellen
+mit Aufbewahrungsfrist (RETENTION_MONTHS) ganze Monatspartitionen statt
+einzelne Zeilen per DELETE.
+Wie pit.py committet das Modul nicht selbst; ``db`` darf eine
+``Database``-Instanz oder ein psycopg2-Cursor sein.
+
+Aufgerufen wird die Pflege beim Start von gunicorn und zusätzlich per Cron:
+    python partitions.py maintain            # anlegen und Aufbewahrungsfrist anwenden
+    python partitions.py ensure [<monate>]   # nur Partitionen im Voraus anlegen
+    python partitions.py status              # Partitionen mit Zeilenzahl
+"""
+
+import os
+import re
+import sys
+from datetime import date
+
+PARTITION_MONTHS_AHEAD = int(os.getenv('PARTITION_MONTHS_AHEAD', '3'))
+LOG_RETENTION_MONTHS = int(os.getenv('LOG_RETENTION_MONTHS', '12'))
+
+# Tabelle -> Partitionsschlüssel
+PARTITIONED_TABLES = {
+    's_timeentry_details': 'entry_date',
+    'app_logs': 'timestamp',
+}
+
+# Tabelle -> Anzahl vollständig aufbewahrter Monate vor dem aktuellen (0 = unbegrenzt).
+# Satelliten sind Historie und werden nie gelöscht.
+RETENTION_MONTHS = {
+    'app_logs': LOG_RETENTION_MONTHS,
+}
+
+
+def _cursor(db):
+    return getattr(db, 'cur', db)
+
+
+def add_months(day, months):
+    """Erster Tag des Monats, der ``months`` Monate nach dem Monat von ``day`` liegt."""
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def ensure_partitions(db, table, first=None, last=None, months_ahead=None):
+    """
+    Legt fehlende Monatspartitionen von ``first`` bis ``last`` an.
+
+    Args:
+        table (str): Partitionierte Tabelle aus PARTITIONED_TABLES
+        first (date, optional): Erster Monat; Default ist der aktuelle Monat
+        last (date, optional): Letzter Monat; Default ist heute + ``months_ahead``
+        months_ahead (int, optional): Default PARTITION_MONTHS_AHEAD
+
+    Returns:
+        list[str]: Namen der neu angelegten Partitionen
+    """
+    if table not in PARTITIONED_TABLES:
+        raise ValueError(f"{table} ist nicht partitioniert")
+    today = date.today()
+    first = first or today.replace(day=1)
+    if last is None:
+        last = add_months(today, PARTITION_MONTHS_AHEAD if months_ahead is None else months_ahead)
+    cur = _cursor(db)
+    cur.execute("SELECT ensure_month_partitions(%s, %s, %s)", (table, first, last))
+    return [row[0] for row in cur.fetchall()]
+
+
+def ensure_all(db, months_ahead=None):
+    """
+    Pflegt alle partitionierten Tabellen: Partitionen für die kommenden Monate
+    sowie für Monate, deren Zeilen in der Default-Partition liegen (z.B. nach
+    einem Import weit zurückliegender Einträge).
+
+    Returns:
+        list[str]: Namen der neu angelegten Partitionen
+    """
+    created = []
+    cur = _cursor(db)
+    for table, column in PARTITIONED_TABLES.items():
+        cur.execute(f'SELECT MIN("{column}")::date, MAX("{column}")::date FROM {table}_default')
+        first, last = cur.fetchone()
+        if first is not None:
+            created += ensure_partitions(db, table, first, last)
+        created += ensure_partitions(db, table, months_ahead=months_ahead)
+    return created
+
+
+def drop_expired_partitions(db, table, keep_months=None, today=None):
+    """
+    Löscht die Monatspartitionen, die vollständig vor der Aufbewahrungsfrist liegen.
+
+    Args:
+        keep_months (int, optional): Default aus RETENTION_MONTHS; 0 löscht nichts
+        today (date, optional): Bezugsdatum (für Tests)
+
+    Returns:
+        list[str]: Namen der gelöschten Partitionen
+    """
+    keep_months = RETENTION_MONTHS.get(table, 0) if keep_months is None else keep_months
+    if keep_months <= 0:
+        return []
+    cutoff = add_months(today or date.today(), -keep_months)
+    pattern = re.compile(rf'^{re.escape(table)}_(\d{{4}})(\d{{2}})$')
+    dropped = []
+    cur = _cursor(db)
+    for name, _bound, _rows in partition_status(db, table):
+        match = pattern.match(name)
+        if not match or date(int(match.group(1)), int(match.group(2)), 1) >= cutoff:
+            continue
+        # DETACH vor DROP: die Sperre auf der Elterntabelle ist nur kurz
+        cur.execute(f'ALTER TABLE {table} DETACH PARTITION "{name}"')
+        cur.execute(f'DROP TABLE "{name}"')
+        dropped.append(name)
+    return dropped
+
+
+def run_maintenance(db, months_ahead=None):
+    """
+    Legt fehlende Partitionen an und wendet die Aufbewahrungsfristen an.
+
+    Returns:
+        tuple: (angelegte, gelöschte) Partitionsnamen
+    """
+    created = ensure_all(db, months_ahead=months_ahead)
+    dropped = []
+    for table in RETENTION_MONTHS:
+        dropped += drop_expired_partitions(db, table)
+    return created, dropped
+
+
+def partition_status(db, table):
+    """
+    Returns:
+        list[tuple]: (Partition, Bereichsgrenze, geschätzte Zeilenzahl) je Partition
+    """
+    cur = _cursor(db)
+    cur.execute("""
+        SELECT c.relname, pg_get_expr(c.relpartbound, c.oid), c.reltuples::bigint
+        FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = %s::regclass
+        ORDER BY c.relname
+    """, (table,))
+    return cur.fetchall()
+
+
+if __name__ == '__main__':
+    from database import Database
+
+    command = sys.argv[1] if len(sys.argv) > 1 else None
+    if command not in ('maintain', 'ensure', 'status') or len(sys.argv) > 3:
+        print("Aufruf: python partitions.py maintain | ensure [<monate>] | status")
+        sys.exit(2)
+    db = Database()
+    try:
+        if command == 'maintain':
+            created, dropped = run_maintenance(db)
+            db.commit()
+            print(f"{len(created)} Partition(en) angelegt, {len(dropped)} gelöscht"
+                  + (f": {', '.join(dropped)}" if dropped else ""))
+        elif command == 'ensure':
+            created = ensure_all(db, int(sys.argv[2]) if len(sys.argv) == 3 else None)
+            db.commit()
+            print(f"{len(created)} Partition(en) angelegt" + (f": {', '.join(created)}" if created else ""))
+        else:
+            for table in PARTITIONED_TABLES:
+                print(table)
+                for name, bound, rows in partition_status(db, table):
+                    print(f"  {name:<40} {bound:<60} ~{max(rows, 0)} Zeilen")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,138 @@
+"""
+Pflege der Point-in-Time-Tabellen (pit_user, pit_project, pit_timeentry).
+
+Jede Funktion berechnet die PIT-Zeilen für die übergebenen Schlüssel mit
+einer einzigen Anweisung neu. Sie wird in derselben Transaktion wie der
+Schreibzugriff auf den Satelliten aufgerufen und committet nicht selbst.
+``db`` darf eine ``Database``-Instanz oder ein psycopg2-Cursor sein.
+
+Aufruf für einen vollständigen Neuaufbau:
+    python pit.py rebuild
+"""
+
+import sys
+import uuid
+
+
+def as_key_list(keys):
+    """Normalisiert einen oder mehrere Schlüssel zu einer Liste von UUID-Strings."""
+    if keys is None:
+        return []
+    if not isinstance(keys, (list, tuple, set)):
+        keys = [keys]
+    return [str(uuid.UUID(bytes=k)) if isinstance(k, bytes) else str(k) for k in keys if k is not None]
+
+
+def refresh_user_pit(db, hk_users):
+    """Aktualisiert pit_user für die angegebenen Benutzer."""
+    keys = as_key_list(hk_users)
+    if not keys:
+        return
+    db.execute("""
+        INSERT INTO pit_user (hk_user, user_details_t_from, user_login_t_from,
+                              user_current_project_t_from, snapshot_ts)
+        SELECT
+            h.hk_user,
+            (SELECT MAX(d.t_from) FROM s_user_details d WHERE d.hk_user = h.hk_user AND d.t_to IS NULL),
+            (SELECT MAX(l.t_from) FROM s_user_login l WHERE l.hk_user = h.hk_user AND l.t_to IS NULL),
+            (SELECT MAX(c.t_from) FROM s_user_current_project c WHERE c.hk_user = h.hk_user AND c.t_to IS NULL),
+            CURRENT_TIMESTAMP
+        FROM h_user h
+        WHERE h.hk_user = ANY(%s::uuid[])
+        ON CONFLICT (hk_user) DO UPDATE SET
+            user_details_t_from = EXCLUDED.user_details_t_from,
+            user_login_t_from = EXCLUDED.user_login_t_from,
+            user_current_project_t_from = EXCLUDED.user_current_project_t_from,
+            snapshot_ts = EXCLUDED.snapshot_ts
+    """, (keys,))
+
+
+def refresh_project_pit(db, hk_projects):
+    """Aktualisiert pit_project für die angegebenen Projekte."""
+    keys = as_key_list(hk_projects)
+    if not keys:
+        return
+    db.execute("""
+        INSERT INTO pit_project (hk_project, project_details_t_from, snapshot_ts)
+        SELECT
+            h.hk_project,
+            (SELECT MAX(d.t_from) FROM s_project_details d WHERE d.hk_project = h.hk_project AND d.t_to IS NULL),
+            CURRENT_TIMESTAMP
+        FROM h_project h
+        WHERE h.hk_project = ANY(%s::uuid[])
+        ON CONFLICT (hk_project) DO UPDATE SET
+            project_details_t_from = EXCLUDED.project_details_t_from,
+            snapshot_ts = EXCLUDED.snapshot_ts
+    """, (keys,))
+
+
+def refresh_timeentry_pit(db, link_ids):
+    """
+    Aktualisiert pit_timeentry für die angegebenen Links.
+    Geschlossene Links oder Links ohne offenen Satelliten werden entfernt.
+    """
+    keys = as_key_list(link_ids)
+    if not keys:
+        return
+    db.execute("""
+        WITH aktuell AS (
+            SELECT DISTINCT ON (l.hk_user_project_timeentry)
+                l.hk_user_project_timeentry, l.hk_user, l.hk_project, l.timeentry_id,
+                s.t_from, s.entry_date, s.start_time
+            FROM l_user_project_timeentry l
+            JOIN s_timeentry_details s
+                ON s.hk_user_project_timeentry = l.hk_user_project_timeentry AND s.t_to IS NULL
+            WHERE l.hk_user_project_timeentry = ANY(%(keys)s::uuid[]) AND l.t_to IS NULL
+            ORDER BY l.hk_user_project_timeentry, s.t_from DESC
+        ), entfernt AS (
+            DELETE FROM pit_timeentry p
+            WHERE p.hk_user_project_timeentry = ANY(%(keys)s::uuid[])
+              AND NOT EXISTS (
+                  SELECT 1 FROM aktuell a WHERE a.hk_user_project_timeentry = p.hk_user_project_timeentry
+              )
+        )
+        INSERT INTO pit_timeentry (
+            hk_user_project_timeentry, hk_user, hk_project, timeentry_id,
+            timeentry_details_t_from, entry_date, start_time, snapshot_ts
+        )
+        SELECT hk_user_project_timeentry, hk_user, hk_project, timeentry_id,
+               t_from, entry_date, start_time, CURRENT_TIMESTAMP
+        FROM aktuell
+        ON CONFLICT (hk_user_project_timeentry) DO UPDATE SET
+            hk_user = EXCLUDED.hk_user,
+            hk_project = EXCLUDED.hk_project,
+            timeentry_id = EXCLUDED.timeentry_id,
+            timeentry_details_t_from = EXCLUDED.timeentry_details_t_from,
+            entry_date = EXCLUDED.entry_date,
+            start_time = EXCLUDED.start_time,
+            snapshot_ts = EXCLUDED.snapshot_ts
+    """, {'keys': keys})
+
+
+def rebuild_all(db):
+    """Baut alle PIT-Tabellen aus den Satelliten neu auf (z.B. nach manuellen Korrekturen)."""
+    db.execute("DELETE FROM pit_timeentry")
+    db.execute("SELECT hk_user FROM h_user")
+    refresh_user_pit(db, [row[0] for row in db.cur.fetchall()])
+    db.execute("SELECT hk_project FROM h_project")
+    refresh_project_pit(db, [row[0] for row in db.cur.fetchall()])
+    db.execute("SELECT hk_user_project_timeentry FROM l_user_project_timeentry WHERE t_to IS NULL")
+    refresh_timeentry_pit(db, [row[0] for row in db.cur.fetchall()])
+
+
+if __name__ == '__main__':
+    from database import Database
+
+    if sys.argv[1:] != ['rebuild']:
+        print("Aufruf: python pit.py rebuild")
+        sys.exit(2)
+    db = Database()
+    try:
+        rebuild_all(db)
+        db.commit()
+        print("PIT-Tabellen neu aufgebaut")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
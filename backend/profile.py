@@ -36,9 +36,11 @@ def profile():
                 FROM 
                     h_user h
                 JOIN 
-                    s_user_details s ON h.hk_user = s.hk_user
+                    pit_user p ON p.hk_user = h.hk_user
+                JOIN 
+                    s_user_details s ON s.hk_user = h.hk_user AND s.t_from = p.user_details_t_from
                 WHERE 
-                    h.user_id = %s AND s.t_to IS NULL
+                    h.user_id = %s AND h.t_to IS NULL
             """, (current_user_email,))
             
             if not user:
@@ -51,10 +53,11 @@ def profile():
             # Aktuelles Projekt abrufen
             current_project = db.fetch_one("""
                 SELECT p.project_name, p.hk_project
-                FROM s_user_current_project ucp 
+                FROM pit_user pu
+                JOIN s_user_current_project ucp ON ucp.hk_user = pu.hk_user
+                    AND ucp.t_from = pu.user_current_project_t_from
                 JOIN h_project p ON ucp.hk_project = p.hk_project
-                WHERE ucp.hk_user = %s AND ucp.t_to IS NULL 
-                ORDER BY ucp.t_from DESC LIMIT 1
+                WHERE pu.hk_user = %s
             """, (user[0],))
             
             # Nutzerdaten für die Antwort zusammenstellen
@@ -89,8 +92,8 @@ def profile():
             print(f"⭐️ Aktuelles Projekt aus Request: {current_project}")
             
             # Aktualisieren der Benutzerdetails (ohne Projekt)
-            db.update_user_details(user[0], update_data)
-            print("⭐️ Benutzerdetails aktualisiert")
+            created = db.update_user_details(user[0], update_data)
+            print(f"⭐️ Benutzerdetails aktualisiert (neue Version: {created})")
             
             # Aktualisiere das Projekt, wenn es im Request enthalten ist
             if 'currentProject' in update_data:
@@ -104,7 +107,8 @@ def profile():
                     
                     # Rufe die update_user_project Methode auf
                     print(f"⭐️ Rufe update_user_project auf mit hk_user={user[0].hex() if isinstance(user[0], bytes) else user[0]} und project={current_project}")
-                    db.update_user_project(user[0], project_id_bytes)
+                    if db.update_user_project(user[0], project_id_bytes):
+                        created = True
                     print("⭐️ Projektaktualisierung abgeschlossen")
                     
                     # Direkte Prüfung nach dem Update
@@ -134,7 +138,7 @@ def profile():
             updated_user = db.get_user_by_email(current_user_email)
             print(f"⭐️ Aktualisiertes Profil aus DB: {updated_user}")
             
-            return jsonify({"message": "Profil erfolgreich aktualisiert"}), 200
+            return jsonify({"message": "Profil erfolgreich aktualisiert", "versionCreated": created}), 200
             
     except Exception as e:
         import traceback
@@ -4,7 +4,14 @@ from flask_jwt_extended import jwt_required
 import traceback
 import uuid
 import psycopg2
+from catalog import catalog, catalog_response
+from coalesce import any_user, coalesced
 from database import Database
+from db_pool import get_request_connection
+from pit import refresh_project_pit
+from satellite import write_versions
+from streaming import stream_json
+from temporal import parse_temporal_args
 
 project_bp = Blueprint("project", __name__)
 customer_bp = Blueprint("customer", __name__)
@@ -19,20 +26,24 @@ def parse_date(date_str):
         return None
 
 def get_db_conn():
-    return psycopg2.connect(
-        host=app.config["DB_HOST"],
-        database=app.config["DB_NAME"],
-        user=app.config["DB_USER"],
-        password=app.config["DB_PASSWORD"],
-    )
+    """Gibt die Pool-Verbindung des aktuellen Requests zurück."""
+    return get_request_connection()
 
 @project_bp.route('/api/projects', methods=['GET'])
 @jwt_required()
+@coalesced(any_user)
 def get_projects():
+    """
+    Query-Parameter (optional):
+        as_of: Stand der Datenbank zu diesem Zeitpunkt (ISO 8601)
+        valid_at: Fachlich an diesem Tag gültige Projektdaten (YYYY-MM-DD)
+    """
     try:
-        db = Database()
-        cur = db.cur
-        cur.execute("""
+        temporal = parse_temporal_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    try:
+        query = f"""
             SELECT
                 p.hk_project::text AS hk_project,
                 pd.project_name,
@@ -43,15 +54,14 @@ def get_projects():
                 pd.customer_id::text AS customer_id,
                 c.customer_name
             FROM h_project p
-            JOIN s_project_details pd ON p.hk_project = pd.hk_project
-                AND pd.t_to IS NULL
+            JOIN {temporal.source('s_project_details')} pd ON p.hk_project = pd.hk_project
+                AND {temporal.condition('pd')}
             LEFT JOIN h_customer c ON pd.customer_id = c.hk_customer
             ORDER BY pd.project_name
-        """)
+        """
         
-        projects = []
-        for row in cur.fetchall():
-            projects.append({
+        def serialize(row):
+            return {
                 'hk_project': row[0],
                 'project_name': row[1],
                 'description': row[2],
@@ -60,9 +70,12 @@ def get_projects():
                 'budget_days': row[5],
                 'customer_id': row[6],
                 'customer_name': row[7]
-            })
+            }
         
-        return jsonify(projects), 200
+        if temporal.active:
+            return stream_json(Database().stream(query, temporal.params()), serialize)
+        # Aktueller Stand aus dem Katalog; die Datenbank wird nur nach einem Schreibzugriff gelesen
+        return catalog_response('projects', lambda: [serialize(row) for row in Database().fetch_all(query)])
     
     except Exception as e:
         traceback.print_exc()
@@ -124,9 +137,10 @@ def create_project():
             budget_days  # Hier wird NULL übergeben, wenn es leer ist
         ))
         
+        refresh_project_pit(cur, hk_project)
         conn.commit()
+        catalog.bump()
         cur.close()
-        conn.close()
         
         return jsonify({
             "success": True,
@@ -140,11 +154,15 @@ def create_project():
 
 @project_bp.route("/api/projects/<hk_project>", methods=["GET"])
 def get_project(hk_project):
+    try:
+        temporal = parse_temporal_args(request.args)
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
     try:
         conn = get_db_conn()
         cur = conn.cursor()
         
-        cur.execute("""
+        cur.execute(f"""
             SELECT 
                 p.hk_project::text as hk_project,
                 pd.project_name,
@@ -155,11 +173,11 @@ def get_project(hk_project):
                 pd.budget_days,
                 c.customer_name
             FROM h_project p
-            JOIN s_project_details pd ON p.hk_project = pd.hk_project
-                AND pd.t_to IS NULL
+            JOIN {temporal.source('s_project_details')} pd ON p.hk_project = pd.hk_project
+                AND {temporal.condition('pd')}
             LEFT JOIN h_customer c ON pd.customer_id = c.hk_customer
-            WHERE p.hk_project::text = %s
-        """, (hk_project,))
+            WHERE p.hk_project::text = %(hk_project)s
+        """, dict(temporal.params(), hk_project=hk_project))
         
         row = cur.fetchone()
         if not row:
@@ -177,7 +195,6 @@ def get_project(hk_project):
         }
         
         cur.close()
-        conn.close()
         
         return jsonify(project), 200
         
@@ -223,39 +240,27 @@ def edit_project(hk_project):
         if not cur.fetchone():
             return jsonify({"error": "Projekt nicht gefunden"}), 404
             
-        # Altes Satellite historisieren
-        cur.execute("""
-            UPDATE s_project_details
-            SET t_to = NOW()
-            WHERE hk_project::text = %s AND t_to IS NULL
-        """, (hk_project,))
-        
-        # Neues Satellite
-        cur.execute("""
-            INSERT INTO s_project_details (
-                hk_project, t_from, b_from, rec_src, project_name, description,
-                customer_id, start_date, end_date, budget_days
-            ) VALUES (
-                %s, NOW(), CURRENT_DATE, 'API', %s, %s,
-                %s, %s, %s, %s
-            )
-        """, (
-            hk_project,
-            data["project_name"],
-            none_if_empty(data.get("description")),
-            data["customer_id"],
-            start_date,
-            end_date,
-            budget_days  # Hier wird NULL übergeben, wenn es leer ist
-        ))
+        # Alte Version historisieren und neue anlegen (eine Anweisung, entfällt bei unveränderten Werten)
+        created = write_versions(cur, 's_project_details', [{
+            'hk_project': hk_project,
+            'project_name': data["project_name"],
+            'description': none_if_empty(data.get("description")),
+            'customer_id': data["customer_id"],
+            'start_date': start_date,
+            'end_date': end_date,
+            'budget_days': budget_days  # NULL, wenn leer
+        }])
         
+        if created:
+            refresh_project_pit(cur, hk_project)
         conn.commit()
+        catalog.bump()
         cur.close()
-        conn.close()
         
         return jsonify({
             "success": True,
-            "message": "Projekt erfolgreich aktualisiert"
+            "message": "Projekt erfolgreich aktualisiert",
+            "versionCreated": bool(created)
         })
         
     except Exception as e:
@@ -278,13 +283,14 @@ def delete_project(hk_project):
         # Auch alle Satellite-Einträge historisieren
         cur.execute("""
             UPDATE s_project_details
-            SET t_to = NOW()
+            SET t_to = NOW(), b_to = CURRENT_DATE
             WHERE hk_project::text = %s AND t_to IS NULL
         """, (hk_project,))
         
+        refresh_project_pit(cur, hk_project)
         conn.commit()
+        catalog.bump()
         cur.close()
-        conn.close()
         
         return jsonify({
             "success": True,
@@ -316,6 +322,7 @@ def delete_customer(hk_customer):
         # Wenn keine Projekte verknüpft sind, kann gelöscht werden
         cur.execute("DELETE FROM h_customer WHERE hk_customer::text = %s", (hk_customer,))
         conn.commit()
+        catalog.bump()
         return jsonify({"message": "Kunde erfolgreich gelöscht"}), 200
     except Exception as e:
         conn.rollback()
@@ -323,4 +330,3 @@ def delete_customer(hk_customer):
         return jsonify({"error": str(e)}), 500
     finally:
         cur.close()
-        conn.close()
@@ -0,0 +1,70 @@
+"""
+Erkennung von N+1-Abfragen für Entwicklung und Tests.
+
+Zählt pro Request, wie oft jede normalisierte Anweisung ausgeführt wird
+(die Zählung geschieht in metrics.observe_query). Läuft dieselbe
+Anweisung öfter als N_PLUS_ONE_THRESHOLD mal, wird je nach
+N_PLUS_ONE_MODE gewarnt (``warn``) oder eine NPlusOneError ausgelöst
+(``raise``, z.B. in Tests).
+
+Standard: im Debug- oder Testmodus der App ``warn`` mit Schwelle 10,
+sonst aus. N_PLUS_ONE_THRESHOLD=0 schaltet die Prüfung ab.
+"""
+
+import logging
+import os
+
+from flask import current_app, g, has_request_context, request
+
+logger = logging.getLogger('query_guard')
+
+
+class NPlusOneError(Exception):
+    """Eine Anweisung wurde innerhalb eines Requests zu oft ausgeführt."""
+
+
+def configure(app):
+    """Übernimmt Schwelle und Modus aus der Umgebung in die App-Konfiguration."""
+    development = app.debug or app.testing or os.getenv('FLASK_DEBUG') == '1'
+    app.config.setdefault(
+        'N_PLUS_ONE_THRESHOLD', int(os.getenv('N_PLUS_ONE_THRESHOLD', '10' if development else '0'))
+    )
+    app.config.setdefault('N_PLUS_ONE_MODE', os.getenv('N_PLUS_ONE_MODE', 'warn'))
+    app.teardown_request(_report)
+
+
+def record(normalized_sql):
+    """Zählt eine Anweisung im aktuellen Request und prüft die Schwelle."""
+    if not has_request_context():
+        return
+    threshold = current_app.config.get('N_PLUS_ONE_THRESHOLD', 0)
+    if threshold <= 0:
+        return
+    counts = g.get('query_guard_counts')
+    if counts is None:
+        counts = g.query_guard_counts = {}
+    count = counts.get(normalized_sql, 0) + 1
+    counts[normalized_sql] = count
+    if count == threshold + 1 and current_app.config.get('N_PLUS_ONE_MODE') == 'raise':
+        raise NPlusOneError(
+            f"Anweisung {count}× in {request.method} {request.path} ausgeführt "
+            f"(Schwelle {threshold}): {normalized_sql}"
+        )
+
+
+def statement_counts():
+    """Anweisungszähler des aktuellen Requests (normalisiertes SQL -> Anzahl)."""
+    return dict(g.get('query_guard_counts') or {})
+
+
+def _report(exc=None):
+    counts = g.pop('query_guard_counts', None)
+    if not counts:
+        return
+    threshold = current_app.config.get('N_PLUS_ONE_THRESHOLD', 0)
+    for sql, count in counts.items():
+        if count > threshold:
+            logger.warning(
+                "Mögliches N+1-Muster: %d× dieselbe Anweisung in %s %s: %s",
+                count, request.method, request.path, sql
+            )
@@ -0,0 +1,133 @@
+"""
+Fortschreibung der Tagessummen in r_daily_hours.
+
+Vor einer Änderung werden die Stunden der bisher gültigen Version abgezogen,
+danach die der neuen Version addiert. Beide Schritte lesen die Version über
+pit_timeentry und laufen in der Transaktion des Aufrufers (kein Commit hier).
+``db`` darf eine ``Database``-Instanz oder ein psycopg2-Cursor sein.
+
+Aufruf für einen Neuaufbau (z.B. nach dem Import von Altdaten):
+    python rollup.py rebuild               # alle Benutzer
+    python rollup.py rebuild <email>       # nur ein Benutzer
+"""
+
+import sys
+
+from pit import as_key_list
+
+HOURS_EXPRESSION = (
+    "COALESCE(EXTRACT(EPOCH FROM (s.end_time - s.start_time))/3600"
+    " - COALESCE(s.pause_minutes, 0)/60.0, 0)"
+)
+
+
+def apply_timeentry_delta(db, link_ids, sign):
+    """
+    Schreibt die aktuell gültigen Versionen der Links in r_daily_hours fort.
+
+    Args:
+        link_ids: Ein oder mehrere hk_user_project_timeentry
+        sign (int): +1 zum Addieren (nach dem Schreiben), -1 zum Abziehen (davor)
+    """
+    keys = as_key_list(link_ids)
+    if not keys:
+        return
+    db.execute(f"""
+        INSERT INTO r_daily_hours AS r (hk_user, entry_date, hk_project, work_location, hours, entry_count)
+        SELECT
+            p.hk_user,
+            s.entry_date,
+            p.hk_project,
+            COALESCE(s.work_location, ''),
+            %(sign)s * SUM({HOURS_EXPRESSION}),
+            %(sign)s * COUNT(*)
+        FROM pit_timeentry p
+        JOIN s_timeentry_details s
+            ON s.hk_user_project_timeentry = p.hk_user_project_timeentry
+           AND s.t_from = p.timeentry_details_t_from
+           AND s.entry_date = p.entry_date
+        WHERE p.hk_user_project_timeentry = ANY(%(keys)s::uuid[])
+        GROUP BY p.hk_user, s.entry_date, p.hk_project, COALESCE(s.work_location, '')
+        ON CONFLICT (hk_user, entry_date, hk_project, work_location) DO UPDATE SET
+            hours = r.hours + EXCLUDED.hours,
+            entry_count = r.entry_count + EXCLUDED.entry_count
+    """, {'keys': keys, 'sign': sign})
+
+
+def _insert_from_pit(db, condition, params):
+    db.execute(f"""
+        INSERT INTO r_daily_hours (hk_user, entry_date, hk_project, work_location, hours, entry_count)
+        SELECT
+            p.hk_user,
+            s.entry_date,
+            p.hk_project,
+            COALESCE(s.work_location, ''),
+            SUM({HOURS_EXPRESSION}),
+            COUNT(*)
+        FROM pit_timeentry p
+        JOIN s_timeentry_details s
+            ON s.hk_user_project_timeentry = p.hk_user_project_timeentry
+           AND s.t_from = p.timeentry_details_t_from
+           AND s.entry_date = p.entry_date
+        {condition}
+        GROUP BY p.hk_user, s.entry_date, p.hk_project, COALESCE(s.work_location, '')
+    """, params)
+
+
+def rebuild(db, hk_user=None):
+    """Berechnet r_daily_hours komplett (oder für einen Benutzer) aus pit_timeentry neu."""
+    user_filter = "WHERE p.hk_user = %(hk_user)s" if hk_user else ""
+    params = {'hk_user': str(hk_user) if hk_user else None}
+    db.execute(
+        "DELETE FROM r_daily_hours" + (" WHERE hk_user = %(hk_user)s" if hk_user else ""),
+        params
+    )
+    _insert_from_pit(db, user_filter, params)
+
+
+def rebuild_days(db, days):
+    """
+    Berechnet einzelne Tage neu aus pit_timeentry, wenn unklar ist, ob eine
+    Version bereits in r_daily_hours steckt (z.B. bei der Konsistenzreparatur).
+
+    Args:
+        days: Paare (hk_user, entry_date)
+    """
+    days = list(days)
+    if not days:
+        return
+    params = {'users': [str(user) for user, _day in days], 'dates': [day for _user, day in days]}
+    db.execute("""
+        DELETE FROM r_daily_hours r
+        USING unnest(%(users)s::uuid[], %(dates)s::date[]) AS t(hk_user, entry_date)
+        WHERE r.hk_user = t.hk_user AND r.entry_date = t.entry_date
+    """, params)
+    _insert_from_pit(db, """
+        WHERE (p.hk_user, s.entry_date) IN (
+            SELECT * FROM unnest(%(users)s::uuid[], %(dates)s::date[])
+        )""", params)
+
+
+if __name__ == '__main__':
+    from database import Database
+
+    if not sys.argv[1:] or sys.argv[1] != 'rebuild' or len(sys.argv) > 3:
+        print("Aufruf: python rollup.py rebuild [<email>]")
+        sys.exit(2)
+    db = Database()
+    try:
+        hk_user = None
+        if len(sys.argv) == 3:
+            user = db.fetch_one("SELECT hk_user FROM h_user WHERE user_id = %s", (sys.argv[2],))
+            if not user:
+                print(f"Benutzer {sys.argv[2]} nicht gefunden")
+                sys.exit(1)
+            hk_user = user[0]
+        rebuild(db, hk_user)
+        db.commit()
+        print("Tagessummen neu aufgebaut")
+    except Exception:
+        db.rollback()
+        raise
+    finally:
+        db.close()
@@ -0,0 +1,179 @@
+"""
+Schreiben neuer Satellitenversionen.
+
+write_versions() historisiert die offene Version und legt die neue mit
+einer einzigen Anweisung an (schreibende CTE):
+
+    WITH eingabe AS (VALUES ...),
+         jetzt AS (SELECT clock_timestamp()),
+         offen AS (SELECT ... FROM <sat> WHERE offen),
+         neu AS (eingabe, ergänzt um fehlende Attribute aus offen),
+         geaendert AS (neu, deren hash_diff von offen abweicht),
+         alt AS (UPDATE <sat> SET t_to = jetzt, b_to = ... FROM geaendert)
+    INSERT INTO <sat> SELECT ..., jetzt FROM geaendert
+
+Es können beliebig viele Schlüssel auf einmal geschrieben werden. Attribute,
+die in den Zeilen fehlen, werden aus der bisher offenen Version übernommen
+(z.B. bleibt is_admin bei einer Profiländerung erhalten). Stimmt der
+HASHDIFF der neuen Werte mit der offenen Version überein, bleibt der
+Satellit unverändert. Die Spalte hash_diff pflegt ein Trigger
+(Migration 0007); hash_diff_sql() bildet den Vergleichswert identisch. Wie pit.py
+committet das Modul nicht selbst; ``db`` darf eine ``Database``-Instanz
+oder ein psycopg2-Cursor sein.
+"""
+
+import uuid
+
+from psycopg2.extras import execute_values
+
+
+class Satellite:
+    """Beschreibung eines Satelliten: Tabelle, Schlüsselspalte und Attribute mit SQL-Typ."""
+
+    def __init__(self, table, key, attributes):
+        self.table = table
+        self.key = key
+        self.attributes = attributes
+
+
+SATELLITES = {
+    sat.table: sat for sat in (
+        Satellite('s_user_details', 'hk_user', {
+            'first_name': 'varchar', 'last_name': 'varchar', 'position': 'varchar',
+            'core_hours': 'varchar', 'telefon': 'varchar', 'is_admin': 'boolean',
+        }),
+        Satellite('s_user_login', 'hk_user', {'password_hash': 'varchar'}),
+        Satellite('s_user_current_project', 'hk_user', {'hk_project': 'uuid'}),
+        Satellite('s_project_details', 'hk_project', {
+            'project_name': 'varchar', 'description': 'text', 'customer_id': 'uuid',
+            'start_date': 'date', 'end_date': 'date', 'budget_days': 'integer',
+        }),
+        Satellite('s_customer_details', 'hk_customer', {'address': 'varchar', 'contact_person': 'varchar'}),
+        Satellite('s_timeentry_details', 'hk_user_project_timeentry', {
+            'entry_date': 'date', 'start_time': 'time', 'end_time': 'time', 'pause_minutes': 'integer',
+            'work_location': 'varchar', 'description': 'text',
+        }),
+    )
+}
+
+
+def _cursor(db):
+    return getattr(db, 'cur', db)
+
+
+def _as_uuid(value):
+    if value is None:
+        return None
+    if isinstance(value, bytes):
+        return str(uuid.UUID(bytes=value))
+    return str(value)
+
+
+def hash_diff_sql(sat, alias):
+    """
+    SQL-Ausdruck für den HASHDIFF einer Zeile ``alias`` mit Schlüssel, rec_src
+    und den Attributen des Satelliten – entspricht dem Trigger sat_hash_diff().
+    """
+    return f"md5((to_jsonb({alias}) - ARRAY['{sat.key}', 'rec_src'])::text)"
+
+
+def write_versions(db, table, rows, rec_src='API'):
+    """
+    Schließt die offenen Versionen der übergebenen Schlüssel und legt neue an,
+    sofern sich die Attribute gegenüber der offenen Version geändert haben.
+
+    t_to der alten und t_from der neuen Version sind derselbe Zeitpunkt
+    (clock_timestamp(), nicht der Transaktionsbeginn). Derselbe Schlüssel
+    kann daher in einer Transaktion mehrfach versioniert werden.
+
+    Args:
+        db: Database-Instanz oder Cursor (Transaktion des Aufrufers)
+        table (str): Satellitentabelle, z.B. ``'s_user_details'``
+        rows (list[dict]): Je Schlüssel ein dict mit der Schlüsselspalte und
+            den neuen Attributwerten; alle Zeilen müssen dieselben Attribute
+            enthalten. Fehlende Attribute werden aus der offenen Version übernommen.
+        rec_src (str): Quelle des Datensatzes
+
+    Returns:
+        list[str]: Schlüssel, für die eine neue Version angelegt wurde;
+        Schlüssel ohne geänderte Attribute fehlen
+    """
+    sat = SATELLITES[table]
+    if not rows:
+        return []
+    columns = [c for c in sat.attributes if c in rows[0]]
+    unknown = set(rows[0]) - set(columns) - {sat.key}
+    if unknown:
+        raise ValueError(f"Unbekannte Attribute für {table}: {', '.join(sorted(unknown))}")
+
+    # Pro Schlüssel nur eine neue Version (der letzte Wert gewinnt)
+    by_key = {}
+    for row in rows:
+        if set(row) != set(rows[0]):
+            raise ValueError(f"Alle Zeilen für {table} müssen dieselben Attribute enthalten")
+        values = [row[c] for c in columns]
+        values = [_as_uuid(v) if sat.attributes[c] == 'uuid' else v for c, v in zip(columns, values)]
+        by_key[_as_uuid(row[sat.key])] = values
+
+    template = '(' + ', '.join(
+        ['%s::uuid', '%s::varchar'] + [f'%s::{sat.attributes[c]}' for c in columns]
+    ) + ')'
+    all_columns = list(sat.attributes)
+    merged_columns = [f'e.{c}' if c in columns else f'o.{c}' for c in all_columns]
+    query = f"""
+        WITH eingabe ({sat.key}, rec_src{''.join(', ' + c for c in columns)}) AS (
+            VALUES %s
+        ), jetzt AS (
+            SELECT clock_timestamp() AS ts
+        ), offen AS (
+            SELECT DISTINCT ON (s.{sat.key}) s.*
+            FROM {table} s
+            JOIN eingabe e ON e.{sat.key} = s.{sat.key}
+            WHERE s.t_to IS NULL
+            ORDER BY s.{sat.key}, s.t_from DESC
+        ), neu AS (
+            SELECT e.{sat.key}, e.rec_src, {', '.join(f'{m} AS {c}' for m, c in zip(merged_columns, all_columns))}
+            FROM eingabe e
+            LEFT JOIN offen o ON o.{sat.key} = e.{sat.key}
+        ), geaendert AS (
+            SELECT neu.*
+            FROM neu
+            LEFT JOIN offen o ON o.{sat.key} = neu.{sat.key}
+            WHERE o.{sat.key} IS NULL OR o.hash_diff IS DISTINCT FROM {hash_diff_sql(sat, 'neu')}
+        ), alt AS (
+            UPDATE {table} s
+            SET t_to = jetzt.ts, b_to = CURRENT_DATE
+            FROM geaendert, jetzt
+            WHERE s.{sat.key} = geaendert.{sat.key} AND s.t_to IS NULL
+        )
+        INSERT INTO {table} ({sat.key}, t_from, b_from, rec_src, {', '.join(all_columns)})
+        SELECT {sat.key}, jetzt.ts, CURRENT_DATE, rec_src, {', '.join(all_columns)}
+        FROM geaendert, jetzt
+        RETURNING {sat.key}::text
+    """
+    values = [[key, rec_src] + attrs for key, attrs in by_key.items()]
+    result = execute_values(_cursor(db), query, values, template=template, page_size=len(values), fetch=True)
+    return [row[0] for row in result]
+
+
+def close_versions(db, table, keys):
+    """
+    Schließt die offenen Versionen der Schlüssel, ohne neue anzulegen (z.B. beim Löschen).
+    Wie write_versions() mit clock_timestamp(), damit t_to nicht vor dem
+    t_from einer in derselben Transaktion angelegten Version liegt.
+
+    Returns:
+        list[str]: Schlüssel, deren offene Version geschlossen wurde
+    """
+    sat = SATELLITES[table]
+    keys = [_as_uuid(k) for k in (keys if isinstance(keys, (list, tuple, set)) else [keys]) if k is not None]
+    if not keys:
+        return []
+    cur = _cursor(db)
+    cur.execute(f"""
+        UPDATE {table}
+        SET t_to = clock_timestamp(), b_to = CURRENT_DATE
+        WHERE {sat.key} = ANY(%s::uuid[]) AND t_to IS NULL
+        RETURNING {sat.key}::text
+    """, (keys,))
+    return [row[0] for row in cur.fetchall()]
@@ -0,0 +1,82 @@
+"""
+Streaming-Antworten für große Ergebnismengen.
+Die Zeilen kommen aus ``Database.stream`` (serverseitiger Cursor) und werden
+stückweise als JSON-Array oder CSV serialisiert, statt erst eine komplette
+Liste im Speicher aufzubauen.
+"""
+
+import csv
+import io
+import json
+
+from flask import Response, stream_with_context
+
+# Ausgabe in Blöcken von ca. 64 KB statt einer Schreiboperation pro Zeile
+CHUNK_SIZE = 64 * 1024
+
+
+def _json_chunks(rows, serialize):
+    buffer = ['[']
+    size = 1
+    first = True
+    for row in rows:
+        item = json.dumps(serialize(row), ensure_ascii=False, default=str)
+        if not first:
+            item = ',' + item
+        first = False
+        buffer.append(item)
+        size += len(item)
+        if size >= CHUNK_SIZE:
+            yield ''.join(buffer)
+            buffer = []
+            size = 0
+    buffer.append(']')
+    yield ''.join(buffer)
+
+
+def _csv_chunks(rows, serialize, columns):
+    out = io.StringIO()
+    writer = csv.DictWriter(out, fieldnames=columns, extrasaction='ignore', delimiter=';')
+    writer.writeheader()
+    for row in rows:
+        writer.writerow(serialize(row))
+        if out.tell() >= CHUNK_SIZE:
+            yield out.getvalue()
+            out.seek(0)
+            out.truncate()
+    yield out.getvalue()
+
+
+def stream_json(rows, serialize):
+    """
+    Streamt Zeilen als JSON-Array.
+
+    Args:
+        rows: Iterator über Datenbankzeilen (z.B. aus Database.stream)
+        serialize: Funktion, die eine Zeile in ein dict umwandelt
+    """
+    return Response(stream_with_context(_json_chunks(rows, serialize)), mimetype='application/json')
+
+
+def stream_csv(rows, serialize, columns, filename='export.csv'):
+    """
+    Streamt Zeilen als CSV (Semikolon-getrennt, passend für Excel mit deutschem Gebietsschema).
+
+    Args:
+        rows: Iterator über Datenbankzeilen
+        serialize: Funktion, die eine Zeile in ein dict umwandelt
+        columns (list): Spaltenreihenfolge, entspricht den Schlüsseln von serialize
+        filename (str): Dateiname für den Download
+    """
+    return Response(
+        stream_with_context(_csv_chunks(rows, serialize, columns)),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename="{filename}"'}
+    )
+
+
+def stream_rows(rows, serialize, fmt='json', columns=None, filename='export.csv'):
+    """Streamt als JSON oder – bei ``fmt == 'csv'`` – als CSV."""
+    if fmt == 'csv':
+        return stream_csv(rows, serialize, columns, filename)
+    return stream_json(rows, serialize)
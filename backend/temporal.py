@@ -0,0 +1,90 @@
+"""
+Abfragen zu einem früheren Zeitpunkt (bitemporal).
+
+Jede Satellitenversion trägt zwei Gültigkeitszeiträume:
+  * Transaktionszeit t_from/t_to – wann die Version in der Datenbank galt
+  * fachliche Gültigkeit b_from/b_to – für welche Tage die Version galt
+
+Die Lese-Endpunkte für Zeiteinträge, Projekte, Kunden und Benutzer nehmen
+dafür die Query-Parameter ``as_of`` (Zeitpunkt, ISO 8601) und ``valid_at``
+(Datum) an. Ohne beide Parameter wird wie bisher die offene Version gelesen.
+Mit einem der Parameter wird über die Views <satellit>_history gelesen,
+sodass auch archivierte Versionen (archive.py) berücksichtigt sind.
+
+Die Bedingungen lauten ``tsrange(t_from, t_to) @> as_of`` und
+``daterange(b_from, b_to) @> valid_at``; beide Ausdrücke sind jeweils für
+sich per GiST indiziert (Migration 0011, ohne btree_gist also ohne den
+Schlüssel). Einzelne Schlüssel findet der Primärschlüssel (<schlüssel>,
+t_from), die Bereichsindizes tragen die Listen. Zeitpunkte mit
+Zeitzone werden nach UTC umgerechnet, da die Datenbank t_from/t_to ohne
+Zeitzone in UTC speichert.
+"""
+
+from datetime import date, datetime, timezone
+
+
+class TemporalQuery:
+    """Zeitpunkt einer Abfrage; ohne as_of und valid_at gilt der aktuelle Stand."""
+
+    def __init__(self, as_of=None, valid_at=None):
+        self.as_of = as_of
+        self.valid_at = valid_at
+
+    @property
+    def active(self):
+        return self.as_of is not None or self.valid_at is not None
+
+    def source(self, table):
+        """Tabelle bzw. History-View, aus der die Versionen gelesen werden."""
+        return f'{table}_history' if self.active else table
+
+    def condition(self, alias):
+        """SQL-Bedingung für die zum Zeitpunkt gültige Version (benannte Parameter)."""
+        if not self.active:
+            return f'{alias}.t_to IS NULL'
+        conditions = []
+        if self.as_of is not None:
+            conditions.append(f'tsrange({alias}.t_from, {alias}.t_to) @> %(as_of)s::timestamp')
+        if self.valid_at is not None:
+            conditions.append(f'daterange({alias}.b_from, {alias}.b_to) @> %(valid_at)s::date')
+        return ' AND '.join(conditions)
+
+    def link_condition(self, alias):
+        """
+        Bedingung für Links (nur Transaktionszeit). Ohne as_of entscheidet bei
+        einer historischen Abfrage allein die Satellitenversion.
+        """
+        if self.as_of is None:
+            return f'{alias}.t_to IS NULL' if not self.active else 'TRUE'
+        return f'tsrange({alias}.t_from, {alias}.t_to) @> %(as_of)s::timestamp'
+
+    def params(self):
+        return {'as_of': self.as_of, 'valid_at': self.valid_at}
+
+
+def parse_timestamp(value):
+    """ISO-Zeitpunkt oder Datum (Tagesbeginn); mit Zeitzone nach UTC umgerechnet."""
+    if len(value) == 10:
+        return datetime.combine(date.fromisoformat(value), datetime.min.time())
+    parsed = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def parse_temporal_args(args):
+    """
+    Liest ``as_of`` und ``valid_at`` aus den Query-Parametern.
+
+    Raises:
+        ValueError: Bei ungültigen Zeitangaben
+    """
+    as_of = args.get('as_of')
+    valid_at = args.get('valid_at')
+    try:
+        return TemporalQuery(
+            as_of=parse_timestamp(as_of) if as_of else None,
+            valid_at=date.fromisoformat(valid_at) if valid_at else None,
+        )
+    except ValueError:
+        raise ValueError("as_of muss ein ISO-Zeitpunkt und valid_at ein Datum (YYYY-MM-DD) sein")
@@ -0,0 +1,187 @@
+"""
+Lokaler Ersatz für einen Redis-Server in Tests (RESP2 über TCP).
+
+Unterstützt nur die Befehle, die cache.RedisBackend verwendet: GET, SET mit
+PX, DEL, SCAN mit MATCH und COUNT, PING, AUTH und SELECT. Ablaufzeiten
+gelten wie bei Redis auf Millisekunden genau. Über ``fail`` lässt sich für
+einzelne Befehle eine Fehlerantwort erzwingen, z.B. ``server.fail['SET'] =
+'OOM command not allowed'``.
+
+    server = FakeRedis()
+    server.start()
+    ...
+    server.stop()
+"""
+
+import re
+import socket
+import socketserver
+import threading
+import time
+import zlib
+
+
+def _bulk(value):
+    if value is None:
+        return b'$-1\r\n'
+    return b'$%d\r\n%s\r\n' % (len(value), value)
+
+
+def _array(items):
+    return b'*%d\r\n' % len(items) + b''.join(items)
+
+
+def glob_to_regex(pattern):
+    """Redis-Glob (``*``, ``?``, ``[...]``, Escapes mit ``\\``) als regulärer Ausdruck."""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        char = pattern[i]
+        if char == '\\' and i + 1 < len(pattern):
+            i += 1
+            parts.append(re.escape(pattern[i]))
+        elif char == '*':
+            parts.append('.*')
+        elif char == '?':
+            parts.append('.')
+        elif char == '[':
+            end = pattern.find(']', i + 1)
+            if end < 0:
+                parts.append(re.escape(char))
+            else:
+                parts.append('[' + pattern[i + 1:end].replace('\\', '\\\\') + ']')
+                i = end
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return re.compile(''.join(parts) + r'\Z', re.S)
+
+
+class _Handler(socketserver.StreamRequestHandler):
+
+    def setup(self):
+        super().setup()
+        self.server.fake.connections.add(self.connection)
+
+    def finish(self):
+        self.server.fake.connections.discard(self.connection)
+        super().finish()
+
+    def handle(self):
+        while True:
+            args = self._read_command()
+            if args is None:
+                return
+            self.wfile.write(self.server.fake.execute(args))
+
+    def _read_command(self):
+        line = self.rfile.readline()
+        if not line:
+            return None
+        args = []
+        for _ in range(int(line[1:-2])):
+            length = int(self.rfile.readline()[1:-2])
+            args.append(self.rfile.read(length + 2)[:-2])
+        return args
+
+
+class _Server(socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+class FakeRedis:
+    """Ein Server auf 127.0.0.1 mit eigenem Bestand; Port 0 wählt einen freien Port."""
+
+    def __init__(self, port=0, password=None):
+        self.password = password
+        self.fail = {}  # Befehl -> Fehlermeldung
+        self.commands = []  # alle empfangenen Befehle (Name als str)
+        self.connections = set()
+        self._store = {}  # Schlüssel -> (Wert, Ablaufzeitpunkt oder None)
+        self._lock = threading.Lock()
+        self._server = _Server(('127.0.0.1', port), _Handler)
+        self._server.fake = self
+        self.port = self._server.server_address[1]
+
+    @property
+    def url(self):
+        auth = f':{self.password}@' if self.password else ''
+        return f'redis://{auth}127.0.0.1:{self.port}/0'
+
+    def start(self):
+        threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True).start()
+        return self
+
+    def stop(self):
+        """Beendet den Server samt offener Verbindungen wie ein Neustart von Redis."""
+        self._server.shutdown()
+        self._server.server_close()
+        for connection in list(self.connections):
+            try:
+                connection.shutdown(socket.SHUT_RDWR)
+            except OSError:
+                pass
+
+    def keys(self):
+        with self._lock:
+            self._expire()
+            return sorted(key.decode('utf-8') for key in self._store)
+
+    def _expire(self):
+        now = time.monotonic()
+        for key in [k for k, (_v, expires) in self._store.items() if expires is not None and expires <= now]:
+            del self._store[key]
+
+    def execute(self, args):
+        name = args[0].decode('ascii').upper()
+        self.commands.append(name)
+        if name in self.fail:
+            return b'-ERR %s\r\n' % self.fail[name].encode('utf-8')
+        with self._lock:
+            self._expire()
+            handler = getattr(self, f'_cmd_{name.lower()}', None)
+            if handler is None:
+                return b"-ERR unknown command '%s'\r\n" % name.encode('ascii')
+            return handler(args[1:])
+
+    def _cmd_ping(self, args):
+        return b'+PONG\r\n'
+
+    def _cmd_auth(self, args):
+        if args[-1].decode('utf-8') != self.password:
+            return b'-WRONGPASS invalid username-password pair\r\n'
+        return b'+OK\r\n'
+
+    def _cmd_select(self, args):
+        return b'+OK\r\n'
+
+    def _cmd_get(self, args):
+        entry = self._store.get(args[0])
+        return _bulk(entry[0] if entry else None)
+
+    def _cmd_set(self, args):
+        key, value, options = args[0], args[1], [a.decode('ascii').upper() for a in args[2:]]
+        expires = None
+        if 'PX' in options:
+            expires = time.monotonic() + int(options[options.index('PX') + 1]) / 1000
+        self._store[key] = (value, expires)
+        return b'+OK\r\n'
+
+    def _cmd_del(self, args):
+        return b':%d\r\n' % sum(self._store.pop(key, None) is not None for key in args)
+
+    def _cmd_scan(self, args):
+        cursor = int(args[0])
+        options = {args[i].decode('ascii').upper(): args[i + 1] for i in range(1, len(args) - 1, 2)}
+        count = int(options.get('COUNT', b'10'))
+        pattern = glob_to_regex(options.get('MATCH', b'*').decode('utf-8'))
+        # Wie Redis: je Aufruf höchstens COUNT Schlüssel prüfen, Treffer können
+        # weniger sein. Der Cursor ist eine Position in der Hash-Reihenfolge,
+        # damit Löschungen zwischen zwei Aufrufen keine Schlüssel überspringen.
+        keys = sorted((zlib.crc32(key) + 1, key) for key in self._store)
+        remaining = [key for position, key in keys if position >= max(cursor, 1)]
+        page = remaining[:count]
+        following = zlib.crc32(remaining[count]) + 1 if len(remaining) > count else 0
+        found = [_bulk(key) for key in page if pattern.match(key.decode('utf-8'))]
+        return _array([_bulk(str(following).encode('ascii')), _array(found)])
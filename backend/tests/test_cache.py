@@ -0,0 +1,194 @@
+"""Tests für cache.py mit beiden Backends; Redis über den lokalen Ersatz in fake_redis.py."""
+
+import socket
+import time
+
+import pytest
+
+import cache
+from cache import CacheError, MemoryBackend, Namespace, RedisBackend
+from fake_redis import FakeRedis
+
+
+@pytest.fixture
+def server():
+    fake = FakeRedis().start()
+    yield fake
+    fake.stop()
+
+
+@pytest.fixture(params=['memory', 'redis'])
+def backend(request, monkeypatch):
+    """Beide Backends als das von cache.backend() gelieferte."""
+    if request.param == 'memory':
+        instance = MemoryBackend(max_bytes=1024 * 1024)
+    else:
+        fake = request.getfixturevalue('server')
+        instance = RedisBackend(fake.url, timeout=1.0, retry_delay=60)
+    monkeypatch.setattr(cache, '_backend', instance)
+    return instance
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def test_set_get_delete(backend):
+    backend.set('a', b'1', ttl=60)
+    assert backend.get('a') == b'1'
+    assert backend.get('b') is None
+    backend.delete(['a', 'b'])
+    assert backend.get('a') is None
+
+
+def test_ttl_expires(backend):
+    backend.set('kurz', b'x', ttl=0.05)
+    backend.set('lang', b'y', ttl=60)
+    time.sleep(0.1)
+    assert backend.get('kurz') is None
+    assert backend.get('lang') == b'y'
+
+
+def test_clear_removes_only_own_namespace(backend):
+    catalog = Namespace('catalog', 60)
+    reports = Namespace('reports', 60)
+    for i in range(1200):  # mehr als ein SCAN-Durchlauf (COUNT 500)
+        catalog.set(f'k{i}', b'c')
+    reports.set('k1', b'r')
+    catalog.clear()
+    assert catalog.get('k1') is None
+    assert catalog.get('k1199') is None
+    assert reports.get('k1') == b'r'
+
+
+def test_clear_escapes_glob_characters(backend):
+    odd = Namespace('a*[b]?', 60)
+    other = Namespace('a-x', 60)
+    odd.set('k', b'1')
+    other.set('k', b'2')
+    odd.clear()
+    assert odd.get('k') is None
+    assert other.get('k') == b'2'
+
+
+def test_namespace_counts_hits_and_misses(backend):
+    ns = Namespace('dashboard', 60)
+    ns.get('fehlt')
+    ns.set('da', b'1')
+    ns.get('da')
+    assert ns.stats() == {'hits': 1, 'misses': 1, 'sets': 1}
+
+
+def test_memory_lru_evicts_oldest_by_bytes():
+    backend = MemoryBackend(max_bytes=30)
+    backend.set('a', b'x' * 9, ttl=60)  # je 10 Bytes samt Schlüssel
+    backend.set('b', b'x' * 9, ttl=60)
+    backend.set('c', b'x' * 9, ttl=60)
+    backend.get('a')  # a ist jetzt der jüngste Zugriff
+    backend.set('d', b'x' * 9, ttl=60)
+    assert backend.get('b') is None
+    assert backend.get('a') is not None and backend.get('c') is not None and backend.get('d') is not None
+    assert backend.stats() == {'bytes': 30, 'entries': 3, 'evictions': 1}
+
+
+def test_memory_replacing_entry_updates_size():
+    backend = MemoryBackend(max_bytes=100)
+    backend.set('a', b'x' * 50, ttl=60)
+    backend.set('a', b'x' * 10, ttl=60)
+    assert backend.stats()['bytes'] == 11
+
+
+def test_memory_skips_entries_larger_than_limit():
+    backend = MemoryBackend(max_bytes=20)
+    backend.set('a', b'x' * 9, ttl=60)
+    backend.set('gross', b'x' * 50, ttl=60)
+    assert backend.get('gross') is None
+    assert backend.get('a') == b'x' * 9
+    assert backend.stats()['evictions'] == 0
+
+
+def test_memory_expired_entry_frees_bytes(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(cache.time, 'monotonic', lambda: now[0])
+    backend = MemoryBackend(max_bytes=100)
+    backend.set('a', b'x' * 9, ttl=5)
+    now[0] += 5
+    assert backend.get('a') is None
+    assert backend.stats()['bytes'] == 0
+
+
+def test_redis_error_reply_keeps_connection(server):
+    backend = RedisBackend(server.url, timeout=1.0, retry_delay=60)
+    backend.set('a', b'1', ttl=60)
+    server.fail['SET'] = 'OOM command not allowed when used memory > maxmemory'
+    with pytest.raises(CacheError, match='OOM'):
+        backend.set('b', b'2', ttl=60)
+    # Eine Fehlerantwort deaktiviert den Cache nicht
+    assert backend.get('a') == b'1'
+    assert backend.errors == 0
+
+
+def test_redis_error_reply_is_miss_in_namespace(server, monkeypatch):
+    monkeypatch.setattr(cache, '_backend', RedisBackend(server.url, timeout=1.0, retry_delay=60))
+    ns = Namespace('identity', 60)
+    server.fail['GET'] = 'LOADING Redis is loading the dataset in memory'
+    assert ns.get('a') is None
+    assert ns.stats()['misses'] == 1
+
+
+def test_redis_auth_and_select(server):
+    server.password = 'geheim'
+    backend = RedisBackend(f'redis://:geheim@127.0.0.1:{server.port}/2', timeout=1.0)
+    backend.set('a', b'1', ttl=60)
+    assert server.commands[:3] == ['AUTH', 'SELECT', 'SET']
+
+
+def test_redis_unreachable_server_acts_as_empty_cache(monkeypatch, capsys):
+    backend = RedisBackend(f'redis://127.0.0.1:{free_port()}/0', timeout=0.2, retry_delay=60)
+    monkeypatch.setattr(cache, '_backend', backend)
+    ns = Namespace('catalog', 60)
+    assert ns.get('a') is None
+    ns.set('a', b'1')
+    ns.delete('a')
+    ns.clear()
+    # Nur der erste Versuch baut eine Verbindung auf, danach ist der Cache für retry_delay aus
+    assert backend.errors == 1
+    assert ns.stats() == {'hits': 0, 'misses': 1, 'sets': 0}
+    assert 'nicht erreichbar' in capsys.readouterr().out
+
+
+def test_redis_reconnects_after_retry_delay(server):
+    port = server.port
+    server.stop()
+    backend = RedisBackend(f'redis://127.0.0.1:{port}/0', timeout=0.2, retry_delay=0.1)
+    with pytest.raises(CacheError):
+        backend.get('a')
+    replacement = FakeRedis(port=port).start()
+    try:
+        with pytest.raises(CacheError, match='deaktiviert'):
+            backend.get('a')
+        time.sleep(0.15)
+        backend.set('a', b'1', ttl=60)
+        assert backend.get('a') == b'1'
+    finally:
+        replacement.stop()
+
+
+def test_redis_server_restart_drops_pooled_connection(server):
+    backend = RedisBackend(server.url, timeout=0.5, retry_delay=0.05)
+    backend.set('a', b'1', ttl=60)
+    port = server.port
+    server.stop()
+    replacement = FakeRedis(port=port).start()
+    try:
+        # Die gemerkte Verbindung ist tot: ein Fehler, danach eine neue Verbindung
+        with pytest.raises(CacheError):
+            backend.get('a')
+        time.sleep(0.1)
+        assert backend.get('a') is None
+        backend.set('a', b'2', ttl=60)
+        assert backend.get('a') == b'2'
+    finally:
+        replacement.stop()
@@ -4,10 +4,25 @@ Implementiert die Verwaltung von Zeiteinträgen und die Zeitmatrix-Funktionalit
 """
 
 from flask import Blueprint, request, jsonify
-from datetime import datetime
+from datetime import date, datetime, timedelta
+import base64
+import csv
+import io
+import json
 import logging
+import os
+import time
 from flask_jwt_extended import jwt_required, get_jwt_identity
+from psycopg2.extras import execute_values
+from catalog import catalog_response
+from dashboard import invalidate_summary
 from database import Database
+from identity import current_hk_user, current_is_admin
+from pit import refresh_timeentry_pit
+from rollup import apply_timeentry_delta
+from satellite import close_versions, write_versions
+from streaming import stream_rows
+from temporal import parse_temporal_args
 import uuid
 
 logging.basicConfig(level=logging.INFO)
@@ -65,128 +80,241 @@ def validate_time_entry(entry):
 
     return len(errors) == 0, errors
 
+MAX_PAGE_SIZE = 500
+
+def encode_cursor(entry_date, start_time, entry_id):
+    """Kodiert die Sortierschlüssel des letzten Eintrags einer Seite als Cursor."""
+    raw = json.dumps([entry_date.isoformat(), start_time.strftime('%H:%M:%S'), entry_id])
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+def decode_cursor(cursor):
+    """
+    Dekodiert einen Cursor aus encode_cursor.
+
+    Raises:
+        ValueError: Bei einem ungültigen oder manipulierten Cursor
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        entry_date, start_time, entry_id = json.loads(base64.urlsafe_b64decode(padded))
+        return (
+            datetime.strptime(entry_date, '%Y-%m-%d').date(),
+            datetime.strptime(start_time, '%H:%M:%S').time(),
+            str(entry_id)
+        )
+    except Exception:
+        raise ValueError("Ungültiger Cursor")
+
+def parse_date_range(args):
+    """
+    Liest den Zeitraum aus den Query-Parametern ``from``/``to`` (YYYY-MM-DD,
+    beide inklusive). ``year``/``month`` werden weiterhin unterstützt und in
+    denselben Zeitraum umgerechnet.
+
+    Returns:
+        tuple: (von, bis_exklusiv) als date oder None
+
+    Raises:
+        ValueError: Bei ungültigen Datumsangaben
+    """
+    date_from = args.get('from')
+    date_to = args.get('to')
+    year = args.get('year')
+    month = args.get('month')
+
+    if year and month and not (date_from or date_to):
+        first = date(int(year), int(month), 1)
+        next_month = date(first.year + (first.month == 12), first.month % 12 + 1, 1)
+        return first, next_month
+
+    start = datetime.strptime(date_from, '%Y-%m-%d').date() if date_from else None
+    end = datetime.strptime(date_to, '%Y-%m-%d').date() + timedelta(days=1) if date_to else None
+    return start, end
+
+def entries_error(message, status, paginated):
+    """Fehlerantwort von get_entries; mit Paginierung in derselben Hülle wie die Seiten."""
+    body = {"error": message}
+    if paginated:
+        body.update(entries=[], next_cursor=None)
+    return jsonify(body), status
+
+ENTRY_EXPORT_COLUMNS = ["id", "datum", "beginn", "ende", "pause", "projekt", "arbeitsort", "beschreibung", "mitarbeiter"]
+
+def serialize_entry(entry):
+    """Wandelt eine Zeile der Zeiteintragsabfrage in das API-Format um."""
+    return {
+        "id": entry[0],
+        "datum": entry[1].strftime('%Y-%m-%d') if entry[1] else None,
+        "beginn": entry[2].strftime('%H:%M') if entry[2] else None,
+        "ende": entry[3].strftime('%H:%M') if entry[3] else None,
+        "pause": entry[4],
+        "projekt": entry[5],
+        "arbeitsort": entry[6],
+        "beschreibung": entry[7],
+        "mitarbeiter": entry[8]
+    }
+
 @time_matrix_bp.route("/api/time-entries", methods=["GET"])
 @jwt_required()
 def get_entries():
     """
-    API-Endpunkt zum Abrufen aller Zeiteinträge des angemeldeten Benutzers.
+    API-Endpunkt zum Abrufen der Zeiteinträge des angemeldeten Benutzers.
     Angepasst für das Data-Vault-Schema.
+
+    Query-Parameter:
+        from, to: Zeitraum (YYYY-MM-DD, inklusive); alternativ year und month
+        limit: Seitengröße (max. MAX_PAGE_SIZE). Mit limit oder cursor
+            antwortet der Endpunkt mit {"entries": [...], "next_cursor": ...}
+        cursor: next_cursor der vorherigen Seite
+        format: ``csv`` für einen CSV-Export (nur ohne Paginierung)
+        as_of, valid_at: Stand zu einem Zeitpunkt bzw. fachlich gültig an einem
+            Tag (siehe temporal.py); gelesen wird dann aus der Historie statt pit_timeentry
+
+    Sortiert wird nach Datum absteigend, dann Beginn und ID aufsteigend.
+    Geblättert wird per Keyset über genau diese Spalten, sodass jede Seite
+    über den Index (hk_user, entry_date DESC, start_time, timeentry_id) gelesen wird.
     """
     current_user = get_jwt_identity()
     logger.info(f"Versuche Zeiteinträge für Benutzer {current_user} zu laden")
+    paginated = 'limit' in request.args or 'cursor' in request.args
     
-    # Optional: Filter nach Jahr/Monat
-    year = request.args.get('year')
-    month = request.args.get('month')
+    try:
+        range_start, range_end = parse_date_range(request.args)
+        temporal = parse_temporal_args(request.args)
+        cursor = decode_cursor(request.args['cursor']) if request.args.get('cursor') else None
+        limit = min(int(request.args.get('limit') or MAX_PAGE_SIZE), MAX_PAGE_SIZE)
+        if limit < 1:
+            raise ValueError("limit muss mindestens 1 sein")
+    except ValueError as e:
+        return entries_error(f"Ungültige Parameter: {e}", 400, paginated)
     
     db = Database()
     try:
         # Benutzer-ID aus user_id (Email) abrufen
-        user_result = db.fetch_one("SELECT hk_user FROM h_user WHERE user_id = %s", (current_user,))
-        if not user_result:
+        user_id = current_hk_user()
+        if not user_id:
             logger.error(f"Benutzer mit user_id {current_user} nicht gefunden")
-            return jsonify({"error": "Benutzer nicht gefunden"}), 404
-            
-        user_id = user_result[0]
-        logger.info(f"Gefundene Benutzer-ID (hk_user): {user_id}")
+            return entries_error("Benutzer nicht gefunden", 404, paginated)
         
-        # Abfrage für die neuesten Zeiteinträge je nach Data-Vault-Schema
-        query = """
-            WITH latest_entries AS (
+        if temporal.active:
+            # Stand zu einem Zeitpunkt: die zum Zeitpunkt gültige Version je Link aus
+            # der Historie (Satellit und Archiv). Mit as_of zählen nur die damals
+            # offenen Links, ein Projektwechsel zeigt also das damalige Projekt.
+            query = f"""
                 SELECT 
-                    l.timeentry_id, 
-                    l.hk_user_project_timeentry,
-                    l.hk_project,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY l.hk_user_project_timeentry 
-                        ORDER BY s.t_from DESC
-                    ) as rn
+                    l.timeentry_id as id, 
+                    s.entry_date as datum, 
+                    s.start_time as beginn, 
+                    s.end_time as ende, 
+                    s.pause_minutes as pause, 
+                    hp.project_name as projekt, 
+                    s.work_location as arbeitsort, 
+                    s.description as beschreibung,
+                    CONCAT(ud.first_name, ' ', ud.last_name) as mitarbeiter,
+                    s.start_time as sort_start
                 FROM 
                     l_user_project_timeentry l
                 JOIN 
-                    s_timeentry_details s ON l.hk_user_project_timeentry = s.hk_user_project_timeentry
+                    {temporal.source('s_timeentry_details')} s ON s.hk_user_project_timeentry = l.hk_user_project_timeentry
+                        AND {temporal.condition('s')}
+                JOIN 
+                    h_project hp ON hp.hk_project = l.hk_project
+                LEFT JOIN 
+                    {temporal.source('s_user_details')} ud ON ud.hk_user = l.hk_user AND {temporal.condition('ud')}
                 WHERE 
-                    l.hk_user = %s
-                    AND (s.t_to IS NULL OR s.t_to > NOW())
-            )
-            SELECT 
-                le.timeentry_id as id, 
-                s.entry_date as datum, 
-                s.start_time as beginn, 
-                s.end_time as ende, 
-                s.pause_minutes as pause, 
-                hp.project_name as projekt, 
-                s.work_location as arbeitsort, 
-                s.description as beschreibung,
-                CONCAT(ud.first_name, ' ', ud.last_name) as mitarbeiter
-            FROM 
-                latest_entries le
-            JOIN 
-                s_timeentry_details s ON le.hk_user_project_timeentry = s.hk_user_project_timeentry
-            JOIN 
-                h_project hp ON le.hk_project = hp.hk_project
-            JOIN 
-                h_user hu ON hu.hk_user = %s
-            LEFT JOIN (
+                    l.hk_user = %(hk_user)s AND {temporal.link_condition('l')}
+            """
+            params = dict(temporal.params(), hk_user=user_id)
+            date_columns, order_columns = ['s.entry_date'], ('s.entry_date', 's.start_time', 'l.timeentry_id')
+        else:
+            # Aktuelle Zeiteinträge über die PIT-Tabelle: pit_timeentry enthält je
+            # offenem Link genau eine Zeile mit dem t_from der gültigen Satellitenversion.
+            # Alle Filter stehen auf den Spalten von pit_timeentry, damit sie den Index nutzen.
+            # s_timeentry_details ist nach entry_date partitioniert: die Join-Bedingung auf
+            # entry_date und die wiederholten Zeitraumgrenzen beschränken den Zugriff auf
+            # die betroffenen Monatspartitionen.
+            query = """
                 SELECT 
-                    hk_user, first_name, last_name,
-                    ROW_NUMBER() OVER (
-                        PARTITION BY hk_user 
-                        ORDER BY t_from DESC
-                    ) as rn
+                    p.timeentry_id as id, 
+                    s.entry_date as datum, 
+                    s.start_time as beginn, 
+                    s.end_time as ende, 
+                    s.pause_minutes as pause, 
+                    hp.project_name as projekt, 
+                    s.work_location as arbeitsort, 
+                    s.description as beschreibung,
+                    CONCAT(ud.first_name, ' ', ud.last_name) as mitarbeiter,
+                    p.start_time as sort_start
                 FROM 
-                    s_user_details
+                    pit_timeentry p
+                JOIN 
+                    s_timeentry_details s ON s.hk_user_project_timeentry = p.hk_user_project_timeentry
+                        AND s.t_from = p.timeentry_details_t_from
+                        AND s.entry_date = p.entry_date
+                JOIN 
+                    h_project hp ON hp.hk_project = p.hk_project
+                LEFT JOIN 
+                    pit_user pu ON pu.hk_user = p.hk_user
+                LEFT JOIN 
+                    s_user_details ud ON ud.hk_user = pu.hk_user AND ud.t_from = pu.user_details_t_from
                 WHERE 
-                    t_to IS NULL OR t_to > NOW()
-            ) ud ON ud.hk_user = hu.hk_user AND ud.rn = 1
-            WHERE 
-                le.rn = 1
-        """
-        params = [user_id, user_id]
-        
-        # Filter anwenden, falls vorhanden
-        if year and month:
-            query += " AND EXTRACT(YEAR FROM s.entry_date) = %s AND EXTRACT(MONTH FROM s.entry_date) = %s"
-            params.extend([year, month])
+                    p.hk_user = %(hk_user)s
+            """
+            params = {"hk_user": user_id}
+            date_columns, order_columns = ['p.entry_date', 's.entry_date'], ('p.entry_date', 'p.start_time', 'p.timeentry_id')
+        date_column, start_column, id_column = order_columns
+        
+        # Zeitraum als Bereichsbedingung auf entry_date (indexfähig)
+        if range_start:
+            query += "".join(f" AND {c} >= %(range_start)s" for c in date_columns)
+            params["range_start"] = range_start
+        if range_end:
+            query += "".join(f" AND {c} < %(range_end)s" for c in date_columns)
+            params["range_end"] = range_end
+        
+        # Keyset: alles nach dem letzten Eintrag der vorherigen Seite. Die zusätzliche
+        # Bedingung entry_date <= Cursor-Datum begrenzt den Indexbereich.
+        if cursor:
+            query += "".join(f" AND {c} <= %(cursor_date)s" for c in date_columns)
+            query += f"""
+                AND ({date_column} < %(cursor_date)s
+                     OR ({start_column}, {id_column}) > (%(cursor_time)s, %(cursor_id)s))
+            """
+            params.update(cursor_date=cursor[0], cursor_time=cursor[1], cursor_id=cursor[2])
         
-        # Sortierung hinzufügen
-        query += " ORDER BY s.entry_date DESC, s.start_time"
+        # Sortierung passend zum Index; eine Zeile mehr laden, um das Seitenende zu erkennen
+        query += f" ORDER BY {date_column} DESC, {start_column}, {id_column} LIMIT %(limit)s"
+        params["limit"] = limit + 1 if paginated else None
         
         # Query ausführen und Ergebnisse verarbeiten
         logger.info(f"Führe Abfrage aus: {query} mit Parametern {params}")
         
-        try:
-            entries = db.fetch_all(query, tuple(params))
-            
-            # Duplikatprüfung und -entfernung
-            seen_ids = set()
-            result = []
-            for entry in entries:
-                entry_id = entry[0]  # Der erste Wert ist die ID
-                if entry_id not in seen_ids:
-                    seen_ids.add(entry_id)
-                    result.append({
-                        "id": entry_id,
-                        "datum": entry[1].strftime('%Y-%m-%d') if entry[1] else None,
-                        "beginn": entry[2].strftime('%H:%M') if entry[2] else None,
-                        "ende": entry[3].strftime('%H:%M') if entry[3] else None,
-                        "pause": entry[4],
-                        "projekt": entry[5],
-                        "arbeitsort": entry[6],
-                        "beschreibung": entry[7],
-                        "mitarbeiter": entry[8]
-                    })
-                
-            logger.info(f"Gefundene eindeutige Zeiteinträge: {len(result)}")
-            return jsonify(result)
-            
-        except Exception as e:
-            logger.error(f"Fehler bei der Datenbankabfrage: {str(e)}")
-            return jsonify([])
+        # Ohne Paginierung kann die Ergebnismenge die gesamte Historie umfassen:
+        # dann über einen serverseitigen Cursor direkt in die Antwort streamen
+        if not paginated:
+            return stream_rows(
+                db.stream(query, params), serialize_entry,
+                fmt=request.args.get('format', 'json'),
+                columns=ENTRY_EXPORT_COLUMNS,
+                filename='zeiteintraege.csv'
+            )
+        
+        entries = db.fetch_all(query, params)
+        
+        next_cursor = None
+        if len(entries) > limit:
+            entries = entries[:limit]
+            last = entries[-1]
+            next_cursor = encode_cursor(last[1], last[9], last[0])
+        
+        # pit_timeentry hat je Link genau eine Zeile – keine Duplikate möglich
+        result = [serialize_entry(entry) for entry in entries]
+        logger.info(f"Gefundene Zeiteinträge: {len(result)}")
+        return jsonify({"entries": result, "next_cursor": next_cursor})
         
     except Exception as e:
-        logger.error(f"Allgemeiner Fehler beim Abrufen der Zeiteinträge: {str(e)}")
-        return jsonify([])
+        logger.error(f"Fehler beim Abrufen der Zeiteinträge: {str(e)}")
+        return entries_error(f"Serverfehler: {str(e)}", 500, paginated)
     finally:
         db.close()
 
@@ -222,13 +350,10 @@ def add_entry():
     db = Database()
     try:
         # Benutzer-ID aus user_id abrufen (Email)
-        user_result = db.fetch_one("SELECT hk_user FROM h_user WHERE user_id = %s", (current_user,))
-        if not user_result:
+        user_id = current_hk_user()
+        if not user_id:
             logger.error(f"Benutzer mit user_id {current_user} nicht gefunden")
             return jsonify({"error": "Benutzer nicht gefunden"}), 404
-            
-        user_id = user_result[0]
-        logger.info(f"Gefundene Benutzer-ID (hk_user): {user_id}")
         
         # Projekt-ID abrufen (nehmen wir das erste Projekt aus der Liste)
         if isinstance(data['projekt'], list) and len(data['projekt']) > 0:
@@ -299,7 +424,10 @@ def add_entry():
             description
         ))
         
+        refresh_timeentry_pit(db, link_id)
+        apply_timeentry_delta(db, link_id, +1)
         db.commit()
+        invalidate_summary(user_id)
         logger.info(f"Zeiteintrag erfolgreich erstellt mit timeentry_id: {timeentry_id}")
         
         return jsonify({
@@ -315,6 +443,150 @@ def add_entry():
     finally:
         db.close()
 
+IMPORT_MAX_ROWS = int(os.getenv('IMPORT_MAX_ROWS', '10000'))
+IMPORT_FIELDS = ['datum', 'beginn', 'ende', 'pause', 'projekt', 'arbeitsort', 'beschreibung', 'mitarbeiter']
+
+def parse_import_payload(req):
+    """
+    Liest die zu importierenden Zeilen aus dem Request.
+    Unterstützt ein JSON-Array (oder {"entries": [...]}) sowie CSV mit Kopfzeile
+    (Trennzeichen ; oder ,) und den Spalten aus IMPORT_FIELDS.
+
+    Raises:
+        ValueError: Wenn der Request-Body nicht gelesen werden kann
+    """
+    if req.mimetype in ('text/csv', 'text/plain'):
+        text = req.get_data(as_text=True)
+        first_line = text.split('\n', 1)[0]
+        delimiter = ';' if first_line.count(';') >= first_line.count(',') else ','
+        reader = csv.DictReader(io.StringIO(text), delimiter=delimiter)
+        return [{k.strip(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k} for row in reader]
+
+    data = req.get_json(silent=True)
+    if isinstance(data, dict):
+        data = data.get('entries')
+    if not isinstance(data, list):
+        raise ValueError("Erwartet wird ein JSON-Array von Zeiteinträgen oder CSV")
+    if not all(isinstance(row, dict) for row in data):
+        raise ValueError("Jeder Eintrag muss ein Objekt sein")
+    return data
+
+@time_matrix_bp.route("/api/time-entries/import", methods=["POST"])
+@jwt_required()
+def import_entries():
+    """
+    API-Endpunkt für den Massenimport von Zeiteinträgen (JSON oder CSV).
+
+    Alle Zeilen werden in einem Durchlauf mit validate_time_entry geprüft,
+    Benutzer und Projekte mit je einer Abfrage aufgelöst und die gültigen
+    Zeilen per execute_values in einer einzigen Transaktion geschrieben.
+    Die Spalte ``mitarbeiter`` (E-Mail) darf nur ein Admin für andere
+    Benutzer setzen. Mit ``?dry_run=true`` wird nur validiert.
+
+    Antwort: Anzahl importierter und fehlerhafter Zeilen, Fehler je Zeile
+    (1-basiert) sowie Laufzeit und Durchsatz.
+    """
+    started = time.perf_counter()
+    current_user = get_jwt_identity()
+    dry_run = request.args.get('dry_run', '').lower() in ('1', 'true', 'ja')
+
+    try:
+        rows = parse_import_payload(request)
+    except (ValueError, csv.Error) as e:
+        return jsonify({"error": str(e)}), 400
+    if not rows:
+        return jsonify({"error": "Keine Daten erhalten"}), 400
+    if len(rows) > IMPORT_MAX_ROWS:
+        return jsonify({"error": f"Maximal {IMPORT_MAX_ROWS} Zeilen pro Import erlaubt"}), 413
+
+    # 1. Validierung aller Zeilen ohne Datenbankzugriff
+    errors = {}
+    for index, row in enumerate(rows, start=1):
+        if isinstance(row.get('projekt'), list):
+            row['projekt'] = row['projekt'][0] if row['projekt'] else None
+        is_valid, row_errors = validate_time_entry(row)
+        try:
+            row['pause'] = int(row.get('pause') or 0)
+        except (ValueError, TypeError):
+            row_errors.append("Pause muss eine ganze Zahl (Minuten) sein.")
+        row['mitarbeiter'] = str(row.get('mitarbeiter') or current_user).strip()
+        if row_errors:
+            errors[index] = row_errors
+
+    db = Database()
+    try:
+        # 2. Benutzer und Projekte mit je einer Abfrage auflösen
+        emails = sorted({row['mitarbeiter'] for row in rows})
+        if emails != [current_user] and not current_is_admin():
+            foreign = [i for i, row in enumerate(rows, start=1) if row['mitarbeiter'] != current_user]
+            for index in foreign:
+                errors.setdefault(index, []).append("Nur Admins dürfen Einträge für andere Benutzer importieren.")
+        users = dict(db.fetch_all(
+            "SELECT user_id, hk_user FROM h_user WHERE user_id = ANY(%s) AND t_to IS NULL", (emails,)
+        ))
+        project_names = sorted({row['projekt'] for row in rows if row.get('projekt')})
+        projects = dict(db.fetch_all(
+            "SELECT project_name, hk_project FROM h_project WHERE project_name = ANY(%s)", (project_names,)
+        ))
+
+        links = []
+        details = []
+        for index, row in enumerate(rows, start=1):
+            if row['mitarbeiter'] not in users:
+                errors.setdefault(index, []).append(f"Benutzer '{row['mitarbeiter']}' nicht gefunden")
+            if row.get('projekt') and row['projekt'] not in projects:
+                errors.setdefault(index, []).append(f"Projekt '{row['projekt']}' nicht gefunden")
+            if index in errors:
+                continue
+            link_id = str(uuid.uuid4())
+            links.append((link_id, users[row['mitarbeiter']], projects[row['projekt']], str(uuid.uuid4()), 'import'))
+            details.append((
+                link_id, 'import', row['datum'], row['beginn'], row['ende'], row['pause'],
+                row.get('arbeitsort') or 'Büro', row.get('beschreibung') or ''
+            ))
+
+        # 3. Gültige Zeilen in einer Transaktion schreiben
+        if links and not dry_run:
+            execute_values(db.cur, """
+                INSERT INTO l_user_project_timeentry
+                (hk_user_project_timeentry, hk_user, hk_project, timeentry_id, rec_src)
+                VALUES %s
+            """, links, page_size=1000)
+            execute_values(db.cur, """
+                INSERT INTO s_timeentry_details
+                (hk_user_project_timeentry, t_from, rec_src, entry_date, start_time, end_time,
+                 pause_minutes, work_location, description)
+                VALUES %s
+            """, details, template="(%s, CURRENT_TIMESTAMP, %s, %s, %s, %s, %s, %s, %s)", page_size=1000)
+            link_ids = [link[0] for link in links]
+            refresh_timeentry_pit(db, link_ids)
+            apply_timeentry_delta(db, link_ids, +1)
+            db.commit()
+            for hk_user in {link[1] for link in links}:
+                invalidate_summary(hk_user)
+
+        duration = time.perf_counter() - started
+        imported = 0 if dry_run else len(links)
+        logger.info(f"Import von {current_user}: {imported} importiert, {len(errors)} fehlerhaft, {duration:.3f}s")
+        return jsonify({
+            "success": not errors,
+            "dryRun": dry_run,
+            "total": len(rows),
+            "imported": imported,
+            "valid": len(links),
+            "failed": len(errors),
+            "errors": [{"zeile": index, "fehler": errors[index]} for index in sorted(errors)],
+            "durationMs": round(duration * 1000, 1),
+            "rowsPerSecond": round(len(rows) / duration, 1) if duration > 0 else None
+        }), 200
+
+    except Exception as e:
+        db.rollback()
+        logger.error(f"Fehler beim Import der Zeiteinträge: {str(e)}")
+        return jsonify({"error": f"Serverfehler: {str(e)}"}), 500
+    finally:
+        db.close()
+
 @time_matrix_bp.route("/api/time-entries/<uuid:entry_id>", methods=["PUT"])
 @jwt_required()
 def update_entry(entry_id):
@@ -339,16 +611,14 @@ def update_entry(entry_id):
     db = Database()
     try:
         # Benutzer-ID aus user_id (Email) abrufen
-        user_result = db.fetch_one("SELECT hk_user FROM h_user WHERE user_id = %s", (current_user,))
-        if not user_result:
+        user_id = current_hk_user()
+        if not user_id:
             return jsonify({"error": "Benutzer nicht gefunden"}), 404
-            
-        user_id = str(user_result[0])  # UUID als String umwandeln
         
         # Zuerst Link-ID ermitteln
         link_result = db.fetch_one("""
             SELECT hk_user_project_timeentry, hk_project
-            FROM l_user_project_timeentry 
+            FROM pit_timeentry
             WHERE timeentry_id = %s AND hk_user = %s
         """, (str(entry_id), user_id))
         
@@ -371,80 +641,61 @@ def update_entry(entry_id):
         if not project_result:
             return jsonify({"error": f"Projekt '{projekt}' nicht gefunden"}), 400
             
-        new_project_id = project_result[0]
-        
-        # Im Data Vault erzeugen wir einen neuen Eintrag anstatt zu aktualisieren
-        
-        # 1. Schließen des aktuellen Zeiteintrags
-        db.execute("""
-            UPDATE s_timeentry_details 
-            SET t_to = CURRENT_TIMESTAMP 
-            WHERE hk_user_project_timeentry = %s AND t_to IS NULL
-        """, (link_id,))
-        
-        # 2. Einfügen eines neuen Zeiteintrags
-        details_query = """
-            INSERT INTO s_timeentry_details 
-            (hk_user_project_timeentry, t_from, rec_src, entry_date, start_time, end_time, 
-             pause_minutes, work_location, description) 
-            VALUES (%s, CURRENT_TIMESTAMP, %s, %s, %s, %s, %s, %s, %s)
-        """
-        
-        db.execute(details_query, (
-            link_id,
-            'web_app',
-            data['datum'],
-            data['beginn'],
-            data['ende'],
-            int(data.get('pause', 0)),
-            data.get('arbeitsort', 'Büro'),
-            data.get('beschreibung', '')
-        ))
-        
-        # 3. Wenn das Projekt geändert wurde, aktualisieren wir auch den Link
-        if new_project_id != current_project_id:
-            # Schließen des alten Links
+        new_project_id = str(project_result[0])
+        entry_values = {
+            'entry_date': data['datum'],
+            'start_time': data['beginn'],
+            'end_time': data['ende'],
+            'pause_minutes': int(data.get('pause', 0)),
+            'work_location': data.get('arbeitsort', 'Büro'),
+            'description': data.get('beschreibung', '')
+        }
+        
+        # Stunden der bisherigen Version aus den Tagessummen herausrechnen
+        apply_timeentry_delta(db, link_id, -1)
+        
+        if new_project_id == current_project_id:
+            # Im Data Vault erzeugen wir eine neue Version anstatt zu aktualisieren:
+            # alte Version historisieren und neue anlegen in einer Anweisung;
+            # bei unveränderten Werten bleibt die offene Version bestehen
+            version_created = bool(write_versions(db, 's_timeentry_details', [
+                dict(entry_values, hk_user_project_timeentry=link_id)
+            ], rec_src='web_app'))
+            changed_links = [link_id]
+        else:
+            # Projektwechsel: alten Link samt offener Version schließen und die
+            # neue Version an einen neuen Link mit derselben timeentry_id hängen
+            close_versions(db, 's_timeentry_details', link_id)
             db.execute("""
                 UPDATE l_user_project_timeentry 
                 SET t_to = CURRENT_TIMESTAMP 
-                WHERE hk_user_project_timeentry = %s
+                WHERE hk_user_project_timeentry = %s AND t_to IS NULL
             """, (link_id,))
             
-            # Erstellen eines neuen Links mit neuem Projekt
-            import uuid
-            new_link_id = uuid.uuid4()
-            
-            new_link_query = """
+            new_link_id = str(uuid.uuid4())
+            db.execute("""
                 INSERT INTO l_user_project_timeentry 
                 (hk_user_project_timeentry, hk_user, hk_project, timeentry_id, rec_src) 
                 VALUES (%s, %s, %s, %s, %s)
-            """
-            
-            db.execute(new_link_query, (
-                new_link_id,
-                user_id,
-                new_project_id,
-                str(entry_id),  # Behalte dieselbe timeentry_id
-                'web_app'
-            ))
+            """, (new_link_id, user_id, new_project_id, str(entry_id), 'web_app'))
             
-            # Einfügen eines neuen Zeiteintrags mit dem neuen Link
-            db.execute(details_query, (
-                new_link_id,
-                'web_app',
-                data['datum'],
-                data['beginn'],
-                data['ende'],
-                int(data.get('pause', 0)),
-                data.get('arbeitsort', 'Büro'),
-                data.get('beschreibung', '')
-            ))
+            write_versions(db, 's_timeentry_details', [
+                dict(entry_values, hk_user_project_timeentry=new_link_id)
+            ], rec_src='web_app')
+            changed_links = [link_id, new_link_id]
+            version_created = True
+        
+        if version_created:
+            refresh_timeentry_pit(db, changed_links)
+        apply_timeentry_delta(db, changed_links, +1)
         
         db.commit()
+        invalidate_summary(user_id)
         
         return jsonify({
             "success": True,
-            "message": "Zeiteintrag erfolgreich aktualisiert"
+            "message": "Zeiteintrag erfolgreich aktualisiert",
+            "versionCreated": version_created
         })
         
     except Exception as e:
@@ -465,16 +716,14 @@ def delete_entry(entry_id):
     db = Database()
     try:
         # Benutzer-ID aus user_id (Email) abrufen
-        user_result = db.fetch_one("SELECT hk_user FROM h_user WHERE user_id = %s", (current_user,))
-        if not user_result:
+        user_id = current_hk_user()
+        if not user_id:
             return jsonify({"error": "Benutzer nicht gefunden"}), 404
-            
-        user_id = str(user_result[0])  # UUID als String umwandeln
         
         # Zuerst Link-ID ermitteln
         link_result = db.fetch_one("""
             SELECT hk_user_project_timeentry 
-            FROM l_user_project_timeentry 
+            FROM pit_timeentry
             WHERE timeentry_id = %s AND hk_user = %s
         """, (str(entry_id), user_id))
         
@@ -483,11 +732,14 @@ def delete_entry(entry_id):
             
         link_id = str(link_result[0])  # UUID als String umwandeln
         
+        # Stunden des Eintrags aus den Tagessummen herausrechnen
+        apply_timeentry_delta(db, link_id, -1)
+        
         # Im Data Vault setzen wir einen Zeitstempel, aber löschen nicht wirklich
         # 1. Schließen des aktuellen Zeiteintrags in s_timeentry_details
         db.execute("""
             UPDATE s_timeentry_details 
-            SET t_to = CURRENT_TIMESTAMP 
+            SET t_to = CURRENT_TIMESTAMP, b_to = CURRENT_DATE 
             WHERE hk_user_project_timeentry = %s AND t_to IS NULL
         """, (link_id,))
         
@@ -498,7 +750,9 @@ def delete_entry(entry_id):
             WHERE hk_user_project_timeentry = %s
         """, (link_id,))
         
+        refresh_timeentry_pit(db, link_id)
         db.commit()
+        invalidate_summary(user_id)
         
         return jsonify({
             "success": True,
@@ -517,47 +771,33 @@ def delete_entry(entry_id):
 def get_projects():
     """
     API-Endpunkt zum Abrufen aller verfügbaren Projekte für den Benutzer.
+    Kundennamen kommen aus derselben Abfrage; die Antwort liegt im Katalog-Cache.
     """
-    db = Database()
-    try:
-        # Alle Projekte abrufen
-        projects = db.fetch_all("""
-            SELECT hk_project, project_name, customer_id
-            FROM h_project
-            ORDER BY project_name
-        """)
-        
-        # IDs der Kunden abrufen
-        customer_ids = [p[2] for p in projects if p[2] is not None]
-        customer_map = {}
-        
-        if customer_ids:
-            customers = db.fetch_all(
-                "SELECT hk_customer, customer_name FROM h_customer WHERE hk_customer IN %s",
-                (tuple(customer_ids),)
-            )
-            customer_map = {c[0]: c[1] for c in customers}
-        
-        # Ergebnis formatieren
+    def load():
+        db = Database()
+        try:
+            projects = db.fetch_all("""
+                SELECT p.hk_project::text, p.project_name, c.customer_name
+                FROM h_project p
+                LEFT JOIN s_project_details pd ON pd.hk_project = p.hk_project AND pd.t_to IS NULL
+                LEFT JOIN h_customer c ON c.hk_customer = pd.customer_id
+                ORDER BY p.project_name
+            """)
+        finally:
+            db.close()
         result = []
-        for project in projects:
-            project_data = {
-                "id": str(project[0]),
-                "name": project[1]
-            }
-            
-            if project[2] and project[2] in customer_map:
-                project_data["customer"] = customer_map[project[2]]
-            
+        for hk_project, name, customer in projects:
+            project_data = {"id": hk_project, "name": name}
+            if customer:
+                project_data["customer"] = customer
             result.append(project_data)
-        
-        return jsonify(result)
-        
+        return result
+    
+    try:
+        return catalog_response('time_matrix_projects', load)
     except Exception as e:
         logger.error(f"Fehler beim Abrufen der Projekte: {str(e)}")
-        return jsonify([]), 500
-    finally:
-        db.close()
+        return jsonify({"error": f"Serverfehler: {str(e)}"}), 500
 
 @time_matrix_bp.route("/api/debug/database-info", methods=["GET"])
 @jwt_required()
@@ -7,12 +7,30 @@ import { useNavigate } from 'react-router-dom';
 const API_URL = "/api/time-entries";
 const PROJECTS_API_URL = "/api/projects"; // API-URL für Projekte
 const PROFILE_API_URL = "/api/profile"; // API-URL für Profil
+const PAGE_SIZE = 200; // Einträge pro Seite (Keyset-Paginierung im Backend)
+
+// Datum als YYYY-MM-DD in lokaler Zeit
+const formatDate = (date) => {
+  const month = String(date.getMonth() + 1).padStart(2, '0');
+  const day = String(date.getDate()).padStart(2, '0');
+  return `${date.getFullYear()}-${month}-${day}`;
+};
+
+// Standardzeitraum: Vormonat bis Ende des laufenden Monats
+const defaultRange = () => {
+  const now = new Date();
+  return {
+    from: formatDate(new Date(now.getFullYear(), now.getMonth() - 1, 1)),
+    to: formatDate(new Date(now.getFullYear(), now.getMonth() + 1, 0))
+  };
+};
 
 /**
  * `Zeitmatrix` Seite zur Anzeige und Verwaltung der Zeiteinträge.
  * Lädt Zeiteinträge, Projekte und Benutzerprofildaten vom Backend.
  * Integriert die TimeMatrixTable und das TimeEntryModal.
  * Bietet Funktionen zum Hinzufügen, Bearbeiten, Löschen, Filtern und Sortieren von Zeiteinträgen.
+ * Geladen wird nur der gewählte Zeitraum, seitenweise über next_cursor.
  */
 const Zeitmatrix = () => {
   const [entries, setEntries] = useState([]);
@@ -23,6 +41,9 @@ const Zeitmatrix = () => {
   const [editingEntry, setEditingEntry] = useState(null);
   const [filters, setFilters] = useState({});
   const [newEntryInitialData, setNewEntryInitialData] = useState(null);
+  const [range, setRange] = useState(defaultRange);
+  const [nextCursor, setNextCursor] = useState(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   
   // State für Benutzerprofildaten
   const [zeitmatrixUserData, setZeitmatrixUserData] = useState(null);
@@ -92,12 +113,14 @@ const Zeitmatrix = () => {
       try {
         const token = localStorage.getItem('access_token');
         
-        // Nur Zeiteinträge laden
+        // Erste Seite der Zeiteinträge im gewählten Zeitraum laden
         const entriesResponse = await axios.get(API_URL, {
-          headers: { Authorization: `Bearer ${token}` }
+          headers: { Authorization: `Bearer ${token}` },
+          params: { from: range.from, to: range.to, limit: PAGE_SIZE }
         });
 
-        setEntries(entriesResponse.data);
+        setEntries(entriesResponse.data.entries);
+        setNextCursor(entriesResponse.data.next_cursor);
         
         // Optional: Auch Profildaten laden, falls benötigt
         try {
@@ -125,7 +148,7 @@ const Zeitmatrix = () => {
     };
 
     fetchData();
-  }, [navigate]);
+  }, [navigate, range]);
 
   // Filter-Funktion
   const handleFilterChange = (field, value) => {
@@ -228,35 +251,47 @@ const Zeitmatrix = () => {
     }
   };
 
-  // Die fetchEntries-Funktion solltest du optimieren, um Duplikate zu vermeiden:
-  const fetchEntries = async () => {
-    setLoading(true);
+  // Lädt die Einträge des Zeitraums neu bzw. mit ``cursor`` die nächste Seite dazu
+  const fetchEntries = async (cursor = null) => {
+    if (cursor) {
+      setLoadingMore(true);
+    } else {
+      setLoading(true);
+    }
     setError(null);
     try {
       const token = localStorage.getItem('access_token');
+      const params = { from: range.from, to: range.to, limit: PAGE_SIZE };
+      if (cursor) {
+        params.cursor = cursor;
+      }
       const response = await axios.get(API_URL, {
-        headers: { Authorization: `Bearer ${token}` }
+        headers: { Authorization: `Bearer ${token}` },
+        params
       });
       
-      // Stellen sicher, dass keine Duplikate vorhanden sind, 
-      // indem wir ein Map-Objekt basierend auf der ID verwenden
+      // Keine Duplikate: Map-Objekt basierend auf der ID
       const entriesMap = new Map();
-      response.data.forEach(entry => {
+      (cursor ? entries : []).concat(response.data.entries).forEach(entry => {
         entriesMap.set(entry.id, entry);
       });
       
-      // In ein Array zurückkonvertieren, um keine Duplikate zu haben
-      const uniqueEntries = Array.from(entriesMap.values());
-      
-      setEntries(uniqueEntries);
-      setLoading(false);
+      setEntries(Array.from(entriesMap.values()));
+      setNextCursor(response.data.next_cursor);
     } catch (err) {
       console.error("Fehler beim Laden der Einträge:", err);
       setError(`Fehler beim Laden der Einträge: ${err.response?.data?.error || err.message || 'Unbekannter Fehler'}`);
+    } finally {
       setLoading(false);
+      setLoadingMore(false);
     }
   };
 
+  // Zeitraum ändern; ein leeres Feld setzt den Standardwert
+  const handleRangeChange = (field, value) => {
+    setRange(prev => ({ ...prev, [field]: value || defaultRange()[field] }));
+  };
+
   // Eintrag löschen
   const handleDeleteEntry = async (id) => {
     if (!window.confirm("Möchten Sie diesen Zeiteintrag wirklich löschen?")) {
@@ -292,6 +327,30 @@ const Zeitmatrix = () => {
         </button>
       </div>
 
+      {/* Zeitraum: bestimmt, welche Einträge vom Server geladen werden */}
+      <div className="mb-4 flex flex-wrap items-end gap-4">
+        <div>
+          <label className="block text-sm font-medium text-gray-700 mb-1">Von</label>
+          <input
+            type="date"
+            value={range.from}
+            max={range.to}
+            onChange={(e) => handleRangeChange('from', e.target.value)}
+            className="px-3 py-2 border rounded"
+          />
+        </div>
+        <div>
+          <label className="block text-sm font-medium text-gray-700 mb-1">Bis</label>
+          <input
+            type="date"
+            value={range.to}
+            min={range.from}
+            onChange={(e) => handleRangeChange('to', e.target.value)}
+            className="px-3 py-2 border rounded"
+          />
+        </div>
+      </div>
+
       {error && (
         <div className="bg-red-100 border-l-4 border-red-500 text-red-700 p-4 mb-4">
           <p>{error}</p>
@@ -311,7 +370,7 @@ const Zeitmatrix = () => {
           <svg className="h-16 w-16 mx-auto text-gray-400" fill="none" viewBox="0 0 24 24" stroke="currentColor">
             <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={1.5} d="M12 8v4l3 3m6-3a9 9 0 11-18 0 9 9 0 0118 0z" />
           </svg>
-          <h3 className="mt-3 text-lg font-medium text-gray-900">Keine Zeiteinträge vorhanden</h3>
+          <h3 className="mt-3 text-lg font-medium text-gray-900">Keine Zeiteinträge im gewählten Zeitraum</h3>
           <p className="mt-1 text-gray-500">Erstelle deinen ersten Zeiteintrag mit dem Button "Neuer Eintrag".</p>
           <div className="mt-6">
             <button
@@ -365,6 +424,18 @@ const Zeitmatrix = () => {
             onFilterChange={handleFilterChange}
             availableProjekte={availableProjects}
           />
+
+          {nextCursor && (
+            <div className="mt-4 text-center">
+              <button
+                onClick={() => fetchEntries(nextCursor)}
+                disabled={loadingMore}
+                className="px-4 py-2 border rounded hover:bg-gray-100 disabled:opacity-50"
+              >
+                {loadingMore ? 'Wird geladen...' : 'Ältere Einträge laden'}
+              </button>
+            </div>
+          )}
         </>
       )}
 